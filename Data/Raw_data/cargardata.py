@@ -1,14 +1,82 @@
 from datasets import load_dataset
-import pandas as pd
-import itertools
-# Cargar la referencia al dataset (esto es rápido)
-dataset = load_dataset("McAuley-Lab/Amazon-Reviews-2023", "raw_review_Electronics", trust_remote_code=True)
-# Seleccionar solo las primeras 100,000 filas
-full_list = list(itertools.islice(dataset['full'], 100000))
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
+import os
+import shutil
+import time
 
-porcion_dataset = pd.DataFrame(full_list)
 
-porcion_dataset.to_csv("Electronics.csv", index=False)
-# Es buena idea cambiarle el nombre para saber que es una porción
+def stream_reviews_to_parquet(category, output_dir, batch_size=50000, max_reviews=None):
+    """Descarga las reseñas de una categoría en lotes y las escribe como Parquet particionado.
 
-print("¡Se guardó una porción de 10,000 reseñas en 'Music_Instruments_primeras_10000.csv'!")
\ No newline at end of file
+    El dataset se recorre en modo streaming: en memoria solo vive el lote
+    actual, así que la ingesta no depende del tamaño total de la categoría.
+    Cada lote se escribe como un archivo en <output_dir>/category=<categoria>/.
+
+    La partición se escribe completa en un directorio temporal y después
+    reemplaza a la anterior: una nueva descarga nunca deja archivos part-*
+    de una ejecución previa (que los lectores tomarían como datos repetidos).
+    """
+    dataset = load_dataset(
+        "McAuley-Lab/Amazon-Reviews-2023",
+        f"raw_review_{category}",
+        split="full",
+        streaming=True,
+        trust_remote_code=True,
+    )
+
+    partition_dir = os.path.join(output_dir, f"category={category}")
+    # Con prefijo '.': los lectores de Parquet ignoran el directorio mientras se escribe
+    tmp_dir = os.path.join(output_dir, f".category={category}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    # Esquema fijo para que todos los archivos de la partición sean compatibles
+    schema = dataset.features.arrow_schema if dataset.features is not None else None
+
+    total = 0
+    part = 0
+    start_time = time.time()
+    try:
+        for batch in dataset.iter(batch_size=batch_size):
+            if max_reviews is not None:
+                remaining = max_reviews - total
+                if remaining <= 0:
+                    break
+                batch = {column: values[:remaining] for column, values in batch.items()}
+
+            table = pa.Table.from_pydict(batch, schema=schema)
+            if schema is None:
+                schema = table.schema
+
+            pq.write_table(table, os.path.join(tmp_dir, f"part-{part:05d}.parquet"))
+            total += table.num_rows
+            part += 1
+
+            elapsed = time.time() - start_time
+            print(f"Lote {part}: {total} reseñas escritas ({total / elapsed:.0f} reseñas/s)")
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    shutil.rmtree(partition_dir, ignore_errors=True)
+    os.replace(tmp_dir, partition_dir)
+
+    print(f"¡Se guardaron {total} reseñas de '{category}' en '{partition_dir}' ({part} archivos)!")
+    return partition_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Descarga reseñas de Amazon Reviews 2023 a Parquet por lotes")
+    parser.add_argument("--categoria", default="Electronics", help="Categoría del dataset (ej. Electronics, All_Beauty)")
+    parser.add_argument("--salida", default="Data/Raw_data/reviews", help="Directorio raíz del dataset Parquet")
+    parser.add_argument("--lote", type=int, default=50000, help="Reseñas por archivo Parquet")
+    parser.add_argument("--limite", type=int, default=None, help="Máximo de reseñas a descargar (por defecto, todas)")
+    args = parser.parse_args()
+
+    stream_reviews_to_parquet(args.categoria, args.salida, batch_size=args.lote, max_reviews=args.limite)
+
+
+if __name__ == "__main__":
+    main()
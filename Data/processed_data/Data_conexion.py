@@ -1,14 +1,14 @@
 import pandas as pd
 
-# Rutas a tus archivos CSV
-csv1 = 'Data\processed_data\Electronics_processed_ner.csv'
-csv2 = 'Data\processed_data\Beauty_processed_ner.csv'
-csv3 = 'Data\processed_data\Music_Instruments_sm_processed.csv'
+# Rutas a tus archivos Parquet
+parquet1 = 'Data/processed_data/Electronics_processed_ner.parquet'
+parquet2 = 'Data/processed_data/Beauty_processed_ner.parquet'
+parquet3 = 'Data/processed_data/Music_Instruments_sm_processed.parquet'
 
-# Leer los tres CSV
-df1 = pd.read_csv(csv1)
-df2 = pd.read_csv(csv2)
-df3 = pd.read_csv(csv3)
+# Leer los tres Parquet (las entidades conservan su tipo lista)
+df1 = pd.read_parquet(parquet1)
+df2 = pd.read_parquet(parquet2)
+df3 = pd.read_parquet(parquet3)
 
 # Unirlos en un solo DataFrame
 df_total = pd.concat([df1, df2, df3], ignore_index=True)
@@ -17,6 +17,6 @@ df_total = pd.concat([df1, df2, df3], ignore_index=True)
 print(f"Total de filas combinadas: {len(df_total)}")
 print(df_total.head())
 
-# Guardar el CSV combinado
-df_total.to_csv('Dataset_processed_ner.csv', index=False)
-print("CSV combinado guardado")
+# Guardar el Parquet combinado
+df_total.to_parquet('Dataset_processed_ner.parquet', index=False)
+print("Parquet combinado guardado")
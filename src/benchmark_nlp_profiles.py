@@ -0,0 +1,80 @@
+import argparse
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow.dataset as ds
+
+from ner_entities import build_full_texts
+from nlp_profiles import PROFILES, load_profile, pipe_entities
+
+DEFAULT_INPUT = 'Data/processed_data/Electronics_processed.parquet'
+# Configuración anterior de ner_entities.py (solo parser desactivado) frente al perfil mínimo
+DEFAULT_PROFILES = ['no-parser', 'entities-only']
+
+
+def load_sample(input_path, sample_size):
+    """Muestra fija: las primeras `sample_size` reseñas del dataset"""
+    dataset = ds.dataset(input_path, format='parquet', partitioning='hive')
+    return build_full_texts(dataset.head(sample_size).to_pandas())
+
+
+def peak_rss_mb():
+    # En Linux ru_maxrss viene en KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_profile(profile, texts, batch_size):
+    """Mide un perfil dentro de un proceso nuevo (la memoria no se mezcla entre perfiles)"""
+    rss_before = peak_rss_mb()
+    load_start = time.time()
+    nlp = load_profile(profile)
+    load_seconds = time.time() - load_start
+
+    start_time = time.time()
+    entities = sum(len(ents) for ents in pipe_entities(nlp, texts, batch_size=batch_size))
+    elapsed = time.time() - start_time
+
+    return {
+        'perfil': profile,
+        'componentes': ','.join(name for name, _ in nlp.pipeline),
+        'carga_s': load_seconds,
+        'docs_s': len(texts) / elapsed if elapsed > 0 else float('inf'),
+        'entidades': entities,
+        'rss_pico_mb': peak_rss_mb(),
+        'rss_modelo_mb': peak_rss_mb() - rss_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara perfiles de spaCy (docs/s y memoria)")
+    parser.add_argument('--entrada', default=DEFAULT_INPUT, help="Parquet de reseñas limpias")
+    parser.add_argument('--muestra', type=int, default=2000, help="Número de reseñas de la muestra")
+    parser.add_argument('--lote', type=int, default=500, help="batch_size de nlp.pipe")
+    parser.add_argument('--perfiles', nargs='+', default=DEFAULT_PROFILES, choices=sorted(PROFILES))
+    args = parser.parse_args()
+
+    texts = load_sample(args.entrada, args.muestra)
+    print(f"Muestra: {len(texts)} reseñas de '{args.entrada}'\n")
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for profile in args.perfiles:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_profile, profile, texts, args.lote).result()
+        results.append(result)
+        print(f"{result['perfil']:>14}: {result['docs_s']:8.0f} docs/s | "
+              f"carga {result['carga_s']:.2f} s | RSS pico {result['rss_pico_mb']:.0f} MB "
+              f"(modelo {result['rss_modelo_mb']:.0f} MB) | entidades {result['entidades']} "
+              f"| {result['componentes']}")
+
+    baseline = results[0]
+    for result in results[1:]:
+        print(f"\n'{result['perfil']}' vs '{baseline['perfil']}': "
+              f"{result['docs_s'] / baseline['docs_s']:.2f}x docs/s, "
+              f"{result['rss_pico_mb'] - baseline['rss_pico_mb']:+.0f} MB de RSS pico")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,596 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+
+import marisa_trie
+import numpy as np
+
+# Versión del formato en disco; si cambia, los índices viejos se reconstruyen
+FORMAT_VERSION = 2
+
+# Postings por documento del corpus a partir de los cuales get_sparse_scores acumula en denso
+SPARSE_MAX_DENSITY = 0.5
+
+
+def source_signature(source_path):
+    """Firma barata del archivo fuente (tamaño y fecha de modificación)"""
+    if not source_path or not os.path.exists(source_path):
+        return None
+    stat = os.stat(source_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class BM25Index:
+    """Índice BM25 persistente con postings tipo CSR cargados con numpy.memmap.
+
+    Estructura en disco (un directorio):
+        vocab.marisa   vocabulario (id de término = id de la clave en el trie)
+        indptr.npy     inicio de los postings de cada término (V + 1)
+        postings.npy   ids de documento ordenados por término
+        tfs.npy        frecuencia del término en cada posting
+        doc_len.npy    longitud (en tokens) de cada documento
+        idf.npy        idf de cada término (variante de rank_bm25.BM25Okapi)
+        weights.npy    peso BM25 precalculado de cada posting (idf * tf normalizada)
+        meta.json      parámetros, estadísticas y firma del archivo fuente
+    """
+
+    def __init__(self, index_dir, vocab, indptr, postings, tfs, doc_len, idf, weights, meta):
+        self.index_dir = index_dir
+        self.vocab = vocab
+        self.indptr = indptr
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.weights = weights
+        self.meta = meta
+
+        self.k1 = meta['k1']
+        self.b = meta['b']
+        self.epsilon = meta['epsilon']
+
+        # Documentos agregados después de construir el índice (ver add_documents)
+        self._new_terms = {}
+        self._write_lock = threading.Lock()
+        self._merger = None
+        self._snapshot = IndexSnapshot(
+            segments=(BaseSegment(indptr, postings, tfs, doc_len),),
+            doc_freq=None,
+            idf=idf,
+            corpus_size=meta['n_docs'],
+            total_len=None,
+            avgdl=meta['avgdl'],
+        )
+
+    # ------------------------------------------------------------------
+    # Construcción y persistencia
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, tokenized_texts, index_dir, source_path=None, k1=1.5, b=0.75, epsilon=0.25):
+        """Construye el índice a partir de textos tokenizados y lo guarda en disco"""
+        start_time = time.time()
+
+        vocab_ids = {}
+        term_ids = []
+        doc_ids = []
+        tfs = []
+        doc_len = np.zeros(len(tokenized_texts), dtype=np.int32)
+
+        for doc_id, tokens in enumerate(tokenized_texts):
+            doc_len[doc_id] = len(tokens)
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, freq in frequencies.items():
+                term_ids.append(vocab_ids.setdefault(token, len(vocab_ids)))
+                doc_ids.append(doc_id)
+                tfs.append(freq)
+
+        # El trie asigna sus propios ids; se reordenan los postings según ellos
+        vocab = marisa_trie.Trie(vocab_ids.keys())
+        remap = np.zeros(len(vocab_ids), dtype=np.int32)
+        for term, old_id in vocab_ids.items():
+            remap[old_id] = vocab[term]
+
+        term_ids = remap[np.asarray(term_ids, dtype=np.int32)]
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.int32)
+
+        # Orden estable: dentro de cada término los documentos quedan ordenados
+        order = np.argsort(term_ids, kind='stable')
+        postings = doc_ids[order]
+        tfs = tfs[order]
+
+        doc_freq = np.bincount(term_ids, minlength=len(vocab))
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=indptr[1:])
+
+        n_docs = len(tokenized_texts)
+        avgdl = float(doc_len.sum()) / n_docs if n_docs else 0.0
+
+        idf = okapi_idf(doc_freq, n_docs, epsilon)
+
+        # Peso final de cada posting: la consulta se reduce a sumar rebanadas
+        dl = doc_len[postings]
+        norm = tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * dl / avgdl)) if n_docs else tfs.astype(np.float64)
+        term_of_posting = np.repeat(np.arange(len(vocab)), doc_freq)
+        weights = (idf[term_of_posting] * norm).astype(np.float32)
+
+        meta = {
+            'version': FORMAT_VERSION,
+            'n_docs': n_docs,
+            'n_terms': len(vocab),
+            'avgdl': avgdl,
+            'k1': k1,
+            'b': b,
+            'epsilon': epsilon,
+            'source': source_signature(source_path),
+        }
+
+        # Escribir en un directorio temporal y renombrar (otros procesos
+        # nunca ven un índice a medio escribir)
+        tmp_dir = f"{index_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        vocab.save(os.path.join(tmp_dir, 'vocab.marisa'))
+        np.save(os.path.join(tmp_dir, 'indptr.npy'), indptr)
+        np.save(os.path.join(tmp_dir, 'postings.npy'), postings)
+        np.save(os.path.join(tmp_dir, 'tfs.npy'), tfs)
+        np.save(os.path.join(tmp_dir, 'doc_len.npy'), doc_len)
+        np.save(os.path.join(tmp_dir, 'idf.npy'), idf)
+        np.save(os.path.join(tmp_dir, 'weights.npy'), weights)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        shutil.rmtree(index_dir, ignore_errors=True)
+        os.replace(tmp_dir, index_dir)
+
+        print(f"Índice BM25 construido en {time.time() - start_time:.2f} s "
+              f"({n_docs} documentos, {len(vocab)} términos)")
+        return cls.load(index_dir)
+
+    @classmethod
+    def load(cls, index_dir):
+        """Carga el índice con numpy.memmap (las páginas se comparten entre procesos)"""
+        with open(os.path.join(index_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+
+        vocab = marisa_trie.Trie()
+        vocab.mmap(os.path.join(index_dir, 'vocab.marisa'))
+
+        arrays = {
+            name: np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r')
+            for name in ['indptr', 'postings', 'tfs', 'doc_len', 'idf', 'weights']
+        }
+        return cls(index_dir, vocab, meta=meta, **arrays)
+
+    @classmethod
+    def load_or_build(cls, index_dir, tokenize_fn, source_path=None):
+        """Carga el índice si está al día con el archivo fuente; si no, lo reconstruye.
+
+        `tokenize_fn` solo se invoca cuando hace falta reconstruir.
+        """
+        if cls.is_valid(index_dir, source_path):
+            try:
+                return cls.load(index_dir)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Índice BM25 dañado, se reconstruirá: {e}")
+
+        return cls.build(tokenize_fn(), index_dir, source_path=source_path)
+
+    @classmethod
+    def is_valid(cls, index_dir, source_path=None):
+        """Indica si el índice existe, tiene el formato actual y coincide con la fuente"""
+        meta_path = os.path.join(index_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        return (meta.get('version') == FORMAT_VERSION
+                and meta.get('source') == source_signature(source_path))
+
+    # ------------------------------------------------------------------
+    # Documentos agregados: segmentos inmutables y fusión en segundo plano
+    # ------------------------------------------------------------------
+    @property
+    def segments(self):
+        """Segmentos actuales en orden de documento (el primero es el índice base)"""
+        return self._snapshot.segments
+
+    @property
+    def corpus_size(self):
+        return self._snapshot.corpus_size
+
+    @property
+    def avgdl(self):
+        return self._snapshot.avgdl
+
+    @property
+    def idf(self):
+        return self._snapshot.idf
+
+    @property
+    def n_terms(self):
+        return len(self.vocab) + len(self._new_terms)
+
+    def add_documents(self, tokenized_texts):
+        """Agrega documentos al final del corpus sin reconstruir el índice.
+
+        Los documentos nuevos forman un segmento inmutable con sus propios
+        postings; solo se recalculan la frecuencia documental y la idf
+        globales, así que el costo depende del lote y del vocabulario, no del
+        corpus. Devuelve el rango de ids asignados.
+        """
+        with self._write_lock:
+            snapshot = self._snapshot
+            doc_freq = snapshot.doc_freq
+            total_len = snapshot.total_len
+            if doc_freq is None:
+                doc_freq = np.diff(self.indptr).astype(np.int64)
+                total_len = int(np.sum(self.doc_len, dtype=np.int64))
+
+            first_id = snapshot.corpus_size
+            segment = Segment.from_tokens(tokenized_texts, self._assign_term_id, first_id)
+
+            # Copia: las consultas en curso siguen usando la instantánea anterior
+            doc_freq = np.concatenate([doc_freq, np.zeros(self.n_terms - len(doc_freq), dtype=np.int64)])
+            doc_freq[segment.term_ids] += np.diff(segment.indptr)
+
+            corpus_size = first_id + segment.n_docs
+            total_len += int(segment.doc_len.sum())
+            self._snapshot = IndexSnapshot(
+                segments=snapshot.segments + (segment,),
+                doc_freq=doc_freq,
+                idf=okapi_idf(doc_freq, corpus_size, self.epsilon),
+                corpus_size=corpus_size,
+                total_len=total_len,
+                avgdl=total_len / corpus_size if corpus_size else 0.0,
+            )
+
+        if self._merger is not None:
+            self._merger.notify()
+        return range(first_id, corpus_size)
+
+    def merge_segments(self, merge_factor=4):
+        """Fusiona una racha de segmentos pequeños de tamaño parecido; True si fusionó algo.
+
+        La fusión se calcula sin bloquear; solo el reemplazo final de la
+        instantánea toma el candado. Las estadísticas globales no cambian
+        (son los mismos documentos), así que las puntuaciones tampoco.
+        """
+        run = pick_merge(self._snapshot.segments[1:], merge_factor)
+        if run is None:
+            return False
+        merged = Segment.merge(run)
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            segments = snapshot.segments
+            start = next((i for i, segment in enumerate(segments) if segment is run[0]), None)
+            if start is None or any(a is not b for a, b in zip(segments[start:start + len(run)], run)):
+                return False
+            self._snapshot = snapshot._replace(
+                segments=segments[:start] + (merged,) + segments[start + len(run):]
+            )
+        return True
+
+    def start_background_merge(self, merge_factor=4, interval=5.0):
+        """Arranca el hilo que fusiona segmentos pequeños (las consultas nunca lo esperan)"""
+        if self._merger is None:
+            self._merger = SegmentMerger(self, merge_factor=merge_factor, interval=interval)
+            self._merger.start()
+        return self._merger
+
+    def stop_background_merge(self):
+        if self._merger is not None:
+            self._merger.stop()
+            self._merger = None
+
+    def _assign_term_id(self, term):
+        term_id = self.term_id(term)
+        if term_id is None:
+            term_id = self._new_terms[term] = self.n_terms
+        return term_id
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def term_id(self, term):
+        """Id del término o None si no está en el vocabulario"""
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self._new_terms.get(term)
+        return term_id
+
+    def get_scores(self, query):
+        """Puntuaciones BM25 de todos los documentos (misma interfaz que rank_bm25).
+
+        Cada término de la consulta es una rebanada de la matriz CSR de pesos
+        de cada segmento; las rebanadas se suman con un único np.bincount.
+        """
+        snapshot = self._snapshot
+        if not snapshot.corpus_size:
+            return np.zeros(0)
+
+        docs, weights = self._query_postings(query, snapshot)
+        if not len(docs):
+            return np.zeros(snapshot.corpus_size)
+        return np.bincount(docs, weights=weights, minlength=snapshot.corpus_size)
+
+    def get_sparse_scores(self, query):
+        """Puntuaciones BM25 de los documentos de los postings: (ids ordenados, puntuaciones).
+
+        Los demás documentos valen 0. Con postings densos ordenarlos cuesta más
+        que acumular sobre todo el corpus: los ids son None y las puntuaciones
+        son las de get_scores.
+        """
+        snapshot = self._snapshot
+        docs, weights = self._query_postings(query, snapshot)
+        if len(docs) > snapshot.corpus_size * SPARSE_MAX_DENSITY:
+            return None, np.bincount(docs, weights=weights, minlength=snapshot.corpus_size)
+
+        doc_ids, positions = np.unique(docs, return_inverse=True)
+        return doc_ids, np.bincount(positions, weights=weights, minlength=len(doc_ids))
+
+    def get_batch_scores(self, query, doc_ids):
+        """Puntuaciones BM25 solo para `doc_ids` (ordenados de menor a mayor).
+
+        Los candidatos se cruzan con los postings de la consulta mediante
+        búsqueda binaria: el costo depende de los postings de la consulta, no
+        de cuántos documentos deja el filtro.
+        """
+        doc_ids = np.asarray(doc_ids)
+        scores = np.zeros(len(doc_ids))
+        if not len(doc_ids):
+            return scores
+
+        docs, weights = self._query_postings(query, self._snapshot)
+        if not len(docs):
+            return scores
+
+        positions = np.searchsorted(doc_ids, docs)
+        positions[positions == len(doc_ids)] = 0
+        hits = doc_ids[positions] == docs
+        return np.bincount(positions[hits], weights=weights[hits], minlength=len(doc_ids))
+
+    def _query_postings(self, query, snapshot):
+        """Concatena (documentos, pesos) de los términos de la consulta en todos los segmentos.
+
+        Mientras solo existe el índice base se usan los pesos precalculados.
+        Con segmentos agregados las estadísticas globales cambiaron, así que
+        los pesos se recalculan a partir de tf y longitud, solo para los
+        postings de la consulta.
+        """
+        only_base = len(snapshot.segments) == 1
+        n_terms = len(snapshot.idf)
+        docs_parts = []
+        weight_parts = []
+        for q in query:
+            term = self.term_id(q)
+            # Términos creados después de la instantánea no tienen postings en ella
+            if term is None or term >= n_terms:
+                continue
+
+            for segment in snapshot.segments:
+                if only_base:
+                    docs, weights = segment.weights_for(term, self.weights)
+                else:
+                    docs, tfs, dl = segment.postings_for(term)
+                    weights = self._weights(snapshot, term, tfs, dl)
+                if len(docs):
+                    docs_parts.append(docs)
+                    weight_parts.append(weights)
+
+        if not docs_parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return np.concatenate(docs_parts), np.concatenate(weight_parts)
+
+    def _weights(self, snapshot, term, tfs, dl):
+        norm = tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * dl / snapshot.avgdl))
+        return (snapshot.idf[term] * norm).astype(np.float32)
+
+
+# Estado consultable del índice. Se reemplaza entero (nunca se modifica), así
+# que una consulta trabaja siempre sobre una instantánea coherente sin candados.
+IndexSnapshot = namedtuple('IndexSnapshot', ['segments', 'doc_freq', 'idf', 'corpus_size', 'total_len', 'avgdl'])
+
+
+class BaseSegment:
+    """Segmento del índice construido en disco (ids de término = ids del trie)"""
+
+    def __init__(self, indptr, postings, tfs, doc_len):
+        self.indptr = indptr
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.first_id = 0
+        self.n_docs = len(doc_len)
+        self.n_terms = len(indptr) - 1
+
+    def postings_for(self, term):
+        """(documentos, tfs, longitudes) del término en este segmento"""
+        if term >= self.n_terms:
+            return _EMPTY, _EMPTY, _EMPTY
+        s = slice(self.indptr[term], self.indptr[term + 1])
+        docs = self.postings[s]
+        return docs, self.tfs[s], self.doc_len[docs]
+
+    def weights_for(self, term, weights):
+        """(documentos, pesos precalculados) del término"""
+        if term >= self.n_terms:
+            return _EMPTY, _EMPTY
+        s = slice(self.indptr[term], self.indptr[term + 1])
+        return self.postings[s], weights[s]
+
+
+class Segment:
+    """Postings inmutables de un bloque de documentos con ids consecutivos.
+
+    Los términos usan los ids globales del índice; `term_ids` está ordenado
+    y cada término apunta a su rango en postings/tfs (formato CSR).
+    """
+
+    def __init__(self, term_ids, indptr, postings, tfs, doc_len, first_id):
+        self.term_ids = term_ids
+        self.indptr = indptr
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.first_id = first_id
+        self.n_docs = len(doc_len)
+
+    @classmethod
+    def from_tokens(cls, tokenized_texts, term_id_fn, first_id):
+        term_ids = []
+        doc_ids = []
+        tfs = []
+        doc_len = np.zeros(len(tokenized_texts), dtype=np.int32)
+
+        for offset, tokens in enumerate(tokenized_texts):
+            doc_len[offset] = len(tokens)
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, freq in frequencies.items():
+                term_ids.append(term_id_fn(token))
+                doc_ids.append(first_id + offset)
+                tfs.append(freq)
+
+        return cls._from_postings(np.asarray(term_ids, dtype=np.int64), np.asarray(doc_ids, dtype=np.int32),
+                                  np.asarray(tfs, dtype=np.int32), doc_len, first_id)
+
+    @classmethod
+    def merge(cls, segments):
+        """Un solo segmento con los documentos de `segments` (consecutivos y en orden)"""
+        term_ids = np.concatenate([np.repeat(segment.term_ids, np.diff(segment.indptr)) for segment in segments])
+        return cls._from_postings(term_ids,
+                                  np.concatenate([segment.postings for segment in segments]),
+                                  np.concatenate([segment.tfs for segment in segments]),
+                                  np.concatenate([segment.doc_len for segment in segments]),
+                                  segments[0].first_id)
+
+    @classmethod
+    def _from_postings(cls, term_ids, doc_ids, tfs, doc_len, first_id):
+        # Orden estable: dentro de cada término los documentos quedan ordenados
+        order = np.argsort(term_ids, kind='stable')
+        unique_terms, counts = np.unique(term_ids[order], return_counts=True)
+        indptr = np.zeros(len(unique_terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(unique_terms, indptr, doc_ids[order], tfs[order], doc_len, first_id)
+
+    def postings_for(self, term):
+        """(documentos, tfs, longitudes) del término en este segmento"""
+        position = np.searchsorted(self.term_ids, term)
+        if position == len(self.term_ids) or self.term_ids[position] != term:
+            return _EMPTY, _EMPTY, _EMPTY
+        s = slice(self.indptr[position], self.indptr[position + 1])
+        docs = self.postings[s]
+        return docs, self.tfs[s], self.doc_len[docs - self.first_id]
+
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def pick_merge(segments, merge_factor):
+    """Racha de segmentos consecutivos a fusionar, o None.
+
+    El nivel de un segmento es log_{merge_factor}(documentos). Se elige el
+    nivel más bajo que tenga `merge_factor` segmentos consecutivos de ese
+    nivel (pueden intercalarse segmentos menores, que se absorben). Un
+    segmento grande nunca se fusiona con uno pequeño, así que cada documento
+    se copia una vez por nivel y el número de segmentos crece de forma
+    logarítmica.
+    """
+    if merge_factor < 2 or len(segments) < merge_factor:
+        return None
+
+    levels = [_size_level(segment.n_docs, merge_factor) for segment in segments]
+    for level in sorted(set(levels)):
+        start = None
+        count = 0
+        for i, segment_level in enumerate(levels):
+            if segment_level > level:
+                start = None
+                continue
+            if start is None:
+                start = i
+                count = 0
+            count += segment_level == level
+            if count >= merge_factor:
+                return segments[start:i + 1]
+    return None
+
+
+def _size_level(n_docs, merge_factor):
+    level = 0
+    while n_docs >= merge_factor:
+        n_docs //= merge_factor
+        level += 1
+    return level
+
+
+class SegmentMerger(threading.Thread):
+    """Hilo en segundo plano que fusiona segmentos pequeños del índice"""
+
+    def __init__(self, index, merge_factor=4, interval=5.0):
+        super().__init__(name='bm25-merger', daemon=True)
+        self.index = index
+        self.merge_factor = merge_factor
+        self.interval = interval
+        self.merges = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def notify(self):
+        """Avisa que hay segmentos nuevos"""
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        self.join()
+
+    def run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            while not self._stopped.is_set() and self.index.merge_segments(self.merge_factor):
+                self.merges += 1
+
+
+def okapi_idf(doc_freq, n_docs, epsilon):
+    """Misma idf que rank_bm25.BM25Okapi (con piso epsilon * idf promedio)"""
+    idf = np.log(n_docs - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+    if len(idf):
+        eps = epsilon * idf.mean()
+        idf[idf < 0] = eps
+    return idf
+
+
+def top_k_indices(scores, k):
+    """Índices de las k puntuaciones más altas, ordenados de mayor a menor.
+
+    Usa argpartition (O(N)) y solo ordena los k candidatos. En los empates
+    gana el índice menor, así que el resultado no depende del orden interno
+    de argpartition.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+        kth = scores[candidates[0]]
+        if np.count_nonzero(scores >= kth) > k:
+            # Empate en el corte: entran los índices menores con esa puntuación
+            above = np.flatnonzero(scores > kth)
+            candidates = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+        candidates.sort()
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
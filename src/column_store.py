@@ -0,0 +1,49 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class ColumnStore(Mapping):
+    """Columnas alineadas por id de documento que crecen por lotes.
+
+    Cada columna vive en un búfer con capacidad de reserva que se duplica al
+    llenarse (igual que la máscara de DocIdMap): agregar un lote solo copia
+    el lote, salvo en el crecimiento ocasional, así que el costo amortizado
+    es proporcional al lote y no al corpus. Leer una columna devuelve una
+    vista del tramo ocupado, sin copiar.
+    """
+
+    def __init__(self, columns):
+        self._buffers = {key: np.asarray(values) for key, values in columns.items()}
+        sizes = {len(values) for values in self._buffers.values()}
+        if len(sizes) > 1:
+            raise ValueError(f"Columnas de distinto largo: {sizes}")
+        self.size = sizes.pop() if sizes else 0
+        self._views = dict(self._buffers)
+
+    def __getitem__(self, key):
+        return self._views[key]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __len__(self):
+        return len(self._views)
+
+    def append(self, columns):
+        """Agrega un lote (las mismas columnas, un valor por documento nuevo)"""
+        first_id = self.size
+        size = first_id + len(columns[next(iter(self._buffers))])
+        buffers = {}
+        for key, buffer in self._buffers.items():
+            if size > len(buffer):
+                grown = np.empty(max(size, 2 * len(buffer)), dtype=buffer.dtype)
+                grown[:first_id] = buffer[:first_id]
+                buffer = grown
+            buffer[first_id:size] = columns[key]
+            buffers[key] = buffer
+
+        # Las vistas se reemplazan juntas: un lector nunca ve columnas de distinto largo
+        self._buffers = buffers
+        self._views = {key: buffer[:size] for key, buffer in buffers.items()}
+        self.size = size
@@ -0,0 +1,113 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import xxhash
+
+# A partir de este número de archivos se compactan en uno solo al cargar
+MAX_PARTS = 32
+
+
+def content_key(title, text):
+    """Hash de 64 bits de title + text (clave del caché)"""
+    title = title if isinstance(title, str) else ''
+    text = text if isinstance(text, str) else ''
+    return xxhash.xxh64_intdigest(f"{title}\x00{text}".encode('utf-8'))
+
+
+def content_keys(df):
+    """Claves de contenido de cada fila de un DataFrame con columnas title/text"""
+    titles = df['title'].tolist() if 'title' in df.columns else [''] * len(df)
+    return np.fromiter((content_key(title, text) for title, text in zip(titles, df['text'].tolist())),
+                       dtype=np.uint64, count=len(df))
+
+
+class ContentCache:
+    """Caché direccionado por contenido y persistido como Parquet de solo-añadir.
+
+    Cada `version` (configuración del procesamiento) vive en su propio
+    subdirectorio, así que cambiar la lógica invalida el caché sin borrar nada.
+    `flush` escribe solo las entradas nuevas como un archivo part-*.parquet.
+    """
+
+    def __init__(self, cache_dir, columns, version=''):
+        self.columns = list(columns)
+        self.path = os.path.join(cache_dir, f"v-{xxhash.xxh64_hexdigest(version.encode('utf-8'))}")
+        self._fresh = {}
+        self._unflushed = []
+        self.hits = 0
+        self.misses = 0
+        self._base = self._load()
+        self._base_values = self._base.to_numpy()
+
+    def __len__(self):
+        return len(self._base) + sum(1 for key in self._fresh if key not in self._base.index)
+
+    def _part_files(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name for name in os.listdir(self.path) if name.startswith('part-'))
+
+    def _load(self):
+        parts = self._part_files()
+        if not parts:
+            return pd.DataFrame(columns=self.columns, index=pd.Index([], dtype=np.uint64, name='key'))
+
+        table = ds.dataset(self.path, format='parquet').to_table()
+        # Las entradas más recientes ganan
+        frame = table.to_pandas().drop_duplicates('key', keep='last').set_index('key')[self.columns]
+        # Las listas (entidades) vuelven de Parquet como arreglos: se devuelven como las recién calculadas
+        for column in self.columns:
+            if pa.types.is_list(table.schema.field(column).type):
+                frame[column] = [None if values is None else values.tolist() for values in frame[column]]
+
+        if len(parts) > MAX_PARTS:
+            self._write_part(frame.reset_index())
+            for name in parts:
+                os.remove(os.path.join(self.path, name))
+        return frame
+
+    def _write_part(self, frame):
+        os.makedirs(self.path, exist_ok=True)
+        name = f"part-{time.time_ns():020d}.parquet"
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+    def lookup(self, keys):
+        """Máscara de aciertos y DataFrame con los valores de las claves encontradas (en orden)"""
+        keys = np.asarray(keys, dtype=np.uint64)
+        positions = self._base.index.get_indexer(keys) if len(self._base) else np.full(len(keys), -1)
+
+        hit = positions >= 0
+        rows = []
+        for i, key in enumerate(keys.tolist()):
+            if key in self._fresh:
+                hit[i] = True
+                rows.append(self._fresh[key])
+            elif hit[i]:
+                rows.append(tuple(self._base_values[positions[i]]))
+
+        self.hits += int(hit.sum())
+        self.misses += int(len(keys) - hit.sum())
+        return hit, pd.DataFrame(rows, columns=self.columns)
+
+    def put(self, keys, values):
+        """Registra los valores (DataFrame alineado con `keys`) para las claves dadas"""
+        for key, row in zip(np.asarray(keys, dtype=np.uint64).tolist(),
+                            values[self.columns].itertuples(index=False, name=None)):
+            self._fresh[key] = row
+            self._unflushed.append(key)
+
+    def flush(self):
+        """Escribe a disco las entradas añadidas desde el último flush"""
+        if not self._unflushed:
+            return
+        keys = self._unflushed
+        frame = pd.DataFrame([self._fresh[key] for key in keys], columns=self.columns)
+        frame.insert(0, 'key', np.asarray(keys, dtype=np.uint64))
+        self._write_part(frame)
+        self._unflushed = []
@@ -1,179 +1,281 @@
 import pandas as pd
-from datasets import load_dataset
 import re
 import numpy as np
 from datetime import datetime
-from langdetect import detect, DetectorFactory
+import time
+from review_io import read_reviews, write_reviews
+from language_filter import LanguageFilter
+from content_cache import ContentCache, content_keys
 
-DetectorFactory.seed = 0  # Para que el resultado sea consistente
+
+# ---------------------------------------------------------------------------
+# Patrones precompilados. Precios, fechas y modelos usan un patrón por forma y
+# se unen las coincidencias: las formas se solapan y una sola alternancia
+# perdería resultados. Un chequeo barato evita recorrer los textos sin candidatos.
+# ---------------------------------------------------------------------------
+
+# Limpieza: los pasos que no pueden coincidir tras el filtro inicial de
+# caracteres (correos con '@', etiquetas con '<>') ya no se ejecutan
+DISALLOWED_CHARS_PATTERN = re.compile(r"[^a-zA-Z0-9\s\$\€\£\.\,\-/\:\(\)%]")
+# URL y VIDEOID van en pasadas separadas y en este orden: un VIDEOID pegado a
+# una URL solo queda en límite de palabra después de quitar la URL
+URL_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+VIDEOID_PATTERN = re.compile(r'\bVIDEOID:[a-fA-F0-9]{32}\b')
+PHONE_PATTERN = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
+SYMBOLS_PATTERN = re.compile(r'[€£%]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Precios: '2 $10' es '2 $' y también '$10'. Todas las formas exigen un dígito.
+PRICE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'\$\s*(\d+(?:\.\d{2})?)',
+    r'(\d+(?:\.\d{2})?)\s*dollars?',
+    r'(\d+(?:\.\d{2})?)\s*\$',
+    r'price\s*:?\s*\$?\s*(\d+(?:\.\d{2})?)',
+    r'cost\s*:?\s*\$?\s*(\d+(?:\.\d{2})?)',
+    r'paid\s*:?\s*\$?\s*(\d+(?:\.\d{2})?)',
+]]
+DIGIT_PATTERN = re.compile(r'\d')
+
+# Fechas: 'bought on march 3, 2021' es 'bought ...' y también 'march'. Todas
+# las formas exigen un dígito.
+DATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})',
+    r'(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},?\s+\d{2,4}',
+    r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{1,2},?\s+\d{2,4}',
+    r'purchased\s+(?:on\s+)?([a-zA-Z]+\s+\d{1,2},?\s+\d{2,4})',
+    r'bought\s+(?:on\s+)?([a-zA-Z]+\s+\d{1,2},?\s+\d{2,4})',
+    r'ordered\s+(?:on\s+)?([a-zA-Z]+\s+\d{1,2},?\s+\d{2,4})',
+]]
+
+MODEL_LITERALS = [
+    "fit me", "superstay", "instant age rewind", "true match",
+    "infallible", "studio fix", "colorstay", "soft matte",
+    "pro filt’r", "niacinamide", "aha 30%", "bha 2%",
+    "foaming cleanser", "hydro boost", "effaclar duo",
+    "fructis", "keratin smooth", "oil repair", "hair food",
+    "spf50", "spf30", "bb cream", "cc cream",
+    "nc20", "nc30", "nw40", "120 classic ivory",
+    "230", "shade 10", "tono claro",
+]
+
+# Marcas y modelo que las sigue (el grupo es lo que se extrae)
+MODEL_FORMS = [
+    (r"MAC|Urban Decay|Maybelline|L\'Oreal|Revlon|Clinique|Estee Lauder|Dior|Chanel|YSL", r"([A-Z][a-zA-Z0-9\s\-\']+\d*)"),
+    (r'Fender|Gibson|Yamaha|Ibanez|Epiphone|Martin|Taylor', r'([A-Z][a-zA-Z0-9\s\-]+)'),
+    (r'iPhone', r'(\d{1,2}(?:\s+Pro)?(?:\s+Max)?)'),
+    (r'Samsung\s+Galaxy', r'([A-Z]\d{1,2}(?:\+|\s+Ultra)?)'),
+    (r'Google\s+Pixel', r'(\d{1,2}(?:\s+Pro)?)'),
+    # Laptops
+    (r'MacBook', r'(Air|Pro)\s*(\d{2})?'),
+    (r'ThinkPad|Inspiron|Pavilion', r'([A-Z0-9][a-zA-Z0-9\s\-]*)'),
+    # TVs
+    (r'Samsung|LG|Sony', r'(\d{2,3}[\"\']\s*[A-Z0-9]+)'),
+]
+
+# Literales: la búsqueda anticipada prueba cada posición, así que encuentra
+# también los que se solapan ('fructispf50'); ningún literal es prefijo de otro
+MODEL_LITERAL_PATTERN = re.compile(
+    r'(?=(' + '|'.join(re.escape(literal) for literal in MODEL_LITERALS) + r'))', re.IGNORECASE)
+MODEL_LITERAL_ORDER = {literal.casefold(): i for i, literal in enumerate(MODEL_LITERALS)}
+MODEL_PATTERNS = [re.compile(rf'\b(?:{brands})\s+{model}', re.IGNORECASE) for brands, model in MODEL_FORMS]
+
+# Todo modelo empieza con un literal o una marca: sin ninguno no hay nada que buscar
+MODEL_CANDIDATE_PATTERN = re.compile(
+    '|'.join([re.escape(literal) for literal in MODEL_LITERALS] + [brands for brands, _ in MODEL_FORMS]), re.IGNORECASE)
+
+DIGITS_ONLY_PATTERN = re.compile(r'^\d+$')
+
+# Cadena de filtros por defecto, de la etapa más barata a la más cara
+DEFAULT_FILTER_ORDER = ['vacias', 'palabras', 'idioma']
+
+EXTRACTION_COLUMNS = ['extracted_prices', 'extracted_purchase_dates', 'extracted_product_models']
+
+# Lo que se guarda por reseña en el caché de contenido: si pasó los filtros,
+# el texto limpio y las extracciones. Subir la versión al cambiar la limpieza.
+CACHE_COLUMNS = ['keep', 'text'] + EXTRACTION_COLUMNS
+CLEANING_VERSION = '1'
 
 
 class BeautyReviewsCleaner:
-    def __init__(self, file_path):
+    def __init__(self, file_path, language_workers=None, filter_order=None, min_words=30, cache_dir=None):
         self.file_path = file_path
         self.df = None
+        self.language_filter = LanguageFilter(workers=language_workers)
+        self.min_words = min_words
+
+        # Cada filtro recibe la columna de texto y devuelve la máscara de filas que se conservan
+        self.filters = {
+            'vacias': self._filter_empty,
+            'palabras': self._filter_word_count,
+            'idioma': self._filter_language,
+        }
+        self.filter_order = list(filter_order or DEFAULT_FILTER_ORDER)
+        self.filter_stats = []
+        self.cache_dir = cache_dir
+        self.cache = None
 
     def load_data(self):
         try:
-            self.df = pd.read_csv(self.file_path)
+            self.df = read_reviews(self.file_path)
             print(f"Dataset cargado exitosamente: {self.df.shape[0]} filas, {self.df.shape[1]} columnas")
             return True
         except Exception as e:
             print(f"Error al cargar el dataset: {e}")
             return False
 
+    def add_filter(self, name, mask_fn, position=None):
+        """Registra un filtro adicional; por defecto se ejecuta al final de la cadena"""
+        self.filters[name] = mask_fn
+        if name in self.filter_order:
+            self.filter_order.remove(name)
+        if position is None:
+            self.filter_order.append(name)
+        else:
+            self.filter_order.insert(position, name)
+
+    def _filter_empty(self, texts):
+        return texts.fillna('').astype(str).str.len() > 0
+
+    def _filter_word_count(self, texts):
+        return texts.fillna('').astype(str).str.count(r'\S+') >= self.min_words
+
+    def _filter_language(self, texts):
+        return self.language_filter.english_mask(texts.tolist())
+
+    def apply_filters(self, df):
+        """Aplica la cadena de filtros en orden y registra filas eliminadas y tiempo por etapa"""
+        self.filter_stats = []
+        for name in self.filter_order:
+            start_time = time.time()
+            before = len(df)
+            mask = np.asarray(self.filters[name](df['text']), dtype=bool)
+            df = df[mask]
+            elapsed = time.time() - start_time
+            self.filter_stats.append({
+                'filtro': name,
+                'eliminadas': before - len(df),
+                'restantes': len(df),
+                'segundos': elapsed,
+            })
+            print(f"Filtro '{name}': {before - len(df)} reviews eliminadas en {elapsed:.2f} s "
+                  f"(quedan {len(df)})")
+        return df
+
     def is_english(self, text):
-        try:
-            return detect(text) == 'en'
-        except:
-            return False
+        return self.language_filter.is_english(text)
 
     def clean_text(self, text):
         if pd.isna(text) or text == '':
             return ''
         text = str(text)
-        text = re.sub(r"[^a-zA-Z0-9\s\$\€\£\.\,\-/\:\(\)%]", " ", text)
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        text = re.sub(r'\bVIDEOID:[a-fA-F0-9]{32}\b', '', text)
-        text = re.sub(r"\s+", " ", text)
-        text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
-        text = re.sub(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', '', text)
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'[^\w\s\.\,\!\?\-\'\/\$\:\(\)]', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        return text
+        text = DISALLOWED_CHARS_PATTERN.sub(' ', text)
+        text = URL_PATTERN.sub('', text)
+        text = VIDEOID_PATTERN.sub('', text)
+        text = PHONE_PATTERN.sub('', text)
+        text = SYMBOLS_PATTERN.sub(' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
+        return text.strip()
 
     def extract_prices(self, text):
         if pd.isna(text) or text == '':
             return ''
-        price_patterns = [
-            r'\$\s*(\d+(?:\.\d{2})?)',
-            r'(\d+(?:\.\d{2})?)\s*dollars?',
-            r'(\d+(?:\.\d{2})?)\s*\$',
-            r'price\s*:?\s*\$?\s*(\d+(?:\.\d{2})?)',
-            r'cost\s*:?\s*\$?\s*(\d+(?:\.\d{2})?)',
-            r'paid\s*:?\s*\$?\s*(\d+(?:\.\d{2})?)',
-        ]
-        prices = []
-        text_lower = text.lower()
-        for pattern in price_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            prices.extend([match for match in matches if match])
-        unique_prices = list(set([float(p) for p in prices if p]))
-        unique_prices.sort()
-        return ', '.join([f'${p:.2f}' for p in unique_prices])
+        if not DIGIT_PATTERN.search(text):
+            return ''
+        prices = {float(price) for pattern in PRICE_PATTERNS for price in pattern.findall(text)}
+        return ', '.join([f'${p:.2f}' for p in sorted(prices)])
 
     def extract_purchase_dates(self, text):
         if pd.isna(text) or text == '':
             return ''
-        date_patterns = [
-            r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})',
-            r'(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2},?\s+\d{2,4}',
-            r'(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{1,2},?\s+\d{2,4}',
-            r'purchased\s+(?:on\s+)?([a-zA-Z]+\s+\d{1,2},?\s+\d{2,4})',
-            r'bought\s+(?:on\s+)?([a-zA-Z]+\s+\d{1,2},?\s+\d{2,4})',
-            r'ordered\s+(?:on\s+)?([a-zA-Z]+\s+\d{1,2},?\s+\d{2,4})',
-        ]
-        dates = []
+        if not DIGIT_PATTERN.search(text):
+            return ''
         text_lower = text.lower()
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            dates.extend([match.strip() for match in matches if match.strip()])
-        unique_dates = list(set(dates))
-        return ', '.join(unique_dates)
+        dates = {date.strip() for pattern in DATE_PATTERNS for date in pattern.findall(text_lower) if date.strip()}
+        return ', '.join(dates)
 
     def extract_product_models(self, text):
         if pd.isna(text) or text == '':
             return ''
-        model_patterns = [
-            "fit me", "superstay", "instant age rewind", "true match",
-            "infallible", "studio fix", "colorstay", "soft matte",
-            "pro filt’r", "niacinamide", "aha 30%", "bha 2%",
-            "foaming cleanser", "hydro boost", "effaclar duo",
-            "fructis", "keratin smooth", "oil repair", "hair food",
-            "spf50", "spf30", "bb cream", "cc cream",
-            "nc20", "nc30", "nw40", "120 classic ivory",
-            "230", "shade 10", "tono claro",
-            r'\b(?:MAC|Urban Decay|Maybelline|L\'Oreal|Revlon|Clinique|Estee Lauder|Dior|Chanel|YSL)\s+([A-Z][a-zA-Z0-9\s\-\']+\d*)',
-            r'\b(?:Fender|Gibson|Yamaha|Ibanez|Epiphone|Martin|Taylor)\s+([A-Z][a-zA-Z0-9\s\-]+)',
-            r'\b(?:iPhone)\s+(\d{1,2}(?:\s+Pro)?(?:\s+Max)?)',
-        r'\b(?:Samsung\s+Galaxy)\s+([A-Z]\d{1,2}(?:\+|\s+Ultra)?)',
-        r'\b(?:Google\s+Pixel)\s+(\d{1,2}(?:\s+Pro)?)',
-        # Laptops
-        r'\b(?:MacBook)\s+(Air|Pro)\s*(\d{2})?',
-        r'\b(?:ThinkPad|Inspiron|Pavilion)\s+([A-Z0-9][a-zA-Z0-9\s\-]*)',
-        # TVs
-        r'\b(?:Samsung|LG|Sony)\s+(\d{2,3}[\"\']\s*[A-Z0-9]+)'
-        ]
-        models = []
-        for pattern in model_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                # Si es tupla (varios grupos), toma los no vacíos
-                if isinstance(match, tuple):
-                    for m in match:
-                        if m and isinstance(m, str) and m.strip() and len(m.strip()) > 1:
-                            models.append(m.strip())
-                else:
-                    if match and isinstance(match, str) and match.strip() and len(match.strip()) > 1:
-                        models.append(match.strip())
-        clean_models = []
-        for model in models:
-            if not re.match(r'^\d+$', model):
-                clean_models.append(model)
-        unique_models = list(set(clean_models))
-        return ', '.join(unique_models[:5])
+        if not MODEL_CANDIDATE_PATTERN.search(text):
+            return ''
+        # Literales en el orden de la lista y luego las marcas: el mismo orden de
+        # inserción que un patrón por literal, así que los 5 elegidos no cambian
+        literals = sorted(MODEL_LITERAL_PATTERN.findall(text), key=lambda literal: MODEL_LITERAL_ORDER.get(literal.casefold(), 0))
+        models = set()
+        for model in literals + [model for pattern in MODEL_PATTERNS
+                                 for match in pattern.finditer(text) for model in match.groups()]:
+            # Un patrón puede tener varios grupos (MacBook): se toman los no vacíos
+            if model and len(model.strip()) > 1 and not DIGITS_ONLY_PATTERN.match(model.strip()):
+                models.add(model.strip())
+        return ', '.join(list(models)[:5])
+
+    def extract_all(self, text):
+        """Precios, fechas y modelos de un texto en una sola llamada"""
+        return self.extract_prices(text), self.extract_purchase_dates(text), self.extract_product_models(text)
 
     def process_reviews(self):
         if self.df is None:
             print("Error: Debe cargar el dataset primero")
             return
         print("Iniciando procesamiento de reviews...")
-        processed_df = self.df.copy()
-
-        print("Filtrando reviews no escritas en inglés...")
-        english_mask = processed_df['text'].apply(self.is_english)
-        initial_lang_count = len(processed_df)
-        processed_df = processed_df[english_mask]
-        lang_filtered_count = len(processed_df)
-        print(f"Reviews eliminadas por no estar en inglés: {initial_lang_count - lang_filtered_count}")
-
-        # Eliminar textos vacíos
-        processed_df = processed_df[processed_df['text'].str.len() > 0]
+        df = self.df.reset_index(drop=True)
 
-        # Eliminar textos con menos de 150 palabras
-        print("Eliminando reviews con menos de 30 palabras...")
-        processed_df = processed_df[processed_df['text'].apply(lambda x: len(x.split())) >= 30]
-        print("Extrayendo precios...")
-        processed_df['extracted_prices'] = processed_df['text'].apply(self.extract_prices)
+        # Solo se procesan las reseñas nuevas o modificadas; el resto sale del caché
+        cached_df = None
+        if self.cache_dir:
+            self.cache = self._open_cache()
+            keys = content_keys(df)
+            hit, cached = self.cache.lookup(keys)
+            print(f"Caché de contenido: {hit.sum()} reseñas sin cambios, {(~hit).sum()} nuevas o modificadas")
+            cached_df = df[hit].copy()
+            cached.index = cached_df.index
+            cached_df[CACHE_COLUMNS[1:]] = cached[CACHE_COLUMNS[1:]]
+            cached_df = cached_df[cached['keep'].astype(bool)]
+            df = df[~hit]
 
-        print("Extrayendo fechas de compra...")
-        processed_df['extracted_purchase_dates'] = processed_df['text'].apply(self.extract_purchase_dates)
+        processed_df = self._process_new_reviews(df)
 
-        print("Extrayendo modelos de productos...")
-        processed_df['extracted_product_models'] = processed_df['text'].apply(self.extract_product_models)
+        if self.cache is not None:
+            values = pd.DataFrame({'keep': df.index.isin(processed_df.index)}, index=df.index)
+            values[CACHE_COLUMNS[1:]] = ''
+            values.loc[processed_df.index, CACHE_COLUMNS[1:]] = processed_df[CACHE_COLUMNS[1:]]
+            self.cache.put(keys[~hit], values)
+            self.cache.flush()
+            if len(cached_df) and len(processed_df):
+                processed_df = pd.concat([cached_df, processed_df]).sort_index()
+            elif len(cached_df):
+                # Sin reseñas nuevas el lote procesado está vacío (columnas object): no se mezcla
+                processed_df = cached_df
 
-        print("Limpiando texto (manteniendo números y símbolos para precios/fechas)...")
-        processed_df['text'] = processed_df['text'].apply(self.clean_text)
+        print("Procesamiento completado.")
+        for stats in self.filter_stats:
+            print(f"  - {stats['filtro']}: {stats['eliminadas']} eliminadas ({stats['segundos']:.2f} s)")
+        print(f"Reviews finales: {len(processed_df)}")
 
-        initial_count = len(processed_df)
+        self.df = processed_df
 
-        
+    def _open_cache(self):
+        version = f"{CLEANING_VERSION}|{','.join(self.filter_order)}|{self.min_words}"
+        return ContentCache(self.cache_dir, CACHE_COLUMNS, version=version)
 
-        final_count = len(processed_df)
+    def _process_new_reviews(self, df):
+        """Filtros, extracción y limpieza sobre las reseñas que no están en caché"""
+        print(f"Aplicando filtros en orden: {' -> '.join(self.filter_order)}")
+        processed_df = self.apply_filters(df.copy())
 
-        print("Procesamiento completado.")
-        print(f"Reviews removidas por quedar vacías o tener menos de 50 palabras: {initial_count - final_count}")
-        print(f"Reviews finales: {final_count}")
+        print("Extrayendo precios, fechas de compra y modelos de productos...")
+        extracted = [self.extract_all(text) for text in processed_df['text']]
+        processed_df[EXTRACTION_COLUMNS] = pd.DataFrame(extracted, index=processed_df.index, columns=EXTRACTION_COLUMNS)
 
-        self.df = processed_df
+        print("Limpiando texto (manteniendo números y símbolos para precios/fechas)...")
+        processed_df['text'] = processed_df['text'].apply(self.clean_text)
+        return processed_df
 
-    def save_processed_data(self, output_path='Data/processed_data/Electronics_processed.csv'):
+    def save_processed_data(self, output_path='Data/processed_data/Electronics_processed.parquet'):
         if self.df is None:
             print("Error: No hay datos para guardar")
             return
-        self.df.to_csv(output_path, index=False)
+        write_reviews(self.df, output_path)
         print(f"Dataset procesado guardado en: {output_path}")
         print(f"\nColumnas en el archivo procesado:")
         for col in self.df.columns:
@@ -198,7 +300,7 @@ class BeautyReviewsCleaner:
 
 
 def main():
-    cleaner = BeautyReviewsCleaner('Electronics.csv')
+    cleaner = BeautyReviewsCleaner('Data/Raw_data/reviews/category=Electronics', cache_dir='Data/cache/cleaning')
     if not cleaner.load_data():
         return
     cleaner.process_reviews()
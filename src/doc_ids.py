@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class DocIdMap:
+    """Ids de documento estables compartidos por el índice BM25, las
+    características precalculadas, los índices de entidades y el grafo.
+
+    El id de una reseña es su posición en el DataFrame y en todos los
+    arreglos columnares, y nunca se reutiliza. Borrar una reseña deja una
+    lápida: la fila conserva su id, pero queda fuera de resultados, filtros
+    y grafo.
+    """
+
+    def __init__(self, size=0):
+        self.size = size
+        self._alive = np.ones(size, dtype=bool)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def alive(self):
+        """Máscara de documentos vigentes (True = no borrado)"""
+        return self._alive[:self.size]
+
+    @property
+    def n_alive(self):
+        return int(self.alive.sum())
+
+    def allocate(self, count):
+        """Reserva `count` ids nuevos a continuación de los existentes"""
+        first_id = self.size
+        self.size += count
+        if self.size > len(self._alive):
+            # Crecimiento amortizado: los lotes pequeños no copian la máscara cada vez
+            alive = np.ones(max(self.size, 2 * len(self._alive)), dtype=bool)
+            alive[:first_id] = self._alive[:first_id]
+            self._alive = alive
+        return range(first_id, self.size)
+
+    def delete(self, doc_ids):
+        """Marca ids como borrados; devuelve los que estaban vigentes"""
+        doc_ids = np.unique(np.asarray(doc_ids, dtype=np.int64))
+        if len(doc_ids) and (doc_ids[0] < 0 or doc_ids[-1] >= self.size):
+            raise IndexError(f"Id de documento fuera de rango (0..{self.size - 1})")
+        deleted = doc_ids[self._alive[doc_ids]]
+        self._alive[deleted] = False
+        return deleted
+
+    def is_alive(self, doc_id):
+        return 0 <= doc_id < self.size and bool(self._alive[doc_id])
+
+    def live(self, doc_ids):
+        """Filtra los ids borrados (conserva el orden)"""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        return doc_ids[self._alive[doc_ids]]
+
+    def check(self, **sizes):
+        """Verifica que cada componente tenga exactamente un elemento por id"""
+        mismatched = {name: size for name, size in sizes.items() if size != self.size}
+        if mismatched:
+            raise ValueError(f"Ids de documento desalineados (se esperaban {self.size}): {mismatched}")
@@ -0,0 +1,215 @@
+import json
+import os
+import re
+import shutil
+from collections import defaultdict
+
+import marisa_trie
+import numpy as np
+
+from bm25_index import pick_merge, source_signature
+
+# Lotes agregados de tamaño parecido que se fusionan en uno (como los segmentos de BM25)
+MERGE_FACTOR = 4
+
+# Versión del formato en disco; si cambia, los índices viejos se reconstruyen
+FORMAT_VERSION = 1
+
+
+def normalize_entity(text):
+    """Normaliza una entidad: minúsculas y espacios colapsados"""
+    return re.sub(r'\s+', ' ', str(text).lower()).strip()
+
+
+def split_entities(value):
+    """Convierte el valor de una columna ner_* en lista de entidades normalizadas"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    entities = [normalize_entity(entity) for entity in value]
+    return [entity for entity in entities if entity and entity not in ('nan', 'n/a')]
+
+
+class EntityIndex:
+    """Índice invertido de entidades (columna ner_*) -> ids de reseñas ordenados.
+
+    Cada entidad se indexa completa y también a partir de cada una de sus
+    palabras ("samsung galaxy s21", "galaxy s21", "s21"), de modo que una
+    búsqueda por prefijo en el trie encuentra la entidad aunque la consulta
+    empiece a mitad del nombre. Los ids se guardan en formato CSR
+    (indptr + doc_ids) indexado por el id de la clave en el trie.
+    """
+
+    def __init__(self, values, first_id=0):
+        postings = defaultdict(set)
+        for doc_id, value in enumerate(values, start=first_id):
+            for entity in split_entities(value):
+                words = entity.split(' ')
+                for i in range(len(words)):
+                    postings[' '.join(words[i:])].add(doc_id)
+
+        self._set_postings({key: sorted(docs) for key, docs in postings.items()}, first_id, first_id + len(values))
+
+    @classmethod
+    def merge(cls, indexes):
+        """Une índices de lotes consecutivos en uno solo (mismas respuestas de lookup)"""
+        postings = defaultdict(list)
+        for index in indexes:
+            for key, key_id in index.trie.items():
+                postings[key].append(index.doc_ids[index.indptr[key_id]:index.indptr[key_id + 1]])
+
+        merged = cls.__new__(cls)
+        merged._set_postings({key: np.concatenate(ids) for key, ids in postings.items()},
+                             indexes[0].first_id, indexes[-1].size)
+        return merged
+
+    def _set_postings(self, postings, first_id, size):
+        """Arma el trie y el CSR a partir de clave -> ids ordenados"""
+        self.first_id = first_id
+        self.size = size
+        # Índices de los lotes agregados después (ver add)
+        self.deltas = []
+
+        self.trie = marisa_trie.Trie(postings.keys())
+        doc_freq = np.zeros(len(self.trie), dtype=np.int64)
+        for key, ids in postings.items():
+            doc_freq[self.trie[key]] = len(ids)
+
+        self.indptr = np.zeros(len(self.trie) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=self.indptr[1:])
+        self.doc_ids = np.zeros(self.indptr[-1], dtype=np.int32)
+        for key, ids in postings.items():
+            key_id = self.trie[key]
+            self.doc_ids[self.indptr[key_id]:self.indptr[key_id + 1]] = ids
+
+    def save(self, index_dir):
+        """Guarda el trie y el CSR (sin los lotes agregados)"""
+        os.makedirs(index_dir, exist_ok=True)
+        self.trie.save(os.path.join(index_dir, 'keys.marisa'))
+        np.save(os.path.join(index_dir, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(index_dir, 'doc_ids.npy'), self.doc_ids)
+
+    @classmethod
+    def load(cls, index_dir, size):
+        """Carga un índice guardado con numpy.memmap (ids de 0 a size)"""
+        index = cls.__new__(cls)
+        index.first_id = 0
+        index.size = size
+        index.deltas = []
+        index.trie = marisa_trie.Trie()
+        index.trie.mmap(os.path.join(index_dir, 'keys.marisa'))
+        index.indptr = np.load(os.path.join(index_dir, 'indptr.npy'), mmap_mode='r')
+        index.doc_ids = np.load(os.path.join(index_dir, 'doc_ids.npy'), mmap_mode='r')
+        return index
+
+    @property
+    def n_docs(self):
+        return self.size - self.first_id
+
+    def add(self, values):
+        """Indexa un lote de reseñas nuevas (ids a continuación de las existentes).
+
+        El lote se indexa aparte; lookup concatena los resultados, que siguen
+        ordenados porque los ids de cada lote son mayores que los anteriores.
+        Los lotes de tamaño parecido se fusionan (pick_merge, igual que los
+        segmentos de BM25), así que lookup recorre O(log) lotes.
+        """
+        delta = EntityIndex(values, first_id=self.size)
+        deltas = self.deltas + [delta]
+        run = pick_merge(deltas, MERGE_FACTOR)
+        while run is not None:
+            start = next(i for i, index in enumerate(deltas) if index is run[0])
+            deltas[start:start + len(run)] = [EntityIndex.merge(run)]
+            run = pick_merge(deltas, MERGE_FACTOR)
+
+        # Lista nueva: un lookup en curso sigue con la anterior
+        self.deltas = deltas
+        self.size = delta.size
+        return delta
+
+    def lookup(self, query, prefix=True):
+        """Ids (ordenados, sin repetir) de las reseñas cuya entidad coincide con `query`"""
+        ids = self._lookup(query, prefix)
+        if not self.deltas:
+            return ids
+        return np.concatenate([ids] + [delta._lookup(query, prefix) for delta in self.deltas])
+
+    def _lookup(self, query, prefix):
+        query = normalize_entity(query)
+        if not query:
+            return np.zeros(0, dtype=np.int32)
+
+        if prefix:
+            key_ids = [self.trie[key] for key in self.trie.keys(query)]
+        else:
+            key_ids = [self.trie[query]] if query in self.trie else []
+
+        if not key_ids:
+            return np.zeros(0, dtype=np.int32)
+        if len(key_ids) == 1:
+            key_id = key_ids[0]
+            return self.doc_ids[self.indptr[key_id]:self.indptr[key_id + 1]]
+
+        return np.unique(np.concatenate([
+            self.doc_ids[self.indptr[key_id]:self.indptr[key_id + 1]] for key_id in key_ids
+        ]))
+
+
+def intersect_ids(id_arrays):
+    """Intersección de varios arreglos de ids ordenados (empezando por el más corto)"""
+    id_arrays = sorted(id_arrays, key=len)
+    result = id_arrays[0]
+    for ids in id_arrays[1:]:
+        if not len(result):
+            break
+        result = np.intersect1d(result, ids, assume_unique=True)
+    return result
+
+
+def save_indexes(indexes, index_dir, source_path=None):
+    """Guarda {nombre: EntityIndex} en subdirectorios de index_dir y los devuelve cargados desde disco"""
+    meta = {
+        'version': FORMAT_VERSION,
+        'n_docs': max((index.size for index in indexes.values()), default=0),
+        'names': sorted(indexes),
+        'source': source_signature(source_path),
+    }
+
+    # Directorio temporal y renombrado, igual que BM25Index.build
+    tmp_dir = f"{index_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, index in indexes.items():
+        index.save(os.path.join(tmp_dir, name))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+    return load_indexes(index_dir)
+
+
+def load_indexes(index_dir):
+    """Carga los índices guardados con save_indexes"""
+    with open(os.path.join(index_dir, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    return {name: EntityIndex.load(os.path.join(index_dir, name), meta['n_docs']) for name in meta['names']}
+
+
+def load_or_build_indexes(index_dir, build_fn, source_path=None):
+    """Carga los índices si están al día con el archivo fuente; si no, los construye con `build_fn` y los guarda"""
+    meta_path = os.path.join(index_dir, 'meta.json')
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = {}
+
+    if meta.get('version') == FORMAT_VERSION and meta.get('source') == source_signature(source_path):
+        try:
+            return load_indexes(index_dir)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Índices de entidades dañados, se reconstruirán: {e}")
+
+    return save_indexes(build_fn(), index_dir, source_path=source_path)
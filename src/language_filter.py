@@ -0,0 +1,132 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import xxhash
+from langdetect import detect, DetectorFactory
+
+DetectorFactory.seed = 0  # Para que el resultado sea consistente (también en los workers)
+
+# Palabras vacías propias del inglés (se excluyen las que comparte con español,
+# francés o portugués, como "a", "no" o "me")
+ENGLISH_MARKERS = frozenset([
+    'the', 'and', 'is', 'it', 'this', 'that', 'was', 'for', 'with', 'you', 'have',
+    'not', 'but', 'are', 'they', 'be', 'my', 'of', 'to', 'in', 'on', 'i', 'very',
+    'so', 'would', 'at', 'if', 'or', 'just', 'all', 'these', 'will', 'which',
+    'from', 'has', 'had', 'were', 'there', 'their', 'what', 'when', 'it\'s', 'its',
+    'them', 'than', 'been', 'after', 'really', 'does', 'did', 'because',
+])
+
+WORD_PATTERN = re.compile(r"[a-z']+")
+
+# Por debajo de este número de textos pendientes no compensa arrancar procesos
+MIN_PARALLEL_TEXTS = 2000
+
+
+def text_hash(text):
+    """Hash de 64 bits del texto (clave del caché de veredictos)"""
+    return xxhash.xxh64_intdigest(text.encode('utf-8'))
+
+
+def is_obviously_english(text, min_words=8, min_ascii_ratio=0.98, min_marker_ratio=0.3):
+    """Pre-chequeo barato: texto casi todo ASCII con muchas palabras vacías inglesas.
+
+    Solo decide el caso claro (True); si devuelve False hay que consultar langdetect.
+    """
+    if not text:
+        return False
+    ascii_count = len(text.encode('ascii', 'ignore'))
+    if ascii_count / len(text) < min_ascii_ratio:
+        return False
+
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < min_words:
+        return False
+    markers = sum(1 for word in words if word in ENGLISH_MARKERS)
+    return markers / len(words) >= min_marker_ratio
+
+
+def detect_english(text):
+    """Veredicto de langdetect (función de módulo para poder usarla en el pool)"""
+    try:
+        return detect(text) == 'en'
+    except Exception:
+        return False
+
+
+class LanguageFilter:
+    """Filtro de idioma en paralelo con caché de veredictos por hash del texto"""
+
+    def __init__(self, workers=None, chunksize=256):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.cache = {}
+        self.stats = {}
+
+    def is_english(self, text):
+        """Veredicto para un único texto (usa el mismo caché)"""
+        if not isinstance(text, str) or not text:
+            return False
+        key = text_hash(text)
+        if key not in self.cache:
+            self.cache[key] = is_obviously_english(text) or detect_english(text)
+        return self.cache[key]
+
+    def english_mask(self, texts):
+        """Máscara booleana de los textos en inglés.
+
+        Orden de resolución: caché (incluye duplicados dentro del lote),
+        pre-chequeo barato y, para el resto, langdetect en un pool de procesos.
+        """
+        start_time = time.time()
+        verdicts = np.zeros(len(texts), dtype=bool)
+
+        # Agrupar textos idénticos: cada texto distinto se evalúa una sola vez
+        positions_by_hash = {}
+        text_by_hash = {}
+        for position, text in enumerate(texts):
+            if not isinstance(text, str) or not text:
+                continue
+            key = text_hash(text)
+            positions_by_hash.setdefault(key, []).append(position)
+            text_by_hash.setdefault(key, text)
+
+        cached = 0
+        prechecked = 0
+        pending_keys = []
+        for key, text in text_by_hash.items():
+            if key in self.cache:
+                cached += 1
+            elif is_obviously_english(text):
+                self.cache[key] = True
+                prechecked += 1
+            else:
+                pending_keys.append(key)
+
+        pending_texts = [text_by_hash[key] for key in pending_keys]
+        if len(pending_texts) >= MIN_PARALLEL_TEXTS and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(detect_english, pending_texts, chunksize=self.chunksize))
+        else:
+            results = [detect_english(text) for text in pending_texts]
+        self.cache.update(zip(pending_keys, results))
+
+        for key, positions in positions_by_hash.items():
+            verdicts[positions] = self.cache[key]
+
+        elapsed = time.time() - start_time
+        self.stats = {
+            'rows': len(texts),
+            'unique_texts': len(text_by_hash),
+            'cache_hits': cached,
+            'prechecked': prechecked,
+            'langdetect': len(pending_texts),
+            'seconds': elapsed,
+            'rows_per_second': len(texts) / elapsed if elapsed > 0 else float('inf'),
+        }
+        print(f"Filtro de idioma: {len(texts)} filas en {elapsed:.2f} s "
+              f"({self.stats['rows_per_second']:.0f} filas/s) | únicos: {len(text_by_hash)}, "
+              f"caché: {cached}, pre-chequeo: {prechecked}, langdetect: {len(pending_texts)}")
+        return verdicts
@@ -0,0 +1,32 @@
+import numpy as np
+
+
+class LexiconMatcher:
+    """Vocabulario de palabras clave compilado una sola vez y compartido.
+
+    Reúne sin repetir las palabras de varios diccionarios; como `word in
+    text`, las coincidencias son por subcadena. Cada palabra distinta se busca
+    una sola vez por texto y las categorías (sentimiento, problemas,
+    intención...) se derivan de los aciertos, así que una categoría nueva que
+    reutiliza palabras no agrega búsquedas.
+    """
+
+    def __init__(self, words):
+        self.words = sorted({word for word in words if word})
+        self.column = {word: i for i, word in enumerate(self.words)}
+
+    def find(self, text):
+        """Conjunto de palabras del vocabulario que aparecen en `text`"""
+        return {word for word in self.words if word in text}
+
+    def hit_matrix(self, texts):
+        """Matriz booleana textos x palabras (columna según `self.column`).
+
+        Se llena por palabra: cada columna es un recorrido del corpus con la
+        búsqueda de subcadenas nativa de str, sin pasar por pandas.
+        """
+        texts = list(texts)
+        matrix = np.empty((len(texts), len(self.words)), dtype=bool, order='F')
+        for word, column in self.column.items():
+            matrix[:, column] = np.fromiter((word in text for text in texts), dtype=bool, count=len(texts))
+        return matrix
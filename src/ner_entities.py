@@ -1,20 +1,113 @@
 import pandas as pd
 import re
-import spacy
 import time
+import os
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pyarrow.dataset as ds
+import xxhash
+from review_io import write_reviews
+from content_cache import ContentCache, content_keys
+from nlp_profiles import load_profile, pipe_entities, MODEL_NAME
+
+# Solo se necesita el NER: perfil sin tagger, lematizador, attribute_ruler ni parser
+NLP_PROFILE = 'entities-only'
+
+# Etiqueta de spaCy -> columna de salida
+ENTITY_COLUMNS = {
+    'PRODUCT': 'ner_products',
+    'ORG': 'ner_brands',
+    'GPE': 'ner_locations',
+    'PERSON': 'ner_persons',
+}
+
+# Estado de reanudación dentro del directorio de salida (pyarrow ignora los
+# archivos que empiezan por '_' o '.', así que no interfiere al leer el dataset)
+CHECKPOINT_FILE = '_checkpoint.json'
+
+# Modelo cargado una sola vez en cada proceso worker
+_worker_nlp = None
+
+
+def _init_worker(profile, model_name):
+    global _worker_nlp
+    _worker_nlp = load_profile(profile, model_name)
+
+
+def extract_entities(entities):
+    """Entidades (texto, etiqueta) agrupadas por columna (listas ordenadas y sin repetir)"""
+    found = {column: set() for column in ENTITY_COLUMNS.values()}
+    for text, label in entities:
+        column = ENTITY_COLUMNS.get(label)
+        if column:
+            found[column].add(text.strip())
+    return {column: sorted(values) for column, values in found.items()}
+
+
+def _process_shard(texts, batch_size):
+    """Ejecuta NER sobre un fragmento dentro del worker y devuelve solo las entidades.
+
+    Los Doc se consumen uno a uno y se descartan: al proceso principal solo
+    vuelven listas de strings, nunca los Doc completos.
+    """
+    return [extract_entities(ents) for ents in pipe_entities(_worker_nlp, texts, batch_size=batch_size)]
+
+
+def build_full_texts(df):
+    """Combina title y text para análisis"""
+    title = df['title'].fillna('') if 'title' in df.columns else pd.Series('', index=df.index)
+    return (title.astype(str) + '. ' + df['text'].fillna('').astype(str)).str.strip().tolist()
+
+
+def _fsync_path(path):
+    """Fuerza a disco el contenido de un archivo ya escrito"""
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def input_fingerprint(paths):
+    """Hash xxh64 del contenido de los archivos de entrada (leídos en bloques de 1 MiB)"""
+    digest = xxhash.xxh64()
+    for path in sorted(paths):
+        digest.update(path.encode('utf-8') + b'\x00')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 
 class BeautyReviewsCleaner:
-    def __init__(self):
+    def __init__(self, cache_dir=None, model_name=MODEL_NAME):
         print("Inicializando el procesador (solo modelo EN)...")
         self.nlp_en = None
+        self.model_name = model_name
+
+        # Entidades por hash de title + text: las reseñas sin cambios no vuelven a pasar por el modelo
+        self.cache = None
+        if cache_dir:
+            self.cache = ContentCache(cache_dir, list(ENTITY_COLUMNS.values()),
+                                      version=f"{model_name}|{NLP_PROFILE}")
+            print(f"Caché de entidades: {len(self.cache)} reseñas en '{cache_dir}'")
 
         try:
-            self.nlp_en = spacy.load('en_core_web_sm', disable=['parser'])
-            print("Modelo en INGLÉS ('en_core_web_sm') cargado.")
+            self.nlp_en = load_profile(NLP_PROFILE, model_name)
+            print(f"Modelo en INGLÉS ('{model_name}', perfil '{NLP_PROFILE}') cargado.")
         except OSError as e:
             print(f"Error al cargar el modelo: {e}")
 
-    def process_reviews(self, df):
+    def process_reviews(self, df, batch_size=500):
+        """NER en memoria para DataFrames pequeños (los Doc se consumen de forma perezosa)"""
         if not self.nlp_en:
             print("Error: El modelo de spaCy no está cargado.")
             return None
@@ -22,83 +115,195 @@ class BeautyReviewsCleaner:
         if 'text' not in df.columns:
             print("Error: El DataFrame debe contener una columna llamada 'text'.")
             return None
-        
+
         if 'title' not in df.columns:
             print("Advertencia: La columna 'title' no fue encontrada. Se usará solo 'text'.")
-            df['title'] = ''
 
-        # Combinar title y text para análisis
-        df['full_text'] = (df['title'].fillna('') + '. ' + df['text'].fillna('')).str.strip()
+        keys, hit, cached = self._lookup_cache(df)
+        texts = [text for text, is_cached in zip(build_full_texts(df), hit) if not is_cached]
+        print(f"Iniciando procesamiento de {len(texts)} textos ({hit.sum()} desde caché)...")
+        start_time = time.time()
+
+        results_list = [extract_entities(ents) for ents in pipe_entities(self.nlp_en, texts, batch_size=batch_size)]
+
+        end_time = time.time()
+        print(f"Procesamiento completado en {end_time - start_time:.2f} segundos.")
+
+        processed_df = self._merge_cached(df.index, keys, hit, cached, results_list)
+        if self.cache is not None:
+            self.cache.flush()
+        return pd.concat([df, processed_df], axis=1)
+
+    def _lookup_cache(self, df):
+        """Claves de contenido, máscara de aciertos y entidades ya conocidas de un fragmento"""
+        if self.cache is None:
+            return None, np.zeros(len(df), dtype=bool), None
+        keys = content_keys(df)
+        hit, cached = self.cache.lookup(keys)
+        return keys, hit, cached
+
+    def _merge_cached(self, index, keys, hit, cached, results_list):
+        """Une entidades del caché y recién calculadas en el orden original (y registra las nuevas)"""
+        columns = list(ENTITY_COLUMNS.values())
+        computed = pd.DataFrame(results_list, columns=columns)
+        if self.cache is None:
+            computed.index = index
+            return computed
+
+        self.cache.put(keys[~hit], computed)
+        computed.index = np.flatnonzero(~hit)
+        cached.index = np.flatnonzero(hit)
+        entities = computed
+        if hit.any():
+            entities = pd.concat([cached, computed]).sort_index()
+        entities.index = index
+        return entities
+
+    def process_file_streaming(self, input_path, output_dir, chunk_size=5000, n_process=None,
+                               batch_size=500, resume=True):
+        """NER por fragmentos con memoria acotada, escribiendo cada fragmento a disco.
+
+        La entrada se lee por lotes de `chunk_size` filas, cada lote se procesa
+        en un worker (que carga su propio modelo) y el resultado se guarda como
+        <output_dir>/part-NNNNNNNNN.parquet en cuanto está listo. Como mucho hay
+        2 * n_process fragmentos en vuelo, así que el uso de memoria no depende
+        del tamaño del corpus.
 
-        texts = df['full_text'].tolist()
-        results_list = []
+        Tras cada fragmento se registra en _checkpoint.json el último offset
+        completado; con `resume=True` una ejecución interrumpida continúa
+        desde ese punto en lugar de empezar de cero. El checkpoint guarda un
+        hash del contenido de la entrada: si la entrada se regeneró (aunque
+        tenga las mismas filas) se empieza de cero en lugar de mezclar
+        fragmentos viejos con nuevos.
+        """
+        n_process = n_process or os.cpu_count() or 1
 
+        dataset = ds.dataset(input_path, format='parquet', partitioning='hive')
+        total_rows = dataset.count_rows()
+        checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        checkpoint = {'input': os.path.abspath(input_path), 'fingerprint': input_fingerprint(dataset.files),
+                      'total_rows': total_rows, 'offset': 0}
+        start_offset = self._resume_offset(output_dir, checkpoint) if resume else 0
+        os.makedirs(output_dir, exist_ok=True)
+        # El checkpoint baja al offset de partida antes de borrar: si se interrumpe
+        # aquí, nunca apunta a fragmentos que ya no existen
+        self._save_checkpoint(checkpoint_path, checkpoint, start_offset)
+        # Descartar fragmentos posteriores al último offset confirmado (o todos si no se reanuda)
+        self._clear_parts(output_dir, start_offset)
 
-        print(f"Iniciando procesamiento de {len(texts)} textos...")
+        if start_offset >= total_rows:
+            print(f"Nada que procesar: los {total_rows} textos ya están en '{output_dir}'.")
+            return output_dir
+        if start_offset:
+            print(f"Reanudando desde el texto {start_offset}/{total_rows}...")
+
+        print(f"Iniciando procesamiento de {total_rows - start_offset} textos en fragmentos de {chunk_size} "
+              f"con {n_process} procesos...")
         start_time = time.time()
 
-        docs_en = list(self.nlp_en.pipe(texts, n_process=-1, batch_size=500))
-
-        for i, doc_en in enumerate(docs_en):
-            original_text = texts[i]
-            products = set()
-            brands = set()
-            locations = set()
-            persons = set()
-
-            for ent in doc_en.ents:
-                if ent.label_ == 'PRODUCT': products.add(ent.text.strip())
-                elif ent.label_ == 'ORG': brands.add(ent.text.strip())
-                elif ent.label_ == 'GPE': locations.add(ent.text.strip())
-                elif ent.label_ == 'PERSON': persons.add(ent.text.strip())
-
-           
-            results_list.append({
-                'text': df.loc[i, 'text'],
-                'title': df.loc[i, 'title'],
-                'ner_products': ', '.join(sorted(products)),
-                'ner_brands': ', '.join(sorted(brands)),
-                'ner_locations': ', '.join(sorted(locations)),
-                'ner_persons': ', '.join(sorted(persons)),
-            })
+        processed = start_offset
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=n_process, initializer=_init_worker,
+                                 initargs=(NLP_PROFILE, self.model_name)) as pool:
+            offset = 0
+            for batch in dataset.to_batches(batch_size=chunk_size):
+                # Saltar (sin NER) las filas que ya están en un fragmento confirmado
+                if offset + batch.num_rows <= start_offset:
+                    offset += batch.num_rows
+                    continue
+                if offset < start_offset:
+                    batch = batch.slice(start_offset - offset)
+                    offset = start_offset
 
-        end_time = time.time()
-        print(f"Procesamiento completado en {end_time - start_time:.2f} segundos.")
+                chunk = batch.to_pandas()
+                keys, hit, cached = self._lookup_cache(chunk)
+                texts = [text for text, is_cached in zip(build_full_texts(chunk), hit) if not is_cached]
+                future = pool.submit(_process_shard, texts, batch_size)
+                in_flight.append((offset, chunk, (keys, hit, cached), future))
+                offset += len(chunk)
+
+                # Ventana acotada: escribir el fragmento más antiguo antes de leer más
+                while len(in_flight) >= 2 * n_process:
+                    processed += self._write_chunk(output_dir, *in_flight.popleft())
+                    self._save_checkpoint(checkpoint_path, checkpoint, processed)
+                    self._report_progress(processed - start_offset, total_rows - start_offset, start_time)
+
+            while in_flight:
+                processed += self._write_chunk(output_dir, *in_flight.popleft())
+                self._save_checkpoint(checkpoint_path, checkpoint, processed)
+                self._report_progress(processed - start_offset, total_rows - start_offset, start_time)
+
+        print(f"Procesamiento completado en {time.time() - start_time:.2f} segundos.")
+        return output_dir
+
+    def _write_chunk(self, output_dir, offset, chunk, cache_state, future):
+        entities = self._merge_cached(chunk.index, *cache_state, future.result())
+        if self.cache is not None:
+            # El caché se persiste antes de confirmar el checkpoint del fragmento
+            self.cache.flush()
+        chunk = pd.concat([chunk.drop(columns=list(ENTITY_COLUMNS.values()), errors='ignore'), entities], axis=1)
+        # Escritura atómica: un fragmento a medias nunca queda con el nombre definitivo
+        part_name = f"part-{offset:09d}.parquet"
+        tmp_path = os.path.join(output_dir, f".{part_name}.tmp")
+        write_reviews(chunk, tmp_path)
+        _fsync_path(tmp_path)
+        os.replace(tmp_path, os.path.join(output_dir, part_name))
+        return len(chunk)
+
+    def _resume_offset(self, output_dir, checkpoint):
+        """Offset desde el que continuar, o 0 si no hay un checkpoint válido para esta entrada"""
+        checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        try:
+            with open(checkpoint_path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        if any(saved.get(key) != checkpoint[key] for key in ('input', 'fingerprint', 'total_rows')):
+            print("El checkpoint corresponde a otra entrada (o la entrada cambió); se empieza de cero.")
+            return 0
+
+        return saved.get('offset', 0)
+
+    def _clear_parts(self, output_dir, from_offset):
+        for name in os.listdir(output_dir):
+            if name.endswith('.tmp') or (name.startswith('part-') and int(name[5:14]) >= from_offset):
+                os.remove(os.path.join(output_dir, name))
+
+    def _save_checkpoint(self, checkpoint_path, checkpoint, offset):
+        checkpoint['offset'] = offset
+        _write_atomic_json(checkpoint_path, checkpoint)
+
+    def _report_progress(self, processed, total_rows, start_time):
+        elapsed = time.time() - start_time
+        print(f"  {processed}/{total_rows} textos ({processed / elapsed:.0f} textos/s)")
 
-        processed_df = pd.DataFrame(results_list)
-        original_cols_df = df.drop(columns=['full_text'], errors='ignore')
-        final_df = pd.concat([original_cols_df, processed_df.drop(columns=['text', 'title'], errors='ignore')], axis=1)
-        return final_df
 
 def main():
-    file_path = 'Data/processed_data/Electronics_processed.csv'
-    
-    print(f"Cargando dataset desde: {file_path}")
-    try:
-        df = pd.read_csv(file_path)
-        print(f"Dataset cargado exitosamente. {len(df)} filas encontradas.")
-    except FileNotFoundError:
+    file_path = 'Data/processed_data/Electronics_processed.parquet'
+    output_path = 'Data/processed_data/Electronics_processed_ner.parquet'
+
+    if not os.path.exists(file_path):
         print(f"Error: No se encontró el archivo en la ruta '{file_path}'.")
         return
-    except Exception as e:
-        print(f"Ocurrió un error al leer el archivo CSV: {e}")
-        return
 
-    cleaner = BeautyReviewsCleaner()
-    
+    cleaner = BeautyReviewsCleaner(cache_dir='Data/cache/ner')
+
     if cleaner.nlp_en:
-        processed_df = cleaner.process_reviews(df)
-        if processed_df is not None:
-            print("\n--- Procesamiento finalizado. Mostrando 5 filas de ejemplo: ---")
-            display_cols = [
-                'title', 'text', 'ner_brands', 'ner_locations', 'extracted_prices', 'extracted_product_models'
-            ]
-            existing_display_cols = [col for col in display_cols if col in processed_df.columns]
-            print(processed_df[existing_display_cols].head())
-
-            output_path = 'Data/Processed_data/Electronics_processed_ner.csv'
-            processed_df.to_csv(output_path, index=False)
-            print(f"\nDataset procesado y guardado exitosamente en: {output_path}")
+        try:
+            cleaner.process_file_streaming(file_path, output_path)
+        except Exception as e:
+            print(f"Ocurrió un error durante el procesamiento: {e}")
+            return
+
+        processed_df = ds.dataset(output_path, format='parquet').head(5).to_pandas()
+        print("\n--- Procesamiento finalizado. Mostrando 5 filas de ejemplo: ---")
+        display_cols = [
+            'title', 'text', 'ner_brands', 'ner_locations', 'extracted_prices', 'extracted_product_models'
+        ]
+        existing_display_cols = [col for col in display_cols if col in processed_df.columns]
+        print(processed_df[existing_display_cols])
+        print(f"\nDataset procesado y guardado exitosamente en: {output_path}")
 
 if __name__ == "__main__":
     main()
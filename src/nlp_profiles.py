@@ -0,0 +1,55 @@
+import spacy
+
+MODEL_NAME = 'en_core_web_sm'
+
+# Perfiles de pipeline con nombre. 'exclude' ni siquiera carga el componente
+# (ahorra memoria); 'disable' lo carga pero no lo ejecuta.
+PROFILES = {
+    'full': {'exclude': [], 'disable': []},
+    'no-parser': {'exclude': [], 'disable': ['parser']},
+    'entities-only': {
+        'exclude': ['tagger', 'lemmatizer', 'attribute_ruler', 'parser', 'senter'],
+        'disable': [],
+    },
+}
+
+DEFAULT_PROFILE = 'entities-only'
+
+
+def load_profile(profile=DEFAULT_PROFILE, model_name=MODEL_NAME):
+    """Carga el modelo de spaCy con la configuración del perfil indicado"""
+    if profile not in PROFILES:
+        raise ValueError(f"Perfil desconocido: '{profile}'. Opciones: {sorted(PROFILES)}")
+
+    config = PROFILES[profile]
+    nlp = spacy.load(model_name, exclude=config['exclude'], disable=config['disable'])
+
+    # En los modelos pequeños el NER tiene su propio tok2vec: si nadie escucha
+    # al tok2vec compartido, ejecutarlo es trabajo perdido
+    if profile == 'entities-only' and 'tok2vec' in nlp.pipe_names:
+        if not nlp.get_pipe('tok2vec').listening_components:
+            nlp.disable_pipe('tok2vec')
+    return nlp
+
+
+def has_entity_candidates(text):
+    """Descarta sin pasar por el modelo los textos sin letras ni dígitos"""
+    return any(char.isalnum() for char in text)
+
+
+def pipe_entities(nlp, texts, batch_size=500):
+    """Genera, por cada texto, la lista de (texto, etiqueta) de sus entidades.
+
+    Camino rápido independiente de oraciones: el NER se ejecuta sobre el Doc
+    completo (sin parser ni senter) y los textos vacíos no llegan al modelo.
+    """
+    texts = [text if isinstance(text, str) else '' for text in texts]
+    candidates = [text for text in texts if has_entity_candidates(text)]
+    docs = nlp.pipe(candidates, batch_size=batch_size)
+
+    for text in texts:
+        if not has_entity_candidates(text):
+            yield []
+            continue
+        doc = next(docs)
+        yield [(ent.text, ent.label_) for ent in doc.ents]
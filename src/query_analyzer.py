@@ -0,0 +1,86 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from nltk.tokenize import word_tokenize
+
+from lexicon_matcher import LexiconMatcher
+
+_WORD_RE = re.compile(r'[a-zA-Z]+')
+
+# Resultado del análisis de una consulta
+QueryAnalysis = namedtuple('QueryAnalysis', ['intent', 'expanded', 'tokens', 'terms'])
+
+
+class QueryAnalyzer:
+    """Análisis de consultas construido una sola vez.
+
+    Las stopwords quedan congeladas y los vocabularios de intención,
+    expansión y ubicación se reúnen en un único LexiconMatcher: cada palabra
+    se busca una sola vez por consulta aunque aparezca en varias listas. Los
+    análisis se memorizan por texto de consulta.
+    """
+
+    def __init__(self, stop_words, intent_keywords, expansions, extra_terms=(), cache_size=1024):
+        self.stop_words = frozenset(stop_words)
+        self.intent_keywords = {name: tuple(words) for name, words in intent_keywords.items()}
+        self.expansions = dict(expansions)
+
+        vocabulary = [word for words in self.intent_keywords.values() for word in words]
+        vocabulary += list(self.expansions) + list(extra_terms)
+        self.matcher = LexiconMatcher(vocabulary)
+
+        self._analyze = lru_cache(maxsize=cache_size)(self._analyze_uncached)
+        self.terms = lru_cache(maxsize=cache_size)(self._terms_uncached)
+
+    def tokenize(self, text):
+        """Tokens para BM25: minúsculas, sin stopwords, solo letras y más de 2 caracteres"""
+        return [t for t in word_tokenize(text.lower())
+                if t not in self.stop_words
+                and len(t) > 2
+                and _WORD_RE.fullmatch(t)]
+
+    def _terms_uncached(self, query):
+        """Palabras del vocabulario presentes en la consulta (en minúsculas)"""
+        return frozenset(self.matcher.find(query.lower()))
+
+    def analyze(self, query):
+        """Intención, consulta expandida y tokens de la consulta"""
+        analysis = self._analyze(query)
+        # La intención es un dict que los resultados exponen; cada llamada recibe su copia
+        return analysis._replace(intent=dict(analysis.intent))
+
+    def _analyze_uncached(self, query):
+        terms = self.terms(query)
+        expanded = self.expand(query, terms)
+        return QueryAnalysis(self.intent(terms), expanded, tuple(self.tokenize(expanded)), terms)
+
+    def intent(self, terms):
+        """Intención de la consulta a partir de las palabras encontradas"""
+        def mentions(name):
+            return any(word in terms for word in self.intent_keywords[name])
+
+        sentiment = 'neutral'
+        if mentions('negative'):
+            sentiment = 'negative'
+        elif mentions('positive'):
+            sentiment = 'positive'
+
+        return {
+            'sentiment': sentiment,
+            'problem_focus': mentions('problem_focus'),
+            'location_focus': mentions('location_focus'),
+            'brand_focus': mentions('brand_focus'),
+            'comparison': False
+        }
+
+    def expand(self, query, terms):
+        """Agrega sinónimos de los términos encontrados (en el orden del diccionario)"""
+        expanded = query
+        for term, synonyms in self.expansions.items():
+            if term in terms:
+                expanded += ' ' + synonyms
+        return expanded
+
+    def cache_info(self):
+        return self._analyze.cache_info()
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """Caché LRU acotado de resultados de consultas.
+
+    Cada entrada expira a los `ttl` segundos (None = sin expiración) y todo
+    el caché se vacía cuando cambia la versión del índice (reseñas
+    agregadas o borradas). Es seguro entre hilos.
+    """
+
+    def __init__(self, max_size=256, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version, default=None):
+        """Valor guardado para `key` con la versión de índice dada, o `default`"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, version, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entradas': len(self._entries),
+            'aciertos': self.hits,
+            'fallos': self.misses,
+            'tasa_aciertos': self.hits / total if total else 0.0,
+        }
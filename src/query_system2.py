@@ -1,12 +1,22 @@
 import pandas as pd
-import spacy
-from rank_bm25 import BM25Okapi
 import numpy as np
+from bm25_index import BM25Index, top_k_indices
+from entity_index import EntityIndex, intersect_ids, load_or_build_indexes, save_indexes
+from triple_store import TripleStore
+from review_io import read_reviews, join_entities, ENTITY_COLUMNS
+from nlp_profiles import load_profile
+from doc_ids import DocIdMap
+from query_cache import QueryCache
+from query_analyzer import QueryAnalyzer
+from lexicon_matcher import LexiconMatcher
+from review_result import ReviewResult, display_columns, row_data
+from column_store import ColumnStore
 import nltk
-from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 import re
 import os
+import time
+import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from PIL import Image, ImageTk
@@ -16,6 +26,7 @@ import networkx as nx
 from deep_translator import GoogleTranslator
 import json
 from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
 
 # Descargar recursos de NLTK
 nltk.download('punkt')
@@ -32,6 +43,9 @@ COLOR_CARD = "#ffffff"
 COLOR_STARS = "#f39c12"
 
 class ReviewSearchApp:
+    # Cada cuánto (ms) revisa el hilo de Tk si terminó una tarea en segundo plano
+    POLL_MS = 50
+
     def __init__(self, root, data_path):
         self.root = root
         self.root.title("Sistema de Búsqueda Semántica de Reseñas")
@@ -47,6 +61,14 @@ class ReviewSearchApp:
             self.root.destroy()
             return
 
+        # Búsquedas y grafos corren en hilos de trabajo; sus resultados vuelven
+        # al hilo de Tk con root.after (Tk no es seguro entre hilos)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='interfaz')
+        self._tasks = {}
+        self._generations = Counter()
+        self._progress_running = False
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
         # Variables para la búsqueda avanzada
         self.advanced_search_vars = {}
 
@@ -71,6 +93,10 @@ class ReviewSearchApp:
         }
 
     def create_widgets(self):
+        # Indicador de progreso de las tareas en segundo plano
+        self.progress = ttk.Progressbar(self.root, mode='indeterminate')
+        self.progress.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10))
+
         # Notebook para pestañas
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -304,6 +330,58 @@ class ReviewSearchApp:
         self.search_var.set(query)
         self.perform_semantic_search()
 
+    def run_in_background(self, channel, work, on_done, on_error):
+        """Ejecuta work() en un hilo de trabajo; una tarea nueva del mismo canal reemplaza a la anterior"""
+        self._generations[channel] += 1
+        generation = self._generations[channel]
+        previous = self._tasks.get(channel)
+        if previous is not None:
+            previous.cancel()
+
+        def task():
+            # Una tarea que quedó en cola detrás de otra más nueva no se ejecuta
+            if self._generations[channel] != generation:
+                return None
+            return work()
+
+        future = self._executor.submit(task)
+        self._tasks[channel] = future
+        self._update_progress()
+        self.root.after(self.POLL_MS, self._poll_task, channel, generation, future, on_done, on_error)
+
+    def _poll_task(self, channel, generation, future, on_done, on_error):
+        if not future.done():
+            self.root.after(self.POLL_MS, self._poll_task, channel, generation, future, on_done, on_error)
+            return
+
+        if self._tasks.get(channel) is future:
+            del self._tasks[channel]
+        self._update_progress()
+
+        # Resultado de una tarea reemplazada por otra más nueva
+        if future.cancelled() or self._generations[channel] != generation:
+            return
+
+        error = future.exception()
+        if error is not None:
+            on_error(error)
+        else:
+            on_done(future.result())
+
+    def _update_progress(self):
+        if self._tasks and not self._progress_running:
+            self.progress.start(10)
+            self._progress_running = True
+        elif not self._tasks and self._progress_running:
+            self.progress.stop()
+            self._progress_running = False
+
+    def close(self):
+        # Las tareas pendientes se cancelan; las que están corriendo se descartan
+        self._generations.update(list(self._tasks))
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def perform_semantic_search(self):
         query = self.search_var.get().strip()
         if not query:
@@ -311,23 +389,31 @@ class ReviewSearchApp:
             return
 
         self.status_var.set(f"Procesando consulta semántica: '{query}'...")
-        self.root.update_idletasks()
-
-        try:
-            self.results_text.config(state=tk.NORMAL)
-            self.results_text.delete(1.0, tk.END)
 
+        def search():
             # Primero intentar búsqueda semántica RDF
             rdf_results = self.query_system.semantic_rdf_query(query)
 
             # Luego búsqueda semántica tradicional
             semantic_results = self.query_system.enhanced_semantic_search(query)
 
+            # Los campos perezosos (triples, datos) se calculan aquí y no en el hilo de Tk
+            shown = [res.to_dict() for res in semantic_results[:10]] # Limitar a 10 resultados
+            return rdf_results, len(semantic_results), shown
+
+        self.run_in_background('semantic', search,
+                               lambda result: self.show_semantic_results(query, *result),
+                               self.show_semantic_error)
+
+    def show_semantic_results(self, query, rdf_results, total_results, semantic_results):
+        try:
+            self.results_text.config(state=tk.NORMAL)
+            self.results_text.delete(1.0, tk.END)
+
             if not semantic_results and not rdf_results:
                 self.results_text.insert(tk.END, "No se encontraron resultados relevantes.", "data")
                 self.status_var.set(f"0 resultados para: '{query}'")
             else:
-                total_results = len(semantic_results)
                 self.results_text.insert(tk.END, f"🎯 {total_results} resultados semánticos para: '{query}'\n\n", "header")
 
                 # Mostrar triples RDF relacionados
@@ -338,18 +424,24 @@ class ReviewSearchApp:
                     self.results_text.insert(tk.END, "\n")
 
                 # Mostrar resultados detallados
-                for i, res in enumerate(semantic_results[:10]): # Limitar a 10 resultados
+                for i, res in enumerate(semantic_results):
                     self.display_result(res, i+1)
 
                 self.status_var.set(f"{total_results} resultados semánticos encontrados")
 
         except Exception as e:
-            self.results_text.insert(tk.END, f"Error en búsqueda semántica: {str(e)}", "data")
-            self.status_var.set(f"Error: {str(e)}")
+            self.show_semantic_error(e)
 
         finally:
             self.results_text.config(state=tk.DISABLED)
 
+    def show_semantic_error(self, error):
+        self.results_text.config(state=tk.NORMAL)
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, f"Error en búsqueda semántica: {str(error)}", "data")
+        self.results_text.config(state=tk.DISABLED)
+        self.status_var.set(f"Error: {str(error)}")
+
     def perform_advanced_search(self):
         # Obtener valores de filtros
         filters = {key: var.get().strip() for key, var in self.advanced_search_vars.items()}
@@ -359,10 +451,7 @@ class ReviewSearchApp:
             messagebox.showwarning("Filtros vacíos", "Ingrese al menos un filtro para la búsqueda")
             return
 
-        try:
-            self.advanced_results_text.config(state=tk.NORMAL)
-            self.advanced_results_text.delete(1.0, tk.END)
-
+        def search():
             # Realizar búsqueda avanzada
             results = self.query_system.advanced_semantic_search(
                 product=filters.get('product'),
@@ -372,6 +461,14 @@ class ReviewSearchApp:
                 failure_keyword=filters.get('keyword'),
                 top_n=15
             )
+            return [res.to_dict() for res in results]
+
+        self.run_in_background('advanced', search, self.show_advanced_results, self.show_advanced_error)
+
+    def show_advanced_results(self, results):
+        try:
+            self.advanced_results_text.config(state=tk.NORMAL)
+            self.advanced_results_text.delete(1.0, tk.END)
 
             if not results:
                 self.advanced_results_text.insert(tk.END, "No se encontraron resultados con estos filtros.", "data")
@@ -382,11 +479,17 @@ class ReviewSearchApp:
                     self.display_advanced_result(res, i+1)
 
         except Exception as e:
-            self.advanced_results_text.insert(tk.END, f"Error en búsqueda avanzada: {str(e)}", "data")
+            self.show_advanced_error(e)
 
         finally:
             self.advanced_results_text.config(state=tk.DISABLED)
 
+    def show_advanced_error(self, error):
+        self.advanced_results_text.config(state=tk.NORMAL)
+        self.advanced_results_text.delete(1.0, tk.END)
+        self.advanced_results_text.insert(tk.END, f"Error en búsqueda avanzada: {str(error)}", "data")
+        self.advanced_results_text.config(state=tk.DISABLED)
+
     def display_result(self, res, num):
         self.results_text.insert(tk.END, f"\n🎯 Resultado #{num} ", "header")
         self.results_text.insert(tk.END, f"(Relevancia: {res['score']})\n", "subheader")
@@ -439,25 +542,26 @@ class ReviewSearchApp:
         text_widget.config(state=tk.DISABLED)
 
     def show_complete_graph(self):
-        try:
-            graph_info = self.query_system.visualize_complete_semantic_graph()
-            self.update_graph_info(graph_info)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo generar el grafo: {str(e)}")
+        self.show_graph(self.query_system.complete_graph_plot, "No se pudo generar el grafo")
 
     def show_sentiment_graph(self):
-        try:
-            graph_info = self.query_system.visualize_sentiment_network()
-            self.update_graph_info(graph_info)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo generar el grafo de sentimientos: {str(e)}")
+        self.show_graph(self.query_system.sentiment_network_plot, "No se pudo generar el grafo de sentimientos")
 
     def show_product_graph(self):
-        try:
-            graph_info = self.query_system.visualize_product_network()
-            self.update_graph_info(graph_info)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo generar el grafo de productos: {str(e)}")
+        self.show_graph(self.query_system.product_network_plot, "No se pudo generar el grafo de productos")
+
+    def show_graph(self, build_plot, error_message):
+        """Calcula el grafo y su distribución en segundo plano; el dibujo es en el hilo de Tk"""
+        def draw(plot):
+            try:
+                self.update_graph_info(plot['info'])
+                self.query_system.draw_graph_plot(plot)
+            except Exception as e:
+                messagebox.showerror("Error", f"{error_message}: {str(e)}")
+
+        self.update_graph_info("⏳ Calculando grafo...")
+        self.run_in_background('graph', build_plot, draw,
+                               lambda e: messagebox.showerror("Error", f"{error_message}: {str(e)}"))
 
     def update_graph_info(self, info):
         self.graph_info_text.config(state=tk.NORMAL)
@@ -476,69 +580,301 @@ class ReviewSearchApp:
             if not filename:
                 return
 
-            export_path = self.query_system.export_rdf_triples_csv(filename)
-            messagebox.showinfo("Exportación exitosa", f"Grafo RDF exportado como:\n{export_path}")
+            self.run_in_background(
+                'export', lambda: self.query_system.export_rdf_triples_csv(filename),
+                lambda export_path: messagebox.showinfo("Exportación exitosa", f"Grafo RDF exportado como:\n{export_path}"),
+                lambda e: messagebox.showerror("Error de exportación", f"No se pudo exportar el grafo RDF:\n{str(e)}")
+            )
 
         except Exception as e:
             messagebox.showerror("Error de exportación", f"No se pudo exportar el grafo RDF:\n{str(e)}")
 
 class UniversalReviewQuerySystem:
-    def __init__(self, data_path):
+    # Diccionarios de palabras clave compartidos por la extracción de características
+    SENTIMENT_WORDS = {
+        'positivo': ['good', 'great', 'excellent', 'amazing', 'perfect', 'love', 'best'],
+        'negativo': ['bad', 'terrible', 'awful', 'horrible', 'worst', 'hate', 'problem'],
+    }
+
+    # Problemas que se reportan en triples y resultados (_detect_problems)
+    PROBLEM_PATTERNS = {
+        'batería': ['battery', 'batería', 'charge', 'power'],
+        'pantalla': ['screen', 'display', 'pantalla'],
+        'durabilidad': ['break', 'broken', 'crack', 'fragile'],
+        'rendimiento': ['slow', 'lag', 'performance', 'freeze']
+    }
+
+    # Palabras clave para problemas comunes (semantic_features)
+    PROBLEM_KEYWORDS = {
+        'battery': ['battery', 'batería', 'duración', 'carga'],
+        'screen': ['screen', 'pantalla', 'display', 'brightness'],
+        'durability': ['break', 'broken', 'fragile', 'durability'],
+        'performance': ['slow', 'lag', 'performance', 'speed']
+    }
+
+    # Banderas de texto para el boost de intención y el filtro de sentimiento
+    FLAG_KEYWORDS = {
+        'negative': ['bad', 'terrible', 'problem', 'issue'],
+        'positive': ['good', 'great', 'excellent', 'amazing'],
+        'problem': ['battery', 'screen', 'break', 'slow'],
+        'filter_negative': ['bad', 'terrible', 'awful', 'problem', 'issue'],
+        'filter_positive': ['good', 'great', 'excellent', 'amazing', 'perfect'],
+    }
+
+    LOCATION_FLAG_KEYWORDS = ['mexico', 'méxico', 'spain', 'españa']
+
+    # Vocabularios de consulta (se compilan una vez en el QueryAnalyzer)
+    QUERY_INTENT_KEYWORDS = {
+        'negative': ['quejas', 'problemas', 'malo', 'negativo', 'complaints', 'problems', 'bad'],
+        'positive': ['bueno', 'positivo', 'recomendado', 'good', 'positive', 'recommended'],
+        'problem_focus': ['batería', 'battery', 'pantalla', 'screen', 'durabilidad', 'performance'],
+        'location_focus': ['méxico', 'mexico', 'españa', 'spain', 'en', 'ubicación'],
+        'brand_focus': ['samsung', 'apple', 'sony', 'marca', 'brand'],
+    }
+
+    QUERY_EXPANSIONS = {
+        'batería': 'battery power charge duración energía',
+        'battery': 'batería power charge duration energy',
+        'pantalla': 'screen display monitor visualización',
+        'screen': 'pantalla display monitor visualization',
+        'problems': 'problemas issues defects fallas',
+        'problemas': 'problems issues defects failures',
+        'méxico': 'mexico mexican latinoamerica',
+        'mexico': 'méxico mexican latin america'
+    }
+
+    # Patrones de semantic_rdf_query
+    RDF_NEGATIVE_KEYWORDS = ['quejas', 'problemas', 'negativo', 'malo']
+    RDF_LOCATIONS = ['méxico', 'mexico', 'españa', 'spain']
+    RDF_PROBLEM_MAP = {
+        'batería': 'batería',
+        'battery': 'batería',
+        'pantalla': 'pantalla',
+        'screen': 'pantalla',
+        'durabilidad': 'durabilidad'
+    }
+
+    # Únicas columnas que usa el sistema (proyección al leer Parquet/CSV)
+    QUERY_COLUMNS = [
+        'text', 'rating', 'ner_products', 'ner_brands', 'ner_locations', 'ner_persons',
+        'extracted_prices', 'extracted_purchase_dates', 'extracted_product_models'
+    ]
+
+    def __init__(self, data_path, index_dir=None, cache_size=256, cache_ttl=300.0):
         print("Inicializando sistema de consultas...")
 
         # Cargar datos y procesar
-        self.df = pd.read_csv(data_path).fillna('')
+        self.df, entity_lists = self._load_reviews(data_path)
 
         if self.df.empty:
             raise ValueError("El dataset está vacío")
 
         print(f"Dataset cargado: {len(self.df)} reseñas")
 
+        # Id estable de cada reseña = su posición en df, BM25, características y grafo
+        self.doc_ids = DocIdMap(len(self.df))
+
+        # Caché de consultas repetidas; se invalida al cambiar index_version
+        self.index_version = 0
+        self.query_cache = QueryCache(max_size=cache_size, ttl=cache_ttl)
+        self._boost_cache = {}
+        self._boost_lock = threading.Lock()
+
         # Cargar modelo NLP
         try:
-            self.nlp = spacy.load('en_core_web_sm')
-            print("Modelo spaCy cargado exitosamente")
+            # Solo se usa para entidades: perfil mínimo (sin tagger, lematizador ni parser)
+            self.nlp = load_profile('entities-only')
+            print("Modelo spaCy cargado exitosamente (perfil 'entities-only')")
         except:
             print("⚠️ Modelo spaCy no encontrado. Funcionalidad NLP limitada.")
             self.nlp = None
 
-        # Preprocesar textos
-        self.texts = self.df['text'].astype(str).tolist()
-        self.tokenized_texts = self._preprocess_texts()
+        # Stopwords y vocabularios de consulta compilados una sola vez
+        self.query_analyzer = QueryAnalyzer(
+            stopwords.words('english'), self.QUERY_INTENT_KEYWORDS, self.QUERY_EXPANSIONS,
+            extra_terms=self.RDF_NEGATIVE_KEYWORDS + self.RDF_LOCATIONS + list(self.RDF_PROBLEM_MAP)
+        )
 
-        if self.tokenized_texts:
-            self.bm25 = BM25Okapi(self.tokenized_texts)
-            print("Índice BM25 construido")
+        # Todas las palabras clave de sentimiento, problemas y banderas en un solo matcher
+        keyword_groups = (list(self.SENTIMENT_WORDS.values()) + list(self.PROBLEM_PATTERNS.values())
+                          + list(self.PROBLEM_KEYWORDS.values()) + list(self.FLAG_KEYWORDS.values()))
+        self.review_lexicon = LexiconMatcher(word for words in keyword_groups for word in words)
+
+        # Cargar (o construir una sola vez) el índice BM25 persistente
+        self.texts = self.df['text'].astype(str).tolist()
+        if index_dir is None:
+            index_dir = f"{os.path.splitext(data_path)[0]}.bm25"
+        self.bm25 = BM25Index.load_or_build(index_dir, self._preprocess_texts, source_path=data_path)
+        if self.bm25.corpus_size != len(self.df):
+            print("⚠️ El índice BM25 no tiene un documento por reseña; se reconstruirá")
+            self.bm25 = BM25Index.build(self._preprocess_texts(), index_dir, source_path=data_path)
+
+        if self.bm25.avgdl:
+            print(f"Índice BM25 cargado desde: {index_dir}")
         else:
             raise ValueError("No hay textos válidos para la búsqueda")
 
+        # Los lotes de add_reviews son segmentos; un hilo los fusiona sin bloquear consultas
+        self.bm25.start_background_merge()
+
+        # Extraer entidades, sentimientos y problemas en una sola pasada
+        self._extract_review_features()
+        self._extract_semantic_features()
+        self._load_entity_indexes(index_dir, data_path, entity_lists)
+        self.result_columns = ColumnStore(display_columns(self.df))
+        print("Características semánticas extraídas")
+
         # Construir grafo RDF
         self.build_enhanced_rdf_graph()
         print("Grafo RDF construido")
 
-        # Extraer entidades y sentimientos
-        self._extract_semantic_features()
-        print("Características semánticas extraídas")
+        self._check_alignment()
 
         print("Sistema inicializado correctamente ✅")
 
+    def _load_reviews(self, data_path):
+        """Carga solo las columnas necesarias; devuelve el DataFrame y las entidades en lista"""
+        return self._prepare_reviews(read_reviews(data_path, columns=self.QUERY_COLUMNS))
+
+    @property
+    def df(self):
+        """Reseñas cargadas; los lotes de add_reviews se unen la primera vez que se lee"""
+        if len(self._df_blocks) > 1:
+            self._df_blocks = [pd.concat(self._df_blocks)]
+        return self._df_blocks[0]
+
+    @df.setter
+    def df(self, df):
+        self._df_blocks = [df]
+
+    def _prepare_reviews(self, df):
+        """Separa las entidades en lista y deja el DataFrame listo para mostrar"""
+        # Las listas tipadas de Parquet se usan tal cual para los índices de entidades;
+        # para mostrar y para el grafo se unen con comas como en el CSV original
+        entity_lists = {}
+        for column in ENTITY_COLUMNS:
+            if column in df.columns and df[column].map(lambda value: isinstance(value, (list, np.ndarray))).any():
+                entity_lists[column] = df[column]
+                df[column] = df[column].map(join_entities)
+
+        return df.fillna(''), entity_lists
+
     def _preprocess_texts(self):
-        """Tokeniza y limpia los textos para BM25"""
-        tokenized = []
-        english_stopwords = set(stopwords.words('english'))
+        """Tokeniza y limpia los textos para BM25 (documento i = fila i, aunque quede vacío)"""
+        return self._tokenize_texts(self.texts)
+
+    def _check_alignment(self):
+        """Verifica que todos los componentes tengan un elemento por id de documento"""
+        sizes = {
+            'df': sum(len(block) for block in self._df_blocks),
+            'bm25': self.bm25.corpus_size,
+            'características': len(self.review_features['sentiment']),
+            'banderas': len(self.review_flags['negative']),
+            'columnas_resultado': len(self.result_columns['text']),
+        }
+        for key, index in self.entity_indexes.items():
+            sizes[f'entidades_{key}'] = index.size
+        self.doc_ids.check(**sizes)
+
+    def _tokenize_texts(self, texts):
+        """Tokens de cada texto (lista vacía si no queda ninguno)"""
+        return [self.query_analyzer.tokenize(text) for text in texts]
+
+    def _text_column(self, column, df=None):
+        """Columna como serie de strings ('' si no existe en el dataset)"""
+        df = self.df if df is None else df
+        if column not in df.columns:
+            return pd.Series([''] * len(df), index=df.index)
+        return df[column].astype(str)
+
+    def _extract_review_features(self):
+        """Extrae en una sola pasada columnar las características de todas las reseñas"""
+        features, flags = self._compute_review_features(self.df)
+        # Columnas con capacidad de reserva: add_reviews copia solo el lote
+        self.review_features = ColumnStore(features)
+        self.review_flags = ColumnStore(flags)
+
+        # Listas de problemas por combinación de bits (decodificación sin recorrer texto)
+        problem_names = list(self.PROBLEM_PATTERNS)
+        self._problem_lists = [
+            [name for bit, name in enumerate(problem_names) if mask & (1 << bit)]
+            for mask in range(1 << len(problem_names))
+        ]
 
-        for text in self.texts:
-            tokens = word_tokenize(text.lower())
-            tokens = [t for t in tokens
-                      if t not in english_stopwords
-                      and len(t) > 2
-                      and not t.isdigit()
-                      and re.match(r'^[a-zA-Z]+$', t)]
+    def _compute_review_features(self, df):
+        """Características y banderas de las reseñas de `df`, como arreglos columnares"""
+        n = len(df)
+        text_lower = self._text_column('text', df).str.lower()
+        hits = self.review_lexicon.hit_matrix(text_lower.tolist())
+        column = self.review_lexicon.column
+
+        def any_hit(words):
+            return hits[:, [column[word] for word in words]].any(axis=1)
+
+        def count_hits(words):
+            return hits[:, [column[word] for word in words]].sum(axis=1)
+
+        # Sentimiento: misma regla que _analyze_sentiment
+        pos_count = count_hits(self.SENTIMENT_WORDS['positivo'])
+        neg_count = count_hits(self.SENTIMENT_WORDS['negativo'])
+        sentiment = np.full(n, 'neutro', dtype=object)
+        sentiment[pos_count > neg_count] = 'positivo'
+        sentiment[neg_count > pos_count] = 'negativo'
+
+        # Problemas como máscara de bits (bit i = i-ésimo problema del diccionario)
+        def bitmask(patterns):
+            mask = np.zeros(n, dtype=np.uint8)
+            for bit, words in enumerate(patterns.values()):
+                mask[any_hit(words)] |= 1 << bit
+            return mask
+
+        # Entidades: texto sin espacios extremos, '' si no hay entidad válida
+        def entity_column(column):
+            values = self._text_column(column, df).str.strip()
+            values[values.isin(['nan', 'N/A'])] = ''
+            return values.to_numpy(dtype=object)
+
+        features = {
+            'sentiment': sentiment,
+            'problems': bitmask(self.PROBLEM_PATTERNS),
+            'problem_types': bitmask(self.PROBLEM_KEYWORDS),
+            'product': entity_column('ner_products'),
+            'brand': entity_column('ner_brands'),
+            'location': entity_column('ner_locations'),
+            'person': entity_column('ner_persons'),
+        }
+
+        location_lower = self._text_column('ner_locations', df).str.lower()
+        location_pattern = '|'.join(re.escape(word) for word in self.LOCATION_FLAG_KEYWORDS)
+        flags = {name: any_hit(words) for name, words in self.FLAG_KEYWORDS.items()}
+        flags['location'] = location_lower.str.contains(location_pattern, regex=True).to_numpy(dtype=bool)
+        return features, flags
+
+    def _review_problems(self, idx):
+        """Problemas precalculados de la reseña idx (equivale a _detect_problems)"""
+        return list(self._problem_lists[self.review_features['problems'][idx]])
+
+    ENTITY_INDEX_COLUMNS = [('product', 'ner_products'), ('brand', 'ner_brands'), ('location', 'ner_locations')]
+
+    def _load_entity_indexes(self, index_dir, data_path, entity_lists):
+        """Carga (o construye una sola vez) los índices de productos, marcas y ubicaciones junto al BM25"""
+        entity_dir = f"{os.path.splitext(index_dir)[0]}.entities"
+
+        def build():
+            return {key: EntityIndex(self._entity_values(column, self.df, entity_lists))
+                    for key, column in self.ENTITY_INDEX_COLUMNS}
 
-            if tokens:
-                tokenized.append(tokens)
+        self.entity_indexes = load_or_build_indexes(entity_dir, build, source_path=data_path)
+        if (set(self.entity_indexes) != {key for key, _ in self.ENTITY_INDEX_COLUMNS}
+                or any(index.size != len(self.df) for index in self.entity_indexes.values())):
+            print("⚠️ Los índices de entidades no tienen una fila por reseña; se reconstruirán")
+            self.entity_indexes = save_indexes(build(), entity_dir, source_path=data_path)
 
-        return tokenized
+    def _entity_values(self, column, df, entity_lists):
+        """Entidades de una columna ner_* (listas tipadas si las hay, si no el texto)"""
+        if column in entity_lists:
+            return entity_lists[column]
+        return df[column] if column in df.columns else [''] * len(df)
 
     def _extract_semantic_features(self):
         """Extrae características semánticas de las reseñas"""
@@ -550,84 +886,145 @@ class UniversalReviewQuerySystem:
             'problems': defaultdict(list)
         }
 
-        # Palabras clave para problemas comunes
-        problem_keywords = {
-            'battery': ['battery', 'batería', 'duración', 'carga'],
-            'screen': ['screen', 'pantalla', 'display', 'brightness'],
-            'durability': ['break', 'broken', 'fragile', 'durability'],
-            'performance': ['slow', 'lag', 'performance', 'speed']
-        }
-
-        for idx, row in self.df.iterrows():
-            text = str(row.get('text', ''))
-
-            # Extraer entidades nombradas existentes
-            product = str(row.get('ner_products', ''))
-            brand = str(row.get('ner_brands', ''))
-            location = str(row.get('ner_locations', ''))
+        self._index_semantic_features(0)
 
-            if product and product != 'nan':
-                self.semantic_features['products'][product].append(idx)
-            if brand and brand != 'nan':
-                self.semantic_features['brands'][brand].append(idx)
-            if location and location != 'nan':
-                self.semantic_features['locations'][location].append(idx)
+    def _index_semantic_features(self, first_id):
+        """Agrega a semantic_features las reseñas a partir de `first_id`"""
+        features = self.review_features
+        for key, column in [('products', 'product'), ('brands', 'brand'), ('locations', 'location')]:
+            for idx, entity in enumerate(features[column][first_id:], start=first_id):
+                if entity:
+                    self.semantic_features[key][entity].append(idx)
 
-            # Detectar problemas en el texto
-            text_lower = text.lower()
-            for problem_type, keywords in problem_keywords.items():
-                if any(keyword in text_lower for keyword in keywords):
-                    self.semantic_features['problems'][problem_type].append(idx)
+        # Problemas comunes a partir de la máscara precalculada
+        for bit, problem_type in enumerate(self.PROBLEM_KEYWORDS):
+            ids = np.flatnonzero(features['problem_types'][first_id:] & (1 << bit)) + first_id
+            if len(ids):
+                self.semantic_features['problems'][problem_type].extend(ids.tolist())
 
     def build_enhanced_rdf_graph(self):
         """Construye un grafo RDF mejorado con más relaciones semánticas"""
-        self.rdf_graph = defaultdict(set)
-        self.entity_relations = defaultdict(lambda: defaultdict(set))
-
-        for idx, row in self.df.iterrows():
-            # Entidades básicas
-            product = str(row.get('ner_products', '')).strip()
-            brand = str(row.get('ner_brands', '')).strip()
-            location = str(row.get('ner_locations', '')).strip()
-            person = str(row.get('ner_persons', '')).strip()
-
-            text = str(row.get('text', ''))
-
-            # Determinar sentimiento básico
-            sentiment = self._analyze_sentiment(text)
-
-            # Crear triples RDF
-            if product and product not in ['', 'nan', 'N/A']:
-                if brand and brand not in ['', 'nan', 'N/A']:
-                    self.rdf_graph[(product, 'es_de_marca')].add(brand)
-                    self.rdf_graph[(brand, 'fabrica')].add(product)
-
-                if location and location not in ['', 'nan', 'N/A']:
-                    self.rdf_graph[(product, 'vendido_en')].add(location)
-                    self.rdf_graph[(location, 'vende')].add(product)
-
-                if person and person not in ['', 'nan', 'N/A']:
-                    self.rdf_graph[(person, 'compró')].add(product)
-                    self.rdf_graph[(product, 'comprado_por')].add(person)
+        self.rdf_graph = TripleStore()
+        features = self.review_features
+        for idx in np.flatnonzero((features['product'] != '') & self.doc_ids.alive):
+            for triple in self._review_triples(idx):
+                self.rdf_graph.add(*triple)
+
+        # Ordenar los índices SPO/POS/OSP una sola vez
+        self.rdf_graph.build()
+
+    def _review_triples(self, idx):
+        """Triples RDF que aporta la reseña idx (ninguno si no tiene producto)"""
+        features = self.review_features
+        # Entidades básicas (columnas precalculadas)
+        product = features['product'][idx]
+        if not product:
+            return
+        brand = features['brand'][idx]
+        location = features['location'][idx]
+        person = features['person'][idx]
+        sentiment = features['sentiment'][idx]
 
-                # Relaciones de sentimiento
-                self.rdf_graph[(product, 'tiene_sentimiento')].add(sentiment)
-                self.rdf_graph[(sentiment, 'asociado_con')].add(product)
+        # Crear triples RDF
+        if brand:
+            yield product, 'es_de_marca', brand
+            yield brand, 'fabrica', product
 
-                # Problemas detectados
-                problems = self._detect_problems(text)
-                for problem in problems:
-                    self.rdf_graph[(product, 'tiene_problema')].add(problem)
-                    self.rdf_graph[(problem, 'afecta_a')].add(product)
+        if location:
+            yield product, 'vendido_en', location
+            yield location, 'vende', product
+
+        if person:
+            yield person, 'compró', product
+            yield product, 'comprado_por', person
+
+        # Relaciones de sentimiento
+        yield product, 'tiene_sentimiento', sentiment
+        yield sentiment, 'asociado_con', product
+
+        # Problemas detectados
+        for problem in self._review_problems(idx):
+            yield product, 'tiene_problema', problem
+            yield problem, 'afecta_a', product
+
+    def add_reviews(self, df):
+        """Agrega reseñas nuevas sin reconstruir índice, grafo ni características; devuelve sus ids"""
+        start_time = time.time()
+        columns = [column for column in self.QUERY_COLUMNS if column in df.columns]
+        if df.empty or 'text' not in columns:
+            return range(len(self.doc_ids), len(self.doc_ids))
+
+        new_df, new_lists = self._prepare_reviews(df[columns].copy())
+        new_ids = self.doc_ids.allocate(len(new_df))
+        first_id = new_ids.start
+        new_df.index = pd.RangeIndex(new_ids.start, new_ids.stop)
+        new_df = new_df.reindex(columns=self._df_blocks[0].columns, fill_value='')
+
+        # BM25: segmento en memoria con los documentos nuevos
+        texts = new_df['text'].astype(str).tolist()
+        self.bm25.add_documents(self._tokenize_texts(texts))
+        self.texts.extend(texts)
+
+        # Características y banderas del lote
+        features, flags = self._compute_review_features(new_df)
+        self.review_features.append(features)
+        self.review_flags.append(flags)
+
+        # Índices de entidades (el lote se indexa aparte)
+        for key, column in self.ENTITY_INDEX_COLUMNS:
+            self.entity_indexes[key].add(self._entity_values(column, new_df, new_lists))
+
+        # El DataFrame se guarda por bloques (se une solo si alguien lo lee)
+        self._df_blocks.append(new_df)
+        self.result_columns.append(display_columns(new_df))
+        self._index_semantic_features(first_id)
+
+        # Grafo RDF: solo se insertan los triples nuevos
+        for idx in new_ids:
+            for triple in self._review_triples(idx):
+                self.rdf_graph.add(*triple)
+        self.rdf_graph.build()
+        self.index_version += 1
+
+        self._check_alignment()
+        print(f"{len(new_df)} reseñas agregadas en {time.time() - start_time:.2f} s "
+              f"(total: {self.doc_ids.n_alive})")
+        return new_ids
+
+    def delete_reviews(self, doc_ids):
+        """Borra reseñas por id dejando lápidas; devuelve los ids que estaban vigentes"""
+        deleted = self.doc_ids.delete(doc_ids)
+
+        features = self.review_features
+        for idx in deleted:
+            for triple in self._review_triples(idx):
+                self.rdf_graph.remove(*triple)
+
+            for key, column in [('products', 'product'), ('brands', 'brand'), ('locations', 'location')]:
+                entity = features[column][idx]
+                if entity:
+                    self._discard_semantic_id(key, entity, idx)
+            for bit, problem_type in enumerate(self.PROBLEM_KEYWORDS):
+                if features['problem_types'][idx] & (1 << bit):
+                    self._discard_semantic_id('problems', problem_type, idx)
+        self.rdf_graph.build()
+        self.index_version += 1
+
+        print(f"{len(deleted)} reseñas borradas (vigentes: {self.doc_ids.n_alive})")
+        return deleted
+
+    def _discard_semantic_id(self, key, entity, idx):
+        ids = self.semantic_features[key].get(entity)
+        if ids is not None and idx in ids:
+            ids.remove(idx)
+            if not ids:
+                del self.semantic_features[key][entity]
 
     def _analyze_sentiment(self, text):
         """Análisis básico de sentimiento"""
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'perfect', 'love', 'best']
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'worst', 'hate', 'problem']
-
-        text_lower = text.lower()
-        pos_count = sum(1 for word in positive_words if word in text_lower)
-        neg_count = sum(1 for word in negative_words if word in text_lower)
+        found = self.review_lexicon.find(text.lower())
+        pos_count = sum(1 for word in self.SENTIMENT_WORDS['positivo'] if word in found)
+        neg_count = sum(1 for word in self.SENTIMENT_WORDS['negativo'] if word in found)
 
         if pos_count > neg_count:
             return 'positivo'
@@ -639,118 +1036,138 @@ class UniversalReviewQuerySystem:
     def _detect_problems(self, text):
         """Detecta problemas mencionados en el texto"""
         problems = []
-        text_lower = text.lower()
-
-        problem_patterns = {
-            'batería': ['battery', 'batería', 'charge', 'power'],
-            'pantalla': ['screen', 'display', 'pantalla'],
-            'durabilidad': ['break', 'broken', 'crack', 'fragile'],
-            'rendimiento': ['slow', 'lag', 'performance', 'freeze']
-        }
+        found = self.review_lexicon.find(text.lower())
 
-        for problem, keywords in problem_patterns.items():
-            if any(keyword in text_lower for keyword in keywords):
+        for problem, keywords in self.PROBLEM_PATTERNS.items():
+            if any(keyword in found for keyword in keywords):
                 problems.append(problem)
 
         return problems
 
     def semantic_rdf_query(self, query_text):
-        """Consulta semántica del grafo RDF"""
-        query_lower = query_text.lower()
+        """Consulta semántica del grafo RDF (con caché por consulta normalizada)"""
+        query_lower = ' '.join(query_text.lower().split())
+        key = ('rdf', query_lower)
+        results = self.query_cache.get(key, self.index_version)
+        if results is None:
+            results = self._run_semantic_rdf_query(query_lower)
+            self.query_cache.put(key, self.index_version, results)
+        return list(results)
+
+    def _run_semantic_rdf_query(self, query_lower):
         results = []
+        terms = self.query_analyzer.terms(query_lower)
 
         # Patrones de consulta semántica
-        if any(word in query_lower for word in ['quejas', 'problemas', 'negativo', 'malo']):
+        if any(word in terms for word in self.RDF_NEGATIVE_KEYWORDS):
             # Buscar productos con sentimiento negativo
-            negative_products = self.rdf_graph.get(('negativo', 'asociado_con'), set())
+            negative_products = self.rdf_graph.objects('negativo', 'asociado_con')
             for product in negative_products:
                 results.extend(self.query_rdf_graph(subject=product, predicate='tiene_problema'))
 
         # Buscar por ubicación específica
-        for location in ['méxico', 'mexico', 'españa', 'spain']:
-            if location in query_lower:
-                location_products = self.rdf_graph.get((location.title(), 'vende'), set())
+        for location in self.RDF_LOCATIONS:
+            if location in terms:
+                location_products = self.rdf_graph.objects(location.title(), 'vende')
                 for product in location_products:
                     results.extend(self.query_rdf_graph(subject=product))
 
         # Buscar por problemas específicos
-        problem_map = {
-            'batería': 'batería',
-            'battery': 'batería',
-            'pantalla': 'pantalla',
-            'screen': 'pantalla',
-            'durabilidad': 'durabilidad'
-        }
-
-        for keyword, problem in problem_map.items():
-            if keyword in query_lower:
-                problem_products = self.rdf_graph.get((problem, 'afecta_a'), set())
+        for keyword, problem in self.RDF_PROBLEM_MAP.items():
+            if keyword in terms:
+                problem_products = self.rdf_graph.objects(problem, 'afecta_a')
                 for product in problem_products:
                     results.extend(self.query_rdf_graph(subject=product, predicate='tiene_problema', obj=problem))
 
         # Si no hay resultados específicos, devolver muestra general
         if not results:
-            all_triples = []
-            for key, values in list(self.rdf_graph.items())[:50]: # Limitar para performance
-                for value in values:
-                    all_triples.append((key[0], key[1], value))
-            return all_triples[:20]
+            return self.rdf_graph.triples(limit=20)
 
         return list(set(results))[:20] # Eliminar duplicados y limitar
 
-    def query_rdf_graph(self, subject=None, predicate=None, obj=None):
+    def query_rdf_graph(self, subject=None, predicate=None, obj=None, limit=None):
         """Consulta el grafo RDF con patrones de triple"""
-        results = []
-
-        for (subj, pred), objects in self.rdf_graph.items():
-            if (subject is None or subject == subj) and (predicate is None or predicate == pred):
-                for o in objects:
-                    if obj is None or obj == o:
-                        results.append((subj, pred, o))
-
-        return results
+        return self.rdf_graph.triples(subject=subject, predicate=predicate, obj=obj, limit=limit)
 
     def enhanced_semantic_search(self, query, top_n=10):
         """Búsqueda semántica mejorada con análisis de intención"""
         if not hasattr(self, 'bm25') or self.bm25 is None:
             return []
 
-        # Análisis de intención de la consulta
-        intent = self._analyze_query_intent(query)
+        # Intención, expansión con sinónimos y tokens en una sola pasada (memorizada)
+        analysis = self.query_analyzer.analyze(query)
+        intent = analysis.intent
+        tokens = list(analysis.tokens)
+
+        key = self._search_key(tokens, intent, top_n)
+        ranked = self.query_cache.get(key, self.index_version)
+        if ranked is None:
+            # Obtener puntuaciones BM25 (solo de las reseñas que contienen algún término)
+            ranked = self._rank_results(*self.bm25.get_sparse_scores(tokens), intent, top_n)
+            self.query_cache.put(key, self.index_version, ranked)
+        return self._enhanced_results(ranked, intent)
+
+    def _search_key(self, tokens, intent, top_n):
+        """Clave del caché: tokens ordenados, intención y top_n"""
+        return ('search', tuple(sorted(tokens)), tuple(sorted(intent.items())), top_n)
+
+    def batch_search(self, queries, top_n=10, max_workers=None):
+        """Ejecuta muchas consultas de enhanced_semantic_search de una vez"""
+        results = [None] * len(queries)
+
+        # Consultas con la misma clave se calculan una sola vez; el caché se comparte
+        pending = {}
+        for i, query in enumerate(queries):
+            analysis = self.query_analyzer.analyze(query)
+            key = self._search_key(analysis.tokens, analysis.intent, top_n)
+            cached = self.query_cache.get(key, self.index_version)
+            if cached is not None:
+                results[i] = self._enhanced_results(cached, analysis.intent)
+            elif key in pending:
+                pending[key][2].append(i)
+            else:
+                pending[key] = (list(analysis.tokens), analysis.intent, [i])
 
-        # Expandir consulta con sinónimos y términos relacionados
-        expanded_query = self._expand_query(query)
+        def search(tokens, intent):
+            return self._rank_results(*self.bm25.get_sparse_scores(tokens), intent, top_n)
 
-        # Tokenizar consulta expandida
-        tokens = word_tokenize(expanded_query.lower())
-        english_stopwords = set(stopwords.words('english'))
-        tokens = [t for t in tokens
-                  if t not in english_stopwords
-                  and len(t) > 2
-                  and re.match(r'^[a-zA-Z]+$', t)] # Corregido aquí
+        # Trabajo de CPU (numpy libera el GIL): un hilo por núcleo; con uno solo, sin pool
+        tokens_list = [tokens for tokens, _, _ in pending.values()]
+        intents = [intent for _, intent, _ in pending.values()]
+        workers = max_workers or os.cpu_count() or 1
+        if workers == 1 or len(pending) < 2:
+            rankings = list(map(search, tokens_list, intents))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                rankings = list(pool.map(search, tokens_list, intents))
 
-        # Obtener puntuaciones BM25
-        scores = self.bm25.get_scores(tokens)
+        for (key, (_, intent, positions)), ranked in zip(pending.items(), rankings):
+            self.query_cache.put(key, self.index_version, ranked)
+            for i in positions:
+                results[i] = self._enhanced_results(ranked, dict(intent))
+
+        return results
 
-        # Aplicar boost basado en intención
-        boosted_scores = self._apply_intent_boost(scores, intent)
+    def _rank_results(self, doc_ids, scores, intent, top_n):
+        """Boost de intención y selección diversa (doc_ids None: todo el corpus); devuelve pares (id, puntuación)"""
+        # Aplicar boost basado en intención (las reseñas borradas quedan fuera)
+        boosted_scores = self._apply_intent_boost(scores, intent, doc_ids)
 
-        # Obtener mejores resultados
-        top_indices = np.argsort(boosted_scores)[::-1][:top_n*2]
+        # Obtener mejores resultados (selección parcial, sin ordenar todas las puntuaciones)
+        top_positions = top_k_indices(boosted_scores, top_n*2)
+        top_indices = top_positions if doc_ids is None else doc_ids[top_positions]
 
         # Filtrar por relevancia mínima y diversidad
         min_score = 1.5
         results = []
         seen_products = set()
 
-        for idx in top_indices:
-            if boosted_scores[idx] > min_score:
-                result = self._format_enhanced_result(idx, boosted_scores[idx], intent)
-
+        for position, idx in zip(top_positions, top_indices):
+            if boosted_scores[position] > min_score:
                 # Evitar productos duplicados para diversidad
-                product = result['data'].get('Producto', '')
+                product = self.result_columns['Producto'][idx]
                 if product not in seen_products or len(results) < 3:
-                    results.append(result)
+                    results.append((idx, boosted_scores[position]))
                     if product:
                         seen_products.add(product)
 
@@ -759,251 +1176,209 @@ class UniversalReviewQuerySystem:
 
         return results
 
+    def _enhanced_results(self, ranked, intent):
+        """Resultados nuevos (con campos perezosos) para los pares (id, puntuación)"""
+        return [self._format_enhanced_result(idx, score, intent) for idx, score in ranked]
+
     def _analyze_query_intent(self, query):
         """Analiza la intención de la consulta"""
-        query_lower = query.lower()
-
-        intent = {
-            'sentiment': 'neutral',
-            'problem_focus': False,
-            'location_focus': False,
-            'brand_focus': False,
-            'comparison': False
-        }
-
-        # Detectar sentimiento
-        if any(word in query_lower for word in ['quejas', 'problemas', 'malo', 'negativo', 'complaints', 'problems', 'bad']):
-            intent['sentiment'] = 'negative'
-        elif any(word in query_lower for word in ['bueno', 'positivo', 'recomendado', 'good', 'positive', 'recommended']):
-            intent['sentiment'] = 'positive'
-
-        # Detectar enfoque en problemas
-        if any(word in query_lower for word in ['batería', 'battery', 'pantalla', 'screen', 'durabilidad', 'performance']):
-            intent['problem_focus'] = True
-
-        # Detectar enfoque geográfico
-        if any(word in query_lower for word in ['méxico', 'mexico', 'españa', 'spain', 'en', 'ubicación']):
-            intent['location_focus'] = True
-
-        # Detectar enfoque en marcas
-        if any(word in query_lower for word in ['samsung', 'apple', 'sony', 'marca', 'brand']):
-            intent['brand_focus'] = True
-
-        return intent
+        return self.query_analyzer.analyze(query).intent
 
     def _expand_query(self, query):
         """Expande la consulta con sinónimos y términos relacionados"""
-        query_lower = query.lower()
-
-        # Diccionario de expansiones
-        expansions = {
-            'batería': 'battery power charge duración energía',
-            'battery': 'batería power charge duration energy',
-            'pantalla': 'screen display monitor visualización',
-            'screen': 'pantalla display monitor visualization',
-            'problems': 'problemas issues defects fallas',
-            'problemas': 'problems issues defects failures',
-            'méxico': 'mexico mexican latinoamerica',
-            'mexico': 'méxico mexican latin america'
-        }
-
-        expanded = query
-        for term, synonyms in expansions.items():
-            if term in query_lower:
-                expanded += ' ' + synonyms
-
-        return expanded
-
-    def _apply_intent_boost(self, scores, intent):
-        """Aplica boost a las puntuaciones basado en la intención"""
-        boosted_scores = scores.copy()
-
-        for idx, score in enumerate(scores):
-            row = self.df.iloc[idx]
-            boost = 1.0
-
-            # Boost por sentimiento
-            text_lower = str(row.get('text', '')).lower()
-            if intent['sentiment'] == 'negative':
-                if any(word in text_lower for word in ['bad', 'terrible', 'problem', 'issue']):
-                    boost *= 1.5
-            elif intent['sentiment'] == 'positive':
-                if any(word in text_lower for word in ['good', 'great', 'excellent', 'amazing']):
-                    boost *= 1.5
-
-            # Boost por problemas específicos
-            if intent['problem_focus']:
-                if any(word in text_lower for word in ['battery', 'screen', 'break', 'slow']):
-                    boost *= 1.3
-
-            # Boost por ubicación
-            if intent['location_focus']:
-                location = str(row.get('ner_locations', '')).lower()
-                if location and any(loc in location for loc in ['mexico', 'méxico', 'spain', 'españa']):
-                    boost *= 1.4
-
-            boosted_scores[idx] = score * boost
-
-        return boosted_scores
+        return self.query_analyzer.analyze(query).expanded
+
+    def _apply_intent_boost(self, scores, intent, doc_ids=None):
+        """Aplica boost a las puntuaciones de doc_ids según la intención (0 para reseñas borradas)"""
+        boost = self._intent_boost(intent)
+        return scores * (boost if doc_ids is None else boost[doc_ids])
+
+    def _intent_boost(self, intent):
+        """Vector de boost de una intención, memorizado hasta el próximo cambio de índice"""
+        key = (self.index_version, tuple(sorted(intent.items())))
+        with self._boost_lock:
+            boost = self._boost_cache.get(key)
+            if boost is None:
+                if any(cached_key[0] != self.index_version for cached_key in self._boost_cache):
+                    self._boost_cache = {}
+                boost = self._boost_cache[key] = self._compute_intent_boost(intent)
+        return boost
+
+    def _compute_intent_boost(self, intent):
+        # Las banderas se precalculan al cargar (alineadas por id de documento);
+        # el boost es una multiplicación vectorizada
+        flags = self.review_flags
+        boost = np.ones(len(self.doc_ids))
+
+        # Boost por sentimiento
+        if intent['sentiment'] == 'negative':
+            boost[flags['negative']] *= 1.5
+        elif intent['sentiment'] == 'positive':
+            boost[flags['positive']] *= 1.5
+
+        # Boost por problemas específicos
+        if intent['problem_focus']:
+            boost[flags['problem']] *= 1.3
+
+        # Boost por ubicación
+        if intent['location_focus']:
+            boost[flags['location']] *= 1.4
+
+        boost[~self.doc_ids.alive] = 0
+        return boost
 
     def _format_enhanced_result(self, idx, score, intent):
         """Formatea resultado mejorado con información semántica"""
-        row = self.df.iloc[idx]
-
-        # Usar formato base
-        base_result = self._format_result(idx, score)
+        result = self._format_result(idx, score)
+        result['intent_match'] = intent
+        result.defer('triples', lambda: self._enhanced_triples(idx))
+        result.defer('problems_detected', lambda: self._review_problems(idx))
+        return result
 
-        # Agregar información semántica
-        text = str(row.get('text', ''))
-        product = str(row.get('ner_products', ''))
+    def _enhanced_triples(self, idx):
+        """Triples del producto de la reseña en el grafo y problemas que menciona"""
+        # Agregar información semántica (características precalculadas)
+        product = self.review_features['product'][idx]
 
         # Extraer triples RDF relevantes
         triples = []
-        if product and product != 'nan':
-            # Buscar triples relacionados con este producto
-            for (subj, pred), objs in self.rdf_graph.items():
-                if subj == product:
-                    for obj in list(objs)[:3]: # Limitar a 3 por predicado
-                        triples.append((subj, pred, obj))
+        if product:
+            # Buscar triples relacionados con este producto (rango SPO)
+            per_predicate = Counter()
+            for subj, pred, obj in self.rdf_graph.triples(subject=product):
+                if per_predicate[pred] < 3: # Limitar a 3 por predicado
+                    triples.append((subj, pred, obj))
+                    per_predicate[pred] += 1
 
         # Detectar problemas mencionados específicamente
-        detected_problems = self._detect_problems(text)
-        if detected_problems:
-            for problem in detected_problems:
-                triples.append((product if product != 'nan' else 'Producto', 'menciona_problema', problem))
+        for problem in self._review_problems(idx):
+            triples.append((product or 'Producto', 'menciona_problema', problem))
 
-        # Agregar información de intención
-        base_result['intent_match'] = intent
-        base_result['triples'] = triples
-        base_result['problems_detected'] = detected_problems
-
-        return base_result
+        return triples
 
     def advanced_semantic_search(self, product=None, brand=None, sentiment=None, location=None, failure_keyword=None, top_n=15):
         """Búsqueda semántica avanzada con filtros múltiples"""
-        df = self.df.copy()
-
-        # Aplicar filtros
-        if product:
-            df = df[df['ner_products'].str.contains(product, case=False, na=False)]
-
-        if brand:
-            df = df[df['ner_brands'].str.contains(brand, case=False, na=False)]
-
-        if location:
-            df = df[df['ner_locations'].str.contains(location, case=False, na=False)]
+        # Filtros de entidades: búsqueda en los índices invertidos e intersección de ids
+        entity_filters = {'product': product, 'brand': brand, 'location': location}
+        id_arrays = [self.entity_indexes[key].lookup(value) for key, value in entity_filters.items() if value]
+        if id_arrays:
+            candidate_ids = self.doc_ids.live(intersect_ids(id_arrays))
+        else:
+            candidate_ids = np.flatnonzero(self.doc_ids.alive)
 
         if sentiment:
-            # Filtrar por sentimiento en el texto
+            # Filtrar por sentimiento en el texto (banderas precalculadas)
             if sentiment.lower() in ['negativo', 'negative']:
-                mask = df['text'].str.contains('|'.join(['bad', 'terrible', 'awful', 'problem', 'issue']), case=False, na=False)
-                df = df[mask]
+                candidate_ids = candidate_ids[self.review_flags['filter_negative'][candidate_ids]]
             elif sentiment.lower() in ['positivo', 'positive']:
-                mask = df['text'].str.contains('|'.join(['good', 'great', 'excellent', 'amazing', 'perfect']), case=False, na=False)
-                df = df[mask]
+                candidate_ids = candidate_ids[self.review_flags['filter_positive'][candidate_ids]]
 
-        if df.empty:
+        if not len(candidate_ids):
             return []
 
-        # Ranking por palabra clave de falla
+        # Ranking por palabra clave de falla sobre el índice global, solo en los candidatos
+        scores = None
         if failure_keyword:
-            text_list = df['text'].astype(str).tolist()
-            tokenized_texts = []
-
-            for text in text_list:
-                tokens = word_tokenize(text.lower())
-                english_stopwords = set(stopwords.words('english'))
-                tokens = [t for t in tokens if t not in english_stopwords and len(t) > 2]
-                tokenized_texts.append(tokens)
-
-            if tokenized_texts:
-                bm25 = BM25Okapi(tokenized_texts)
-                keyword_tokens = word_tokenize(failure_keyword.lower())
-                keyword_tokens = [t for t in keyword_tokens if len(t) > 2]
-                scores = bm25.get_scores(keyword_tokens)
-
-                # Ordenar por relevancia
-                top_indices = np.argsort(scores)[::-1][:top_n]
-                selected_rows = df.iloc[top_indices]
-            else:
-                selected_rows = df.head(top_n)
+            # Mismo tokenizador que el índice (sin stopwords, solo letras)
+            keyword_tokens = self.query_analyzer.tokenize(failure_keyword)
+            scores = self.bm25.get_batch_scores(keyword_tokens, candidate_ids)
+
+            # Ordenar por relevancia
+            top_indices = top_k_indices(scores, top_n)
         else:
-            selected_rows = df.head(top_n)
+            top_indices = np.arange(min(top_n, len(candidate_ids)))
 
-        # Formatear resultados
+        # Formatear resultados (los triples se extraen solo si se leen)
         results = []
-        for idx, (original_idx, row) in enumerate(selected_rows.iterrows()):
-            score = scores[top_indices[idx]] if failure_keyword and 'scores' in locals() and top_indices.any() else 1.0
+        for position in top_indices:
+            original_idx = int(candidate_ids[position])
+            score = scores[position] if scores is not None else 1.0
 
+            result = self._format_result(original_idx, score)
+            result.defer('triples', lambda idx=original_idx: self._advanced_triples(idx))
+            results.append(result)
 
-            # Extraer triples RDF
-            triples = []
-            product_name = str(row.get('ner_products', ''))
-            brand_name = str(row.get('ner_brands', ''))
-            location_name = str(row.get('ner_locations', ''))
+        return results
 
-            if product_name and product_name != 'nan':
-                if brand_name and brand_name != 'nan':
-                    triples.append((product_name, 'es_de_marca', brand_name))
-                if location_name and location_name != 'nan':
-                    triples.append((product_name, 'vendido_en', location_name))
+    def _advanced_triples(self, idx):
+        """Triples RDF de la reseña idx (características precalculadas)"""
+        triples = []
+        features = self.review_features
+        product_name = features['product'][idx]
+        brand_name = features['brand'][idx]
+        location_name = features['location'][idx]
 
-                # Sentimiento detectado
-                text_sentiment = self._analyze_sentiment(str(row.get('text', '')))
-                triples.append((product_name, 'tiene_sentimiento', text_sentiment))
+        if product_name:
+            if brand_name:
+                triples.append((product_name, 'es_de_marca', brand_name))
+            if location_name:
+                triples.append((product_name, 'vendido_en', location_name))
 
-                # Problemas detectados
-                problems = self._detect_problems(str(row.get('text', '')))
-                for problem in problems:
-                    triples.append((product_name, 'tiene_problema', problem))
+            # Sentimiento detectado
+            triples.append((product_name, 'tiene_sentimiento', features['sentiment'][idx]))
 
-            # Formatear resultado
-            result = self._format_result(original_idx, score)
-            result['triples'] = triples
-            results.append(result)
+            # Problemas detectados
+            for problem in self._review_problems(idx):
+                triples.append((product_name, 'tiene_problema', problem))
 
-        return results
+        return triples
 
     def visualize_complete_semantic_graph(self):
         """Visualiza el grafo semántico completo"""
+        plot = self.complete_graph_plot()
+        self.draw_graph_plot(plot)
+        return plot['info']
+
+    def visualize_sentiment_network(self):
+        """Visualiza la red de sentimientos por productos"""
+        plot = self.sentiment_network_plot()
+        self.draw_graph_plot(plot)
+        return plot['info']
+
+    def visualize_product_network(self):
+        """Visualiza la red de productos por marcas y problemas"""
+        plot = self.product_network_plot()
+        self.draw_graph_plot(plot)
+        return plot['info']
+
+    def draw_graph_plot(self, plot):
+        """Dibuja un grafo ya calculado (matplotlib: solo desde el hilo de la interfaz)"""
+        G, pos = plot['graph'], plot['pos']
+        plt.figure(figsize=plot['figsize'])
+
+        for layer in plot['nodes']:
+            nx.draw_networkx_nodes(G, pos, **layer)
+        nx.draw_networkx_edges(G, pos, **plot['edges'])
+        nx.draw_networkx_labels(G, pos, plot['labels'], font_size=plot['font_size'])
+
+        plt.title(plot['title'], fontsize=14)
+        plt.axis('off')
+        plt.tight_layout()
+        plt.show()
+
+    # Los métodos *_plot construyen el grafo, su distribución (spring_layout) y el
+    # texto informativo sin tocar matplotlib, así que pueden correr en otro hilo.
+    def complete_graph_plot(self):
+        """Grafo semántico completo listo para draw_graph_plot"""
         if not hasattr(self, 'rdf_graph'):
             self.build_enhanced_rdf_graph()
 
         G = nx.DiGraph()
 
         # Agregar nodos y aristas desde el grafo RDF
-        edge_count = 0
-        for (subj, pred), objs in self.rdf_graph.items():
-            for obj in objs:
-                if edge_count < 100: # Limitar para visualización
-                    G.add_edge(subj, obj, relation=pred)
-                    edge_count += 1
-
-        # Crear visualización
-        plt.figure(figsize=(15, 10))
+        for subj, pred, obj in self.rdf_graph.triples(limit=100): # Limitar para visualización
+            G.add_edge(subj, obj, relation=pred)
+
         pos = nx.spring_layout(G, k=1.5, iterations=50)
 
-        # Dibujar nodos por tipo
+        # Nodos por tipo
         product_nodes = [n for n in G.nodes() if any(n in products for products in self.semantic_features['products'].keys())]
         sentiment_nodes = [n for n in G.nodes() if n in ['positivo', 'negativo', 'neutro']]
         other_nodes = [n for n in G.nodes() if n not in product_nodes and n not in sentiment_nodes]
 
-        nx.draw_networkx_nodes(G, pos, nodelist=product_nodes, node_color='lightblue', node_size=300, alpha=0.8)
-        nx.draw_networkx_nodes(G, pos, nodelist=sentiment_nodes, node_color='lightcoral', node_size=400, alpha=0.8)
-        nx.draw_networkx_nodes(G, pos, nodelist=other_nodes, node_color='lightgreen', node_size=200, alpha=0.8)
-
-        # Dibujar aristas
-        nx.draw_networkx_edges(G, pos, alpha=0.6, edge_color='gray', arrows=True, arrowsize=10)
-
         # Etiquetas selectivas
         important_nodes = product_nodes + sentiment_nodes
         labels = {n: n for n in important_nodes if len(n) < 15}
-        nx.draw_networkx_labels(G, pos, labels, font_size=8)
-
-        plt.title("Grafo Semántico Completo - Productos, Sentimientos y Relaciones", fontsize=14)
-        plt.axis('off')
-        plt.tight_layout()
-        plt.show()
 
         # Información del grafo
         info = f"""
@@ -1025,22 +1400,32 @@ class UniversalReviewQuerySystem:
    problemas y ubicaciones extraídas de las reseñas de usuarios.
         """
 
-        return info
+        return {
+            'graph': G,
+            'pos': pos,
+            'figsize': (15, 10),
+            'nodes': [
+                dict(nodelist=product_nodes, node_color='lightblue', node_size=300, alpha=0.8),
+                dict(nodelist=sentiment_nodes, node_color='lightcoral', node_size=400, alpha=0.8),
+                dict(nodelist=other_nodes, node_color='lightgreen', node_size=200, alpha=0.8),
+            ],
+            'edges': dict(alpha=0.6, edge_color='gray', arrows=True, arrowsize=10),
+            'labels': labels,
+            'font_size': 8,
+            'title': "Grafo Semántico Completo - Productos, Sentimientos y Relaciones",
+            'info': info,
+        }
 
-    def visualize_sentiment_network(self):
-        """Visualiza la red de sentimientos por productos"""
+    def sentiment_network_plot(self):
+        """Red de sentimientos por productos lista para draw_graph_plot"""
         G = nx.Graph()
 
         # Crear red de productos y sentimientos
         sentiment_data = defaultdict(list)
 
-        for idx, row in self.df.iterrows():
-            product = str(row.get('ner_products', '')).strip()
-            text = str(row.get('text', ''))
-
-            if product and product not in ['', 'nan', 'N/A']:
-                sentiment = self._analyze_sentiment(text)
-                sentiment_data[product].append(sentiment)
+        features = self.review_features
+        for idx in np.flatnonzero((features['product'] != '') & self.doc_ids.alive):
+            sentiment_data[features['product'][idx]].append(features['sentiment'][idx])
 
         # Calcular sentimientos dominantes por producto
         for product, sentiments in sentiment_data.items():
@@ -1058,8 +1443,6 @@ class UniversalReviewQuerySystem:
                 if G.nodes[prod1]['sentiment'] == G.nodes[prod2]['sentiment']:
                     G.add_edge(prod1, prod2, weight=0.5)
 
-        # Visualización
-        plt.figure(figsize=(12, 8))
         pos = nx.spring_layout(G, k=2, iterations=50)
 
         # Colores por sentimiento
@@ -1067,17 +1450,8 @@ class UniversalReviewQuerySystem:
         node_colors = [color_map.get(G.nodes[node]['sentiment'], 'lightgray') for node in G.nodes()]
         node_sizes = [G.nodes[node]['count'] * 50 for node in G.nodes()]
 
-        nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=node_sizes, alpha=0.8)
-        nx.draw_networkx_edges(G, pos, alpha=0.3, edge_color='gray')
-
         # Etiquetas
         labels = {n: n[:15] + '...' if len(n) > 15 else n for n in G.nodes()}
-        nx.draw_networkx_labels(G, pos, labels, font_size=8)
-
-        plt.title("Red de Sentimientos por Productos", fontsize=14)
-        plt.axis('off')
-        plt.tight_layout()
-        plt.show()
 
         # Estadísticas
         sentiment_stats = Counter(G.nodes[node]['sentiment'] for node in G.nodes())
@@ -1097,27 +1471,37 @@ class UniversalReviewQuerySystem:
 📏 El tamaño del nodo representa el número de reseñas analizadas.
         """
 
-        return info
+        return {
+            'graph': G,
+            'pos': pos,
+            'figsize': (12, 8),
+            'nodes': [dict(node_color=node_colors, node_size=node_sizes, alpha=0.8)],
+            'edges': dict(alpha=0.3, edge_color='gray'),
+            'labels': labels,
+            'font_size': 8,
+            'title': "Red de Sentimientos por Productos",
+            'info': info,
+        }
 
-    def visualize_product_network(self):
-        """Visualiza la red de productos por marcas y problemas"""
+    def product_network_plot(self):
+        """Red de productos, marcas y problemas lista para draw_graph_plot"""
         G = nx.Graph()
 
         # Agregar productos y sus relaciones
-        for idx, row in self.df.iterrows():
-            product = str(row.get('ner_products', '')).strip()
-            brand = str(row.get('ner_brands', '')).strip()
-            text = str(row.get('text', ''))
+        features = self.review_features
+        for idx in np.flatnonzero((features['product'] != '') & self.doc_ids.alive):
+            product = features['product'][idx]
+            brand = features['brand'][idx]
 
-            if product and product not in ['', 'nan', 'N/A']:
-                # Detectar problemas
-                problems = self._detect_problems(text)
+            if product:
+                # Problemas precalculados
+                problems = self._review_problems(idx)
 
                 # Agregar nodo producto
                 G.add_node(product, type='product')
 
                 # Conectar con marca
-                if brand and brand not in ['', 'nan', 'N/A']:
+                if brand:
                     G.add_node(brand, type='brand')
                     G.add_edge(product, brand, relation='marca')
 
@@ -1127,8 +1511,6 @@ class UniversalReviewQuerySystem:
                     G.add_node(problem_node, type='problem')
                     G.add_edge(product, problem_node, relation='problema')
 
-        # Visualización
-        plt.figure(figsize=(14, 10))
         pos = nx.spring_layout(G, k=3, iterations=50)
 
         # Colores por tipo de nodo
@@ -1145,18 +1527,9 @@ class UniversalReviewQuerySystem:
             else:
                 node_sizes.append(200)
 
-        nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=node_sizes, alpha=0.8)
-        nx.draw_networkx_edges(G, pos, alpha=0.4, edge_color='gray')
-
         # Etiquetas selectivas
         important_nodes = [n for n in G.nodes() if G.degree(n) > 1][:20]
         labels = {n: n[:12] + '...' if len(n) > 12 else n for n in important_nodes}
-        nx.draw_networkx_labels(G, pos, labels, font_size=7)
-
-        plt.title("Red de Productos, Marcas y Problemas", fontsize=14)
-        plt.axis('off')
-        plt.tight_layout()
-        plt.show()
 
         # Análisis de centralidad
         centrality = nx.degree_centrality(G)
@@ -1183,21 +1556,30 @@ class UniversalReviewQuerySystem:
 📏 El tamaño indica el tipo de entidad: productos (grande), marcas (medio), problemas (pequeño).
         """
 
-        return info
+        return {
+            'graph': G,
+            'pos': pos,
+            'figsize': (14, 10),
+            'nodes': [dict(node_color=node_colors, node_size=node_sizes, alpha=0.8)],
+            'edges': dict(alpha=0.4, edge_color='gray'),
+            'labels': labels,
+            'font_size': 7,
+            'title': "Red de Productos, Marcas y Problemas",
+            'info': info,
+        }
 
     def export_rdf_triples_csv(self, filename):
         """Exporta las triples RDF a un archivo CSV"""
         triples_data = []
 
         # Convertir grafo RDF a lista de triples
-        for (subject, predicate), objects in self.rdf_graph.items():
-            for obj in objects:
-                triples_data.append({
-                    'subject': subject,
-                    'predicate': predicate,
-                    'object': obj,
-                    'type': 'semantic_relation'
-                })
+        for subject, predicate, obj in self.rdf_graph.triples():
+            triples_data.append({
+                'subject': subject,
+                'predicate': predicate,
+                'object': obj,
+                'type': 'semantic_relation'
+            })
 
         # Agregar estadísticas del grafo
         stats = {
@@ -1225,66 +1607,13 @@ class UniversalReviewQuerySystem:
 
     def _format_result(self, idx, score):
         """Formatea un resultado individual"""
-        row = self.df.iloc[idx]
-
-        get_val = lambda col: row[col] if col in row and pd.notna(row[col]) and row[col] != '' else 'N/A'
-
-        producto = get_val('ner_products')
-        marca = get_val('ner_brands')
-        lugar = get_val('ner_locations')
-        persona = get_val('ner_persons')
-        precio = get_val('extracted_prices')
-        fecha = get_val('extracted_purchase_dates')
-        modelo = get_val('extracted_product_models')
-        rating = get_val('rating')
-
-        # Construir evento semántico
-        evento = ""
-        if persona != 'N/A' and producto != 'N/A' and fecha != 'N/A':
-            evento = f"{persona} compró {producto} en {fecha}"
-        elif persona != 'N/A' and producto != 'N/A':
-            evento = f"{persona} compró {producto}"
-        elif producto != 'N/A' and fecha != 'N/A':
-            evento = f"Compra de {producto} en {fecha}"
-        elif producto != 'N/A':
-            evento = f"Experiencia con {producto}"
-        else:
-            evento = "Experiencia de usuario"
-
-        # Formatear rating
-        rating_stars = 'N/A'
-        try:
-            rating_val = float(rating)
-            full_stars = int(rating_val)
-            half_star = 1 if rating_val - full_stars >= 0.5 else 0
-            empty_stars = 5 - full_stars - half_star
-
-            rating_stars = '★' * full_stars
-            if half_star:
-                rating_stars += '½'
-            rating_stars += '☆' * empty_stars
-            rating_stars += f" ({rating_val}/5)"
-        except (ValueError, TypeError):
-            rating_stars = rating if rating != 'N/A' else 'Sin valoración'
-
-        table_data = {
-            'Producto': producto,
-            'Marca': marca,
-            'Ubicación': lugar,
-            'Usuario': persona,
-            'Precio': precio,
-            'Fecha': fecha,
-            'Modelo': modelo,
-            'Rating': rating_stars,
-            'Evento': evento
-        }
-
-        return {
-            'review_id': idx,
+        columns = self.result_columns
+        return ReviewResult({
+            'review_id': int(idx),
             'score': round(score, 2),
-            'data': table_data,
-            'text': row['text'] if 'text' in row else ''
-        }
+            'data': lambda: row_data(columns, idx),
+            'text': columns['text'][idx],
+        }, lazy=('data',))
 if __name__ == "__main__":
     # Obtener la ruta absoluta del directorio actual del script
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -1292,7 +1621,7 @@ if __name__ == "__main__":
     # Construir ruta a los datos
     project_root = os.path.dirname(script_dir)
     data_dir = os.path.join(project_root, 'Data', 'processed_data')
-    data_path = os.path.join(data_dir, 'Music_Intruments_processed_ner.csv')
+    data_path = os.path.join(data_dir, 'Music_Intruments_processed_ner.parquet')
     
     # Verificar si el archivo existe
     if not os.path.exists(data_path):
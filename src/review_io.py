@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+# Columnas de entidades que se guardan como listas tipadas (list<string>) en Parquet
+ENTITY_COLUMNS = ['ner_products', 'ner_brands', 'ner_locations', 'ner_persons']
+
+
+def is_parquet(path):
+    """Un directorio (dataset particionado) o un archivo .parquet se leen como Parquet"""
+    return os.path.isdir(path) or path.endswith('.parquet')
+
+
+def read_reviews(path, columns=None):
+    """Lee reseñas desde Parquet (archivo o directorio particionado) o CSV.
+
+    `columns` permite proyectar solo las columnas necesarias; las que no
+    existan en el archivo se ignoran.
+    """
+    if is_parquet(path):
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        if columns is not None:
+            columns = [column for column in columns if column in dataset.schema.names]
+        return dataset.to_table(columns=columns).to_pandas()
+
+    if columns is not None:
+        wanted = set(columns)
+        return pd.read_csv(path, usecols=lambda column: column in wanted)
+    return pd.read_csv(path)
+
+
+def write_reviews(df, path):
+    """Guarda reseñas en Parquet (por defecto) o en CSV según la extensión"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if path.endswith('.csv'):
+        # CSV no admite listas: las entidades se unen con comas como antes
+        df = df.copy()
+        for column in ENTITY_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].map(join_entities)
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+
+
+def join_entities(value):
+    """Convierte una lista de entidades en el texto separado por comas que usa la interfaz"""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    try:
+        return ', '.join(str(entity) for entity in value)
+    except TypeError:
+        return ''
@@ -0,0 +1,146 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Campos de la tabla de resultados y columna del dataset de la que salen
+DISPLAY_COLUMNS = {
+    'Producto': 'ner_products',
+    'Marca': 'ner_brands',
+    'Ubicación': 'ner_locations',
+    'Usuario': 'ner_persons',
+    'Precio': 'extracted_prices',
+    'Fecha': 'extracted_purchase_dates',
+    'Modelo': 'extracted_product_models',
+    'Rating': 'rating',
+}
+
+
+def display_columns(df):
+    """Columnas de presentación como arreglos (alineados por id de documento).
+
+    Los valores vacíos o ausentes quedan como 'N/A', igual que en la tabla
+    de resultados; así formatear una fila no toca el DataFrame.
+    """
+    columns = {}
+    for field, column in DISPLAY_COLUMNS.items():
+        if column not in df.columns:
+            columns[field] = np.full(len(df), 'N/A', dtype=object)
+            continue
+        values = df[column]
+        missing = (values.isna() | (values == '')).to_numpy(dtype=bool)
+        columns[field] = values.to_numpy(dtype=object, copy=True)
+        columns[field][missing] = 'N/A'
+
+    columns['text'] = (df['text'].to_numpy(dtype=object, copy=True) if 'text' in df.columns
+                       else np.full(len(df), '', dtype=object))
+    return columns
+
+
+def rating_stars(rating):
+    """Rating como estrellas (★★★★½☆ (4.5/5))"""
+    try:
+        rating_val = float(rating)
+    except (ValueError, TypeError):
+        return rating if rating != 'N/A' else 'Sin valoración'
+
+    full_stars = int(rating_val)
+    half_star = 1 if rating_val - full_stars >= 0.5 else 0
+    empty_stars = 5 - full_stars - half_star
+
+    stars = '★' * full_stars
+    if half_star:
+        stars += '½'
+    stars += '☆' * empty_stars
+    return stars + f" ({rating_val}/5)"
+
+
+def semantic_event(persona, producto, fecha):
+    """Evento semántico de la reseña (quién compró qué y cuándo)"""
+    if persona != 'N/A' and producto != 'N/A' and fecha != 'N/A':
+        return f"{persona} compró {producto} en {fecha}"
+    elif persona != 'N/A' and producto != 'N/A':
+        return f"{persona} compró {producto}"
+    elif producto != 'N/A' and fecha != 'N/A':
+        return f"Compra de {producto} en {fecha}"
+    elif producto != 'N/A':
+        return f"Experiencia con {producto}"
+    return "Experiencia de usuario"
+
+
+def row_data(columns, idx):
+    """Tabla de datos estructurados de la reseña idx"""
+    data = {field: columns[field][idx] for field in DISPLAY_COLUMNS}
+    data['Rating'] = rating_stars(data['Rating'])
+    data['Evento'] = semantic_event(data['Usuario'], data['Producto'], data['Fecha'])
+    return data
+
+
+_PENDING = object()
+
+
+class ReviewResult(MutableMapping):
+    """Resultado de búsqueda con acceso tipo diccionario y campos perezosos.
+
+    Los campos nombrados en `lazy` (o agregados con `defer`) guardan una
+    función sin argumentos que se evalúa la primera vez que se lee el campo;
+    `in`, `keys()` y `len()` no los evalúan. `to_dict()` devuelve un
+    diccionario normal con todos los campos.
+
+    Leer desde varios hilos es seguro: el valor se guarda antes de soltar la
+    función, así que quien llega tarde encuentra uno de los dos (en el peor
+    caso el campo se calcula dos veces, con el mismo resultado).
+    """
+
+    __slots__ = ('_values', '_lazy')
+
+    def __init__(self, fields, lazy=()):
+        self._values = dict(fields)
+        self._lazy = {}
+        for key in lazy:
+            self._lazy[key] = self._values[key]
+            self._values[key] = _PENDING
+
+    def defer(self, key, compute):
+        """Agrega un campo que se calcula con `compute()` al leerlo"""
+        self._values[key] = _PENDING
+        self._lazy[key] = compute
+
+    def __getitem__(self, key):
+        value = self._values[key]
+        if value is _PENDING:
+            compute = self._lazy.get(key)
+            if compute is None:
+                # Otro hilo terminó de calcularlo entre las dos lecturas
+                return self._values[key]
+            value = self._values[key] = compute()
+            self._lazy.pop(key, None)
+        return value
+
+    def __setitem__(self, key, value):
+        self._lazy.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        del self._values[key]
+        self._lazy.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __iter__(self):
+        return iter(list(self._values))
+
+    def __len__(self):
+        return len(self._values)
+
+    def is_loaded(self, key):
+        """True si el campo ya se calculó"""
+        return key in self._values and self._values[key] is not _PENDING
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}=<perezoso>" if value is _PENDING else f"{key}={value!r}"
+                           for key, value in self._values.items())
+        return f"ReviewResult({fields})"
@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+from aiohttp import web
+
+# Muestras por endpoint para calcular percentiles de latencia
+LATENCY_WINDOW = 2048
+MAX_TOP_N = 100
+MAX_BATCH_QUERIES = 1000
+
+ADVANCED_FILTERS = ['product', 'brand', 'sentiment', 'location', 'keyword']
+
+SYSTEM_KEY = web.AppKey('system', object)
+EXECUTOR_KEY = web.AppKey('executor', ThreadPoolExecutor)
+METRICS_KEY = web.AppKey('metrics', object)
+
+
+class LatencyMetrics:
+    """Latencia por endpoint: conteo, errores, media y percentiles de una ventana reciente"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self._endpoints = {}
+
+    def record(self, endpoint, seconds, error=False):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = {'count': 0, 'errors': 0, 'total': 0.0,
+                                                 'samples': deque(maxlen=self.window)}
+        stats['count'] += 1
+        stats['errors'] += int(error)
+        stats['total'] += seconds
+        stats['samples'].append(seconds)
+
+    def snapshot(self):
+        endpoints = {}
+        for endpoint, stats in self._endpoints.items():
+            samples_ms = np.asarray(stats['samples']) * 1000
+            p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+            endpoints[endpoint] = {
+                'solicitudes': stats['count'],
+                'errores': stats['errors'],
+                'media_ms': round(stats['total'] * 1000 / stats['count'], 3),
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(samples_ms.max()), 3),
+            }
+        return {'activo_s': round(time.time() - self.started, 1), 'endpoints': endpoints}
+
+
+def _json_default(value):
+    # Tipos de numpy y conjuntos que json no serializa directamente
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+_dumps = partial(json.dumps, default=_json_default, ensure_ascii=False)
+
+
+def json_response(data, status=200):
+    return web.json_response(data, status=status, dumps=_dumps)
+
+
+def bad_request(message):
+    return web.HTTPBadRequest(text=_dumps({'error': message}), content_type='application/json')
+
+
+def _int_param(params, name, default, minimum=1, maximum=MAX_TOP_N):
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise bad_request(f"'{name}' debe ser un entero")
+    if not minimum <= value <= maximum:
+        raise bad_request(f"'{name}' debe estar entre {minimum} y {maximum}")
+    return value
+
+
+def _materialize(results):
+    """Convierte los resultados perezosos en diccionarios (calcula triples, datos...)"""
+    return [result.to_dict() if hasattr(result, 'to_dict') else dict(result) for result in results]
+
+
+async def _run(request, fn, *args, **kwargs):
+    """Ejecuta trabajo de CPU en el pool sin bloquear el bucle de eventos"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app[EXECUTOR_KEY], partial(fn, *args, **kwargs))
+
+
+@web.middleware
+async def latency_middleware(request, handler):
+    start = time.perf_counter()
+    error = True
+    try:
+        response = await handler(request)
+        error = response.status >= 400
+        return response
+    except web.HTTPException as exc:
+        error = exc.status >= 400
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.match_info.route.resource
+        endpoint = f"{request.method} {route.canonical if route is not None else 'no_encontrado'}"
+        request.app[METRICS_KEY].record(endpoint, elapsed, error)
+
+
+async def health(request):
+    system = request.app[SYSTEM_KEY]
+    return json_response({'estado': 'ok', 'reseñas': system.doc_ids.n_alive,
+                          'version_indice': system.index_version})
+
+
+async def search(request):
+    """GET /search?q=...&top_n=10 -> enhanced_semantic_search"""
+    query = request.query.get('q', '').strip()
+    if not query:
+        raise bad_request("Falta el parámetro 'q'")
+    top_n = _int_param(request.query, 'top_n', 10)
+
+    system = request.app[SYSTEM_KEY]
+    results = await _run(request, lambda: _materialize(system.enhanced_semantic_search(query, top_n)))
+    return json_response({'consulta': query, 'total': len(results), 'resultados': results})
+
+
+async def batch_search(request):
+    """POST /search/batch {"queries": [...], "top_n": 10} -> batch_search"""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise bad_request("El cuerpo debe ser JSON")
+    queries = body.get('queries') if isinstance(body, dict) else None
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        raise bad_request("'queries' debe ser una lista de textos")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise bad_request(f"Máximo {MAX_BATCH_QUERIES} consultas por lote")
+    top_n = _int_param(body, 'top_n', 10)
+
+    system = request.app[SYSTEM_KEY]
+    results = await _run(request, lambda: [_materialize(rs) for rs in system.batch_search(queries, top_n)])
+    return json_response({'total': len(results), 'resultados': results})
+
+
+async def advanced_search(request):
+    """GET /advanced?product=&brand=&sentiment=&location=&keyword=&top_n=15"""
+    filters = {name: request.query.get(name, '').strip() or None for name in ADVANCED_FILTERS}
+    if not any(filters.values()):
+        raise bad_request(f"Ingrese al menos un filtro: {', '.join(ADVANCED_FILTERS)}")
+    top_n = _int_param(request.query, 'top_n', 15)
+
+    system = request.app[SYSTEM_KEY]
+    results = await _run(request, lambda: _materialize(system.advanced_semantic_search(
+        product=filters['product'], brand=filters['brand'], sentiment=filters['sentiment'],
+        location=filters['location'], failure_keyword=filters['keyword'], top_n=top_n)))
+    return json_response({'filtros': filters, 'total': len(results), 'resultados': results})
+
+
+async def rdf_query(request):
+    """GET /rdf?subject=&predicate=&object=&limit=100 -> query_rdf_graph"""
+    pattern = {name: request.query.get(name, '').strip() or None for name in ['subject', 'predicate', 'object']}
+    limit = _int_param(request.query, 'limit', 100, maximum=10000)
+
+    system = request.app[SYSTEM_KEY]
+    triples = await _run(request, system.query_rdf_graph, subject=pattern['subject'],
+                         predicate=pattern['predicate'], obj=pattern['object'], limit=limit)
+    return json_response({'patron': pattern, 'total': len(triples), 'triples': triples})
+
+
+async def metrics(request):
+    data = request.app[METRICS_KEY].snapshot()
+    cache = getattr(request.app[SYSTEM_KEY], 'query_cache', None)
+    if cache is not None:
+        data['cache'] = cache.stats()
+    return json_response(data)
+
+
+def create_app(system, max_workers=None):
+    """Aplicación aiohttp sobre un UniversalReviewQuerySystem ya cargado.
+
+    El índice se carga una sola vez fuera de la aplicación; las consultas
+    corren en un ThreadPoolExecutor (numpy libera el GIL en la puntuación y
+    el sistema comparte índice y cachés entre hilos).
+    """
+    app = web.Application(middlewares=[latency_middleware])
+    app[SYSTEM_KEY] = system
+    app[EXECUTOR_KEY] = ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1),
+                                           thread_name_prefix='busqueda')
+    app[METRICS_KEY] = LatencyMetrics()
+
+    async def shutdown_executor(app):
+        app[EXECUTOR_KEY].shutdown(wait=True)
+
+    app.on_cleanup.append(shutdown_executor)
+    app.router.add_get('/health', health)
+    app.router.add_get('/search', search)
+    app.router.add_post('/search/batch', batch_search)
+    app.router.add_get('/advanced', advanced_search)
+    app.router.add_get('/rdf', rdf_query)
+    app.router.add_get('/metrics', metrics)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON de búsqueda semántica de reseñas")
+    parser.add_argument('--datos', required=True, help="Parquet (o CSV) de reseñas procesadas con NER")
+    parser.add_argument('--indice', default=None, help="Directorio del índice BM25 (por defecto junto a los datos)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--hilos', type=int, default=None, help="Hilos del pool de consultas")
+    args = parser.parse_args()
+
+    # Importación diferida: query_system2 carga NLTK y el modelo spaCy
+    from query_system2 import UniversalReviewQuerySystem
+
+    system = UniversalReviewQuerySystem(args.datos, index_dir=args.indice)
+    web.run_app(create_app(system, max_workers=args.hilos), host=args.host, port=args.puerto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import numpy as np
+
+# Orden de columnas (s=0, p=1, o=2) de cada índice
+INDEX_ORDERS = {
+    'spo': (0, 1, 2),
+    'pos': (1, 2, 0),
+    'osp': (2, 0, 1),
+}
+
+# Una fila (s, p, o) como registro: numpy compara registros campo a campo
+ROW_DTYPE = np.dtype([('s', np.int32), ('p', np.int32), ('o', np.int32)])
+
+
+class TripleStore:
+    """Almacén de triples RDF codificado por diccionario.
+
+    Cada término (sujeto, predicado u objeto) recibe un id entero. Los triples
+    se guardan como filas de enteros, sin duplicados, en tres copias ordenadas
+    (SPO, POS y OSP). Cualquier patrón con términos ligados se resuelve con
+    búsqueda binaria sobre el índice cuyo prefijo coincide con esos términos.
+
+    Cada triple lleva la cuenta de cuántas veces se agregó (una por reseña que
+    lo aporta); remove descuenta y el triple desaparece al llegar a cero.
+    """
+
+    def __init__(self):
+        self.term_ids = {}
+        self.terms = []
+        self._terms_array = np.zeros(0, dtype=object)
+        self._counts = {}
+        self._pending = []
+        self._removed = []
+        self._indexes = {name: np.zeros((0, 3), dtype=np.int32) for name in INDEX_ORDERS}
+
+    def _encode(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.term_ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def add(self, subject, predicate, obj):
+        """Agrega un triple (se indexa en el próximo build o consulta)"""
+        key = (self._encode(subject), self._encode(predicate), self._encode(obj))
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if not count:
+            self._pending.append(key)
+
+    def remove(self, subject, predicate, obj):
+        """Descuenta un triple; se retira de los índices cuando nadie más lo aporta"""
+        key = tuple(self.term_ids.get(term) for term in (subject, predicate, obj))
+        count = self._counts.get(key, 0)
+        if count > 1:
+            self._counts[key] = count - 1
+        elif count == 1:
+            del self._counts[key]
+            self._removed.append(key)
+
+    def build(self):
+        """Incorpora los triples pendientes y retira los borrados.
+
+        Solo se ordenan los triples que cambian; después se insertan (o se
+        quitan) en su posición dentro de cada índice ya ordenado mediante
+        búsqueda binaria, así que un lote no vuelve a ordenar todo el almacén.
+        """
+        # Un triple puede haberse agregado y retirado (o al revés) antes del build
+        removed = [key for key in self._removed if key not in self._counts]
+        pending = [key for key in self._pending if key in self._counts]
+        self._pending = []
+        self._removed = []
+
+        if removed:
+            self._delete_rows(np.unique(np.asarray(removed, dtype=np.int32).reshape(-1, 3), axis=0))
+        if not pending:
+            self._update_terms_array()
+            return
+
+        pending = np.unique(np.asarray(pending, dtype=np.int32).reshape(-1, 3), axis=0)
+
+        # Descartar los que ya existen (np.unique deja el lote en orden SPO)
+        spo = self._indexes['spo']
+        positions = np.searchsorted(_row_keys(spo), _row_keys(pending))
+        existing = np.zeros(len(pending), dtype=bool)
+        inside = positions < len(spo)
+        existing[inside] = (spo[positions[inside]] == pending[inside]).all(axis=1)
+        pending = pending[~existing]
+
+        for name, order in INDEX_ORDERS.items():
+            permuted = pending[:, order]
+            # lexsort ordena por la última clave primero
+            permuted = permuted[np.lexsort((permuted[:, 2], permuted[:, 1], permuted[:, 0]))]
+            index = self._indexes[name]
+            positions = np.searchsorted(_row_keys(index), _row_keys(permuted))
+            self._indexes[name] = np.insert(index, positions, permuted, axis=0)
+
+        self._update_terms_array()
+
+    def _delete_rows(self, rows):
+        """Quita de cada índice las filas (en orden SPO) que existan"""
+        for name, order in INDEX_ORDERS.items():
+            permuted = rows[:, order]
+            permuted = permuted[np.lexsort((permuted[:, 2], permuted[:, 1], permuted[:, 0]))]
+            index = self._indexes[name]
+            positions = np.searchsorted(_row_keys(index), _row_keys(permuted))
+            inside = positions < len(index)
+            found = positions[inside][(index[positions[inside]] == permuted[inside]).all(axis=1)]
+            self._indexes[name] = np.delete(index, found, axis=0)
+
+    def _update_terms_array(self):
+        if len(self._terms_array) != len(self.terms):
+            terms_array = np.empty(len(self.terms), dtype=object)
+            terms_array[:len(self._terms_array)] = self._terms_array
+            terms_array[len(self._terms_array):] = self.terms[len(self._terms_array):]
+            self._terms_array = terms_array
+
+    def __len__(self):
+        self.build()
+        return len(self._indexes['spo'])
+
+    def __iter__(self):
+        return iter(self.triples())
+
+    def triples(self, subject=None, predicate=None, obj=None, limit=None):
+        """Triples que cumplen el patrón (None = comodín), como tuplas de strings"""
+        self.build()
+
+        bound = [subject, predicate, obj]
+        ids = []
+        for term in bound:
+            if term is None:
+                ids.append(None)
+            else:
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    return []
+                ids.append(term_id)
+
+        # Elegir el índice cuyo prefijo está formado por los términos ligados
+        if ids[0] is not None:
+            name = 'spo' if ids[1] is not None or ids[2] is None else 'osp'
+        elif ids[1] is not None:
+            name = 'pos'
+        elif ids[2] is not None:
+            name = 'osp'
+        else:
+            name = 'spo'
+
+        order = INDEX_ORDERS[name]
+        index = self._indexes[name]
+        start, end = 0, len(index)
+        for column, position in enumerate(order):
+            if ids[position] is None:
+                break
+            values = index[start:end, column]
+            lo = np.searchsorted(values, ids[position], side='left')
+            hi = np.searchsorted(values, ids[position], side='right')
+            start, end = start + lo, start + hi
+
+        if limit is not None:
+            end = min(end, start + limit)
+
+        rows = index[start:end]
+        # Volver al orden (s, p, o) y decodificar
+        inverse = np.argsort(order)
+        rows = rows[:, inverse]
+        terms = self._terms_array
+        return list(zip(terms[rows[:, 0]], terms[rows[:, 1]], terms[rows[:, 2]]))
+
+    def objects(self, subject, predicate):
+        """Objetos de los triples (subject, predicate, ?)"""
+        return [o for _, _, o in self.triples(subject=subject, predicate=predicate)]
+
+    def subjects(self, predicate, obj):
+        """Sujetos de los triples (?, predicate, obj)"""
+        return [s for s, _, _ in self.triples(predicate=predicate, obj=obj)]
+
+
+def _row_keys(rows):
+    """Vista de cada fila (3 x int32) como un único registro comparable en orden lexicográfico"""
+    rows = np.ascontiguousarray(rows, dtype=np.int32)
+    return rows.view(ROW_DTYPE).ravel()
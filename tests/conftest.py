@@ -0,0 +1,69 @@
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+# Los módulos de src/ se importan por nombre, igual que entre ellos
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+WORDS = ('battery screen great good bad terrible problem issue broken slow lag charge power display '
+         'excellent amazing perfect love best hate awful worst durable cable phone laptop music sound '
+         'price cheap return refund fast works fine ok').split()
+PRODUCTS = ['Galaxy S21', 'iPhone 12', 'Kindle', 'Echo Dot', '', 'ThinkPad X1', 'Galaxy S21, Kindle']
+BRANDS = ['Samsung', 'Apple', 'Amazon', '', 'Lenovo', 'Sony']
+LOCATIONS = ['Mexico', 'Spain', '', 'USA', 'México']
+PERSONS = ['Carlos', '', 'Ana']
+
+
+def make_reviews(n, seed=1):
+    """Reseñas sintéticas con las columnas que produce el pipeline de NER"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+        if i % 50 == 7:
+            # Sin tokens válidos para BM25: documento vacío en el índice
+            text = 'ok 12 !!'
+        rows.append({
+            'text': text,
+            'rating': rng.choice([1, 2, 3, 4, 5, 4.5]),
+            'ner_products': rng.choice(PRODUCTS),
+            'ner_brands': rng.choice(BRANDS),
+            'ner_locations': rng.choice(LOCATIONS),
+            'ner_persons': rng.choice(PERSONS),
+            'extracted_prices': rng.choice(['', '$20.00']),
+            'extracted_purchase_dates': '',
+            'extracted_product_models': '',
+        })
+    return pd.DataFrame(rows)
+
+
+def nltk_data_available():
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        return False
+    return True
+
+
+@pytest.fixture(scope='session')
+def reviews_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('datos') / 'reviews.parquet'
+    make_reviews(400).to_parquet(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def review_system(reviews_path):
+    """Sistema de consultas sobre las reseñas sintéticas (requiere los datos de NLTK)"""
+    if not nltk_data_available():
+        pytest.skip("Faltan los datos de NLTK (punkt_tab, stopwords)")
+    from query_system2 import UniversalReviewQuerySystem
+
+    system = UniversalReviewQuerySystem(reviews_path)
+    yield system
+    system.bm25.stop_background_merge()
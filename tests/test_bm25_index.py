@@ -0,0 +1,106 @@
+import random
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+import bm25_index
+from bm25_index import BM25Index, top_k_indices
+
+WORDS = ('battery screen great good bad terrible problem issue broken slow charge power display '
+         'excellent amazing love hate awful cable phone laptop music sound price cheap refund').split()
+
+QUERIES = [['battery'], ['battery', 'problem'], ['screen', 'screen', 'display'], ['missing'],
+           ['price', 'missing', 'cheap'], ['nuevo'], []]
+
+
+def make_corpus(n, seed):
+    rng = random.Random(seed)
+    corpus = [[rng.choice(WORDS) for _ in range(rng.randint(1, 30))] for _ in range(n)]
+    # Documentos sin tokens: ocupan su posición en el índice
+    corpus[3] = []
+    return corpus
+
+
+def assert_okapi_parity(index, corpus):
+    okapi = BM25Okapi(corpus)
+    for query in QUERIES:
+        np.testing.assert_allclose(index.get_scores(query), okapi.get_scores(query), rtol=1e-5, atol=1e-6)
+
+
+@pytest.fixture
+def corpus():
+    return make_corpus(200, seed=1)
+
+
+@pytest.fixture
+def index(tmp_path, corpus):
+    return BM25Index.build(corpus, str(tmp_path / 'idx.bm25'))
+
+
+def test_scores_match_okapi(index, corpus):
+    assert index.corpus_size == len(corpus)
+    assert_okapi_parity(index, corpus)
+
+
+def test_reload_from_disk(index, corpus):
+    loaded = BM25Index.load(index.index_dir)
+    for query in QUERIES:
+        np.testing.assert_array_equal(loaded.get_scores(query), index.get_scores(query))
+
+
+def test_scores_match_okapi_after_add_and_merge(index, corpus):
+    batches = [make_corpus(10, seed=seed) for seed in range(2, 10)]
+    # Un término que el índice base no conoce
+    batches[0][0] = ['nuevo', 'battery']
+    for batch in batches:
+        ids = index.add_documents(batch)
+        corpus = corpus + batch
+        assert ids.stop == len(corpus)
+        assert_okapi_parity(index, corpus)
+
+    segments = len(index.segments)
+    while index.merge_segments():
+        pass
+    assert len(index.segments) < segments
+    assert_okapi_parity(index, corpus)
+
+
+def test_sparse_scores_equal_get_scores(index, monkeypatch):
+    def check():
+        for query in QUERIES:
+            scores = index.get_scores(query)
+            doc_ids, sparse = index.get_sparse_scores(query)
+            if doc_ids is None:
+                np.testing.assert_array_equal(sparse, scores)
+            else:
+                assert np.all(np.diff(doc_ids) > 0)
+                np.testing.assert_array_equal(sparse, scores[doc_ids])
+                np.testing.assert_array_equal(np.delete(scores, doc_ids), 0)
+
+    check()
+    index.add_documents(make_corpus(20, seed=11))
+    check()
+    # Con el corpus de prueba los postings de cada término son densos: forzar el camino disperso
+    monkeypatch.setattr(bm25_index, 'SPARSE_MAX_DENSITY', float('inf'))
+    check()
+    assert index.get_sparse_scores(['battery', 'problem'])[0] is not None
+
+
+def test_batch_scores_equal_get_scores_subset(index):
+    index.add_documents(make_corpus(20, seed=12))
+    doc_ids = np.arange(0, index.corpus_size, 7)
+    for query in QUERIES:
+        np.testing.assert_allclose(index.get_batch_scores(query, doc_ids), index.get_scores(query)[doc_ids])
+
+
+def test_top_k_indices_orders_by_score():
+    scores = np.array([0.5, 3.0, 0.0, 2.0, 3.0, 1.0])
+    top = top_k_indices(scores, 3)
+    assert sorted(top.tolist()) == [1, 3, 4]
+    assert scores[top].tolist() == [3.0, 3.0, 2.0]
+    assert len(top_k_indices(scores, 10)) == len(scores)
+    # Empates: primero el índice menor, también en el corte
+    ties = np.array([1.0, 2.0, 1.0, 2.0, 1.0, 0.0, 1.0])
+    assert top_k_indices(ties, 4).tolist() == [1, 3, 0, 2]
+    assert top_k_indices(ties, 7).tolist() == [1, 3, 0, 2, 4, 6, 5]
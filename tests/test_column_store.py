@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from column_store import ColumnStore
+
+
+def test_append_grows_all_columns():
+    store = ColumnStore({'sentiment': np.array(['positivo', 'neutro'], dtype=object),
+                         'problems': np.array([0, 3], dtype=np.uint8)})
+    first = store['sentiment']
+    for i in range(10):
+        store.append({'sentiment': ['negativo'], 'problems': [i]})
+
+    assert store.size == 12
+    assert len(store['sentiment']) == len(store['problems']) == 12
+    assert store['sentiment'][-1] == 'negativo'
+    assert store['problems'].tolist() == [0, 3] + list(range(10))
+    assert store['problems'].dtype == np.uint8
+    # Las vistas entregadas antes siguen siendo válidas
+    assert first.tolist() == ['positivo', 'neutro']
+
+
+def test_append_copies_only_on_growth():
+    store = ColumnStore({'flag': np.zeros(4, dtype=bool)})
+    # 5 filas: la capacidad se duplica a 8
+    store.append({'flag': [True]})
+    buffer = store['flag'].base
+    assert len(buffer) == 8
+    store.append({'flag': [True] * 3})
+    assert store['flag'].base is buffer
+    assert store['flag'].sum() == 4
+
+
+def test_mapping_interface():
+    store = ColumnStore({'a': [1, 2], 'b': [3, 4]})
+    assert sorted(store) == ['a', 'b']
+    assert len(store) == 2
+    assert 'a' in store and 'c' not in store
+
+
+def test_columns_must_have_same_length():
+    with pytest.raises(ValueError):
+        ColumnStore({'a': [1, 2], 'b': [3]})
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import content_cache
+from content_cache import ContentCache, content_key, content_keys
+
+COLUMNS = ['keep', 'text']
+
+
+def values(*rows):
+    return pd.DataFrame(list(rows), columns=COLUMNS)
+
+
+def parts(cache):
+    return [name for name in os.listdir(cache.path) if name.startswith('part-')]
+
+
+def test_content_keys_use_title_and_text():
+    df = pd.DataFrame({'title': ['a', None, 'a'], 'text': ['b', 'b', 'b']})
+    keys = content_keys(df)
+    assert keys.dtype == np.uint64
+    assert keys[0] == keys[2] == content_key('a', 'b') and keys[1] == content_key('', 'b')
+    assert content_key('ab', 'c') != content_key('a', 'bc')
+    assert content_keys(df[['text']]).tolist() == [content_key('', 'b')] * 3
+
+
+def test_lookup_returns_hits_in_order_and_survives_reload(tmp_path):
+    cache = ContentCache(tmp_path, COLUMNS, version='v1')
+    cache.put([1, 2], values((True, 'uno'), (False, '')))
+    hit, cached = cache.lookup([2, 3, 1])
+    assert hit.tolist() == [True, False, True]
+    assert cached.values.tolist() == [[False, ''], [True, 'uno']]
+    cache.flush()
+    cache.flush()
+    assert len(parts(cache)) == 1
+
+    reloaded = ContentCache(tmp_path, COLUMNS, version='v1')
+    assert len(reloaded) == 2
+    hit, cached = reloaded.lookup([3, 1, 2])
+    assert hit.tolist() == [False, True, True]
+    assert cached.values.tolist() == [[True, 'uno'], [False, '']]
+    assert (reloaded.hits, reloaded.misses) == (2, 1)
+
+    # Otra versión de la configuración no ve esas entradas
+    assert len(ContentCache(tmp_path, COLUMNS, version='v2')) == 0
+
+
+def test_latest_part_wins_and_many_parts_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_cache, 'MAX_PARTS', 3)
+    for i in range(5):
+        cache = ContentCache(tmp_path, COLUMNS)
+        # La clave 1 se reescribe en cada ejecución; la clave 10 + i aparece una sola vez
+        cache.put([1, 10 + i], values((i % 2 == 0, f'v{i}'), (True, f'solo {i}')))
+        cache.flush()
+        # La quinta ejecución carga 4 archivos (más de 3): los compacta y luego agrega el suyo
+        assert len(parts(cache)) == [1, 2, 3, 4, 2][i]
+
+    compacted = ContentCache(tmp_path, COLUMNS)
+    assert len(compacted) == 6
+    hit, cached = compacted.lookup([1, 10, 14])
+    assert hit.all()
+    assert cached.values.tolist() == [[True, 'v4'], [True, 'solo 0'], [True, 'solo 4']]
+
+    # Entrada recién registrada y sin escribir: también gana a la del disco
+    compacted.put([1], values((False, 'nuevo')))
+    assert compacted.lookup([1])[1].values.tolist() == [[False, 'nuevo']]
+    assert len(compacted) == 6
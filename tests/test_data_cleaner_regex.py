@@ -0,0 +1,118 @@
+from itertools import permutations
+
+import pandas as pd
+import pytest
+
+from data_cleaner_regex import BeautyReviewsCleaner
+
+VIDEO_ID = 'VIDEOID:' + '0123456789abcdef' * 2
+
+
+@pytest.fixture(scope='module')
+def cleaner():
+    return BeautyReviewsCleaner('sin_datos.parquet')
+
+
+@pytest.mark.parametrize('text, expected', [
+    # '2 $' y '$10' se solapan: los dos importes cuentan
+    ("I bought 2 $10 chargers and they broke", '$2.00, $10.00'),
+    ("paid $25.50 for it, worth 30 dollars", '$25.50, $30.00'),
+    ("Price: 15, cost 15.00 and 20$", '$15.00, $20.00'),
+    ("PAID 99 DOLLARS", '$99.00'),
+    ("no prices here", ''),
+    ('', ''),
+    (None, ''),
+])
+def test_extract_prices(cleaner, text, expected):
+    assert cleaner.extract_prices(text) == expected
+
+
+def any_order(values):
+    # Fechas y modelos salen de un conjunto: el orden no es parte del resultado
+    return {', '.join(order) for order in permutations(values)}
+
+
+@pytest.mark.parametrize('text, expected', [
+    # La forma 'bought ...' y la del mes se solapan: cuentan las dos
+    ("I bought on march 3, 2021 and ordered it again", {'march 3, 2021', 'march'}),
+    ("Delivered 12/05/2020, purchased Jan 5 21", {'12/05/2020', 'jan 5 21', 'jan'}),
+    ("bought it in march", set()),
+    ('', set()),
+])
+def test_extract_purchase_dates(cleaner, text, expected):
+    assert cleaner.extract_purchase_dates(text) in any_order(expected)
+
+
+@pytest.mark.parametrize('text, expected', [
+    # La marca toma el resto del texto, pero los literales que contiene también cuentan
+    ("Maybelline Fit me 120 classic ivory and superstay",
+     {'Fit me', 'superstay', '120 classic ivory', 'Fit me 120 classic ivory and superstay'}),
+    ("My Fender Stratocaster fit me well", {'Stratocaster fit me well', 'fit me'}),
+    # Literales pegados que se solapan
+    ("fructispf50", {'fructis', 'spf50'}),
+    ("MacBook Pro 13 and iPhone 12 Pro", {'Pro', '12 Pro'}),
+    ("nothing to see here", set()),
+])
+def test_extract_product_models(cleaner, text, expected):
+    assert cleaner.extract_product_models(text) in any_order(expected)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Great https://example.com/path product", 'Great product'),
+    # VIDEOID pegado a una URL: se quita una vez que la URL desaparece
+    (f"Watch {VIDEO_ID}https://youtu.be/x now", 'Watch now'),
+    (f"Watch {VIDEO_ID} now", 'Watch now'),
+    ("Call 555-123-4567 or mail me@example.com", 'Call or mail me example.com'),
+    ("50% off, only 9€ <b>wow</b>!", '50 off, only 9 b wow /b'),
+    ("  spaced\t\nout  ", 'spaced out'),
+])
+def test_clean_text(cleaner, text, expected):
+    assert cleaner.clean_text(text) == expected
+
+
+def review_frame(changed=False):
+    rows = [
+        ('Good', 'I bought this phone for $199 on march 3, 2021 and it works well with my iPhone 12 Pro case.'),
+        ('Short', 'Too short.'),
+        ('Fine', 'This Maybelline Fit me foundation was the best thing I have used in years, so I would buy it again.'),
+        ('Spanish', 'Compré este producto para mi esposa y dice que es lo mejor que ha usado en muchos años.'),
+        ('Last', 'The Samsung Galaxy S21 arrived on time and the battery lasts for two full days, which is great.'),
+    ]
+    if changed:
+        rows[2] = ('Fine', 'This Maybelline superstay foundation cost 15 dollars and it is the best one I have ever used.')
+    return pd.DataFrame(rows, columns=['title', 'text'])
+
+
+def run_cleaner(df, monkeypatch, cache_dir=None):
+    """Procesa `df` y devuelve el resultado y los títulos que pasaron por filtros y extracción"""
+    cleaner = BeautyReviewsCleaner('sin_datos.parquet', language_workers=1, min_words=5, cache_dir=cache_dir)
+    cleaner.df = df
+    processed = []
+    process_new_reviews = cleaner._process_new_reviews
+
+    def recording_process_new_reviews(df):
+        processed.extend(df['title'])
+        return process_new_reviews(df)
+
+    monkeypatch.setattr(cleaner, '_process_new_reviews', recording_process_new_reviews)
+    cleaner.process_reviews()
+    return cleaner.df, processed
+
+
+def test_cached_cleaning_only_reprocesses_changed_reviews(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    first, processed = run_cleaner(review_frame(), monkeypatch, cache_dir)
+    assert processed == ['Good', 'Short', 'Fine', 'Spanish', 'Last']
+    assert first['title'].tolist() == ['Good', 'Fine', 'Last']
+
+    # Solo la reseña modificada pasa otra vez por los filtros; las descartadas siguen fuera
+    second, processed = run_cleaner(review_frame(changed=True), monkeypatch, cache_dir)
+    assert processed == ['Fine']
+    expected, _ = run_cleaner(review_frame(changed=True), monkeypatch)
+    pd.testing.assert_frame_equal(second, expected)
+    assert second.loc[2, 'extracted_prices'] == '$15.00'
+
+    # Sin cambios: todo sale del caché, en el orden original
+    third, processed = run_cleaner(review_frame(changed=True), monkeypatch, cache_dir)
+    assert processed == []
+    pd.testing.assert_frame_equal(third, expected)
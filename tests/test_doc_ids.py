@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from doc_ids import DocIdMap
+
+
+def test_allocate_extends_ids_and_mask():
+    ids = DocIdMap(3)
+    assert ids.allocate(2) == range(3, 5)
+    assert ids.allocate(10) == range(5, 15)
+    assert len(ids) == 15
+    assert ids.alive.tolist() == [True] * 15
+
+
+def test_delete_leaves_tombstones():
+    ids = DocIdMap(5)
+    assert ids.delete([1, 3, 3]).tolist() == [1, 3]
+    # Borrar de nuevo no devuelve nada
+    assert ids.delete([1]).tolist() == []
+    assert ids.n_alive == 3
+    assert not ids.is_alive(1)
+    assert ids.live([4, 3, 0, 1]).tolist() == [4, 0]
+
+    # Los ids borrados no se reutilizan
+    assert ids.allocate(1) == range(5, 6)
+    assert ids.is_alive(5)
+
+
+def test_delete_out_of_range():
+    with pytest.raises(IndexError):
+        DocIdMap(2).delete([2])
+
+
+def test_check_reports_misaligned_components():
+    ids = DocIdMap(4)
+    ids.check(df=4, bm25=4)
+    with pytest.raises(ValueError, match='bm25'):
+        ids.check(df=4, bm25=3)
+    assert np.array_equal(ids.alive, np.ones(4, dtype=bool))
@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+
+from entity_index import EntityIndex, intersect_ids, load_or_build_indexes, split_entities
+
+VALUES = ['Samsung Galaxy S21', 'iPhone 12, Kindle', '', None, 'Galaxy S21', ['Kindle', 'Echo Dot'], 'N/A']
+
+
+def test_split_entities():
+    assert split_entities('iPhone 12,  Kindle ') == ['iphone 12', 'kindle']
+    assert split_entities(['Echo  Dot', 'nan']) == ['echo dot']
+    assert split_entities(None) == []
+    assert split_entities(float('nan')) == []
+
+
+def test_lookup_by_whole_entity_suffix_and_prefix():
+    index = EntityIndex(VALUES)
+    assert index.lookup('galaxy s21').tolist() == [0, 4]
+    assert index.lookup('S21').tolist() == [0, 4]
+    assert index.lookup('kind').tolist() == [1, 5]
+    assert index.lookup('kind', prefix=False).tolist() == []
+    assert index.lookup('n/a').tolist() == []
+    assert index.lookup('').tolist() == []
+
+
+def test_added_batches_keep_ids_sorted():
+    index = EntityIndex(VALUES)
+    index.add(['Kindle Paperwhite', 'Pixel 7'])
+    index.add(['kindle'])
+    assert index.size == len(VALUES) + 3
+    assert index.lookup('kindle').tolist() == [1, 5, 7, 9]
+    assert index.lookup('pixel').tolist() == [8]
+
+
+def test_intersect_ids():
+    ids = intersect_ids([np.array([1, 3, 5, 7]), np.array([3, 7, 9]), np.array([0, 3, 7])])
+    assert ids.tolist() == [3, 7]
+    assert intersect_ids([np.array([1, 2]), np.array([], dtype=np.int64)]).tolist() == []
+
+
+def test_added_batches_are_merged_and_match_a_full_build():
+    rng = random.Random(0)
+    names = ['Kindle', 'Kindle Paperwhite', 'Echo Dot', 'Galaxy S21', 'iPhone 12', 'Pixel 7', None, '']
+    batches = [[', '.join(str(name) for name in rng.sample(names, 2)) for _ in range(rng.randint(1, 6))]
+               for _ in range(200)]
+
+    index = EntityIndex(VALUES)
+    for batch in batches:
+        index.add(batch)
+    full = EntityIndex(VALUES + [value for batch in batches for value in batch])
+
+    # Los lotes de tamaño parecido se fusionan: quedan pocos, contiguos y en orden
+    assert len(index.deltas) < 12
+    assert index.size == full.size and index.deltas[0].first_id == len(VALUES)
+    assert all(a.size == b.first_id for a, b in zip(index.deltas, index.deltas[1:]))
+    for query in ['kindle', 'kindle paperwhite', 'galaxy', 's21', 'echo dot', 'none', 'pix']:
+        assert index.lookup(query).tolist() == full.lookup(query).tolist()
+    assert index.lookup('kindle', prefix=False).tolist() == full.lookup('kindle', prefix=False).tolist()
+
+
+def test_saved_indexes_are_loaded_until_the_source_changes(tmp_path):
+    source = tmp_path / 'reviews.parquet'
+    source.write_bytes(b'v1')
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {'product': EntityIndex(VALUES), 'brand': EntityIndex(['Samsung'] * len(VALUES))}
+
+    index_dir = str(tmp_path / 'reviews.entities')
+    first = load_or_build_indexes(index_dir, build, source_path=str(source))
+    loaded = load_or_build_indexes(index_dir, build, source_path=str(source))
+    assert len(builds) == 1
+    assert isinstance(loaded['product'].doc_ids, np.memmap)
+    assert loaded['product'].size == len(VALUES) and loaded['brand'].lookup('sam').tolist() == list(range(len(VALUES)))
+    for query in ['galaxy s21', 'kind', 'echo dot', 'n/a']:
+        assert loaded['product'].lookup(query).tolist() == EntityIndex(VALUES).lookup(query).tolist()
+        assert first['product'].lookup(query).tolist() == EntityIndex(VALUES).lookup(query).tolist()
+
+    # Los lotes agregados a un índice cargado quedan en memoria
+    loaded['product'].add(['Kindle'])
+    assert loaded['product'].lookup('kindle').tolist() == [1, 5, len(VALUES)]
+
+    source.write_bytes(b'v2 distinto')
+    load_or_build_indexes(index_dir, build, source_path=str(source))
+    assert len(builds) == 2
@@ -0,0 +1,75 @@
+import language_filter
+from language_filter import LanguageFilter, detect_english, is_obviously_english
+
+ENGLISH = "I bought this for my wife and she says that it is the best thing she has used in years"
+ENGLISH_SHORT = "Great product, works perfectly"
+SPANISH = "Compré este producto para mi esposa y dice que es lo mejor que ha usado en años"
+FRENCH = "J'ai acheté ce produit pour ma femme et elle dit que c'est le meilleur qu'elle ait utilisé"
+GERMAN = "Ich habe das für meine Frau gekauft und sie sagt, es ist das Beste seit Jahren"
+ACCENTED = "The café was great and the crème brûlée was très bon, I would come back again soon"
+
+NOT_OBVIOUS = [ENGLISH_SHORT, SPANISH, FRENCH, GERMAN, ACCENTED, "Das ist gut", "ok"]
+
+
+def counting_detect(monkeypatch):
+    """Cuenta las llamadas a langdetect sin cambiar su veredicto"""
+    calls = []
+
+    def detect(text):
+        calls.append(text)
+        return detect_english(text)
+
+    monkeypatch.setattr(language_filter, 'detect_english', detect)
+    return calls
+
+
+def test_precheck_only_decides_clear_english():
+    assert is_obviously_english(ENGLISH) and detect_english(ENGLISH)
+    # Nunca da un veredicto negativo propio: False solo significa "preguntar a langdetect"
+    assert not is_obviously_english(ENGLISH_SHORT) and detect_english(ENGLISH_SHORT)
+    assert not is_obviously_english(ACCENTED)
+    for text in [SPANISH, FRENCH, GERMAN, '', 'the and is it this that was']:
+        assert not is_obviously_english(text)
+
+
+def test_mask_matches_langdetect_on_texts_that_are_not_obviously_english(monkeypatch):
+    calls = counting_detect(monkeypatch)
+    mask = LanguageFilter(workers=1).english_mask(NOT_OBVIOUS)
+    assert mask.tolist() == [detect_english(text) for text in NOT_OBVIOUS]
+    assert sorted(calls) == sorted(NOT_OBVIOUS)
+
+
+def test_duplicates_and_precheck_skip_langdetect(monkeypatch):
+    calls = counting_detect(monkeypatch)
+    texts = [ENGLISH, SPANISH, ENGLISH, None, '', SPANISH, ENGLISH_SHORT, SPANISH]
+    language = LanguageFilter(workers=1)
+
+    mask = language.english_mask(texts)
+    assert mask.tolist() == [True, False, True, False, False, False, True, False]
+    # Cada texto distinto que no pasa el pre-chequeo se evalúa una sola vez
+    assert sorted(calls) == sorted([SPANISH, ENGLISH_SHORT])
+    stats = language.stats
+    assert (stats['rows'], stats['unique_texts'], stats['cache_hits'], stats['prechecked'], stats['langdetect']) == (8, 3, 0, 1, 2)
+    assert stats['rows_per_second'] > 0
+
+
+def test_second_batch_is_served_from_the_cache(monkeypatch):
+    calls = counting_detect(monkeypatch)
+    language = LanguageFilter(workers=1)
+    language.english_mask([ENGLISH, SPANISH, FRENCH])
+    calls.clear()
+
+    mask = language.english_mask([FRENCH, ENGLISH, GERMAN, SPANISH])
+    assert mask.tolist() == [False, True, False, False]
+    assert calls == [GERMAN]
+    assert (language.stats['cache_hits'], language.stats['prechecked'], language.stats['langdetect']) == (3, 0, 1)
+    assert language.is_english(GERMAN) is False and calls == [GERMAN]
+
+
+def test_parallel_pool_gives_the_same_mask(monkeypatch):
+    texts = NOT_OBVIOUS * 3 + [ENGLISH]
+    expected = LanguageFilter(workers=1).english_mask(texts)
+    monkeypatch.setattr(language_filter, 'MIN_PARALLEL_TEXTS', 1)
+    language = LanguageFilter(workers=2, chunksize=2)
+    assert language.english_mask(texts).tolist() == expected.tolist()
+    assert language.stats['langdetect'] == len(NOT_OBVIOUS)
@@ -0,0 +1,165 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+import spacy
+
+from ner_entities import CHECKPOINT_FILE, BeautyReviewsCleaner
+from review_io import read_reviews
+
+BRANDS = ['Samsung', 'Apple', 'Sony', 'Lenovo']
+PLACES = ['Mexico', 'Spain', 'Chile']
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture(scope='module')
+def ner_model(tmp_path_factory):
+    """Pipeline en blanco con reglas de entidades: NER real sin descargar un modelo"""
+    nlp = spacy.blank('en')
+    ruler = nlp.add_pipe('entity_ruler')
+    ruler.add_patterns([{'label': 'ORG', 'pattern': brand} for brand in BRANDS]
+                       + [{'label': 'GPE', 'pattern': place} for place in PLACES])
+    path = tmp_path_factory.mktemp('modelo') / 'ner'
+    nlp.to_disk(path)
+    return str(path)
+
+
+def write_input(path, n=45, shift=0):
+    rows = [{'title': f'Review {i}',
+             'text': f'My {BRANDS[(i + shift) % len(BRANDS)]} phone arrived in {PLACES[i % len(PLACES)]}.'}
+            for i in range(n)]
+    pd.DataFrame(rows).to_parquet(path, index=False)
+    return str(path)
+
+
+def run(model, input_path, output_dir, interrupt_after=None, monkeypatch=None, resume=True):
+    """Procesa la entrada; con `interrupt_after` falla tras escribir ese número de fragmentos (0: antes del primero)"""
+    cleaner = BeautyReviewsCleaner(model_name=model)
+    written = []
+    write_chunk = cleaner._write_chunk
+
+    def counting_write_chunk(output_dir, offset, *args):
+        if interrupt_after == 0:
+            raise Interrupted()
+        rows = write_chunk(output_dir, offset, *args)
+        written.append(offset)
+        if interrupt_after is not None and len(written) >= interrupt_after:
+            raise Interrupted()
+        return rows
+
+    monkeypatch.setattr(cleaner, '_write_chunk', counting_write_chunk)
+    try:
+        cleaner.process_file_streaming(input_path, str(output_dir), chunk_size=10, n_process=1, resume=resume)
+    except Interrupted:
+        pass
+    return written
+
+
+def read_output(output_dir):
+    df = read_reviews(str(output_dir))
+    return list(zip(df['text'], df['ner_brands'].map(list), df['ner_locations'].map(list)))
+
+
+def checkpoint_offset(output_dir):
+    with open(os.path.join(output_dir, CHECKPOINT_FILE), encoding='utf-8') as f:
+        return json.load(f)['offset']
+
+
+def test_resume_after_interruption_matches_full_run(tmp_path, ner_model, monkeypatch):
+    input_path = write_input(tmp_path / 'input.parquet')
+    run(ner_model, input_path, tmp_path / 'full', monkeypatch=monkeypatch)
+    expected = read_output(tmp_path / 'full')
+    assert len(expected) == 45
+    assert expected[0] == ('My Samsung phone arrived in Mexico.', ['Samsung'], ['Mexico'])
+
+    output_dir = tmp_path / 'out'
+    # El tercer fragmento queda escrito pero sin confirmar en el checkpoint
+    assert run(ner_model, input_path, output_dir, interrupt_after=3, monkeypatch=monkeypatch) == [0, 10, 20]
+    assert checkpoint_offset(output_dir) == 20
+    # Restos de una escritura truncada
+    (output_dir / '.part-000000030.parquet.tmp').write_bytes(b'truncado')
+
+    # Solo se procesa lo que falta desde el último offset confirmado
+    assert run(ner_model, input_path, output_dir, monkeypatch=monkeypatch) == [20, 30, 40]
+    assert read_output(output_dir) == expected
+    assert checkpoint_offset(output_dir) == 45
+    assert not [name for name in os.listdir(output_dir) if name.endswith('.tmp')]
+
+    # Una ejecución ya completa no vuelve a procesar nada
+    assert run(ner_model, input_path, output_dir, monkeypatch=monkeypatch) == []
+
+
+def test_regenerated_input_restarts_from_zero(tmp_path, ner_model, monkeypatch):
+    input_path = write_input(tmp_path / 'input.parquet')
+    output_dir = tmp_path / 'out'
+    run(ner_model, input_path, output_dir, interrupt_after=3, monkeypatch=monkeypatch)
+    assert checkpoint_offset(output_dir) == 20
+
+    # Misma ruta y mismo número de filas, pero otro contenido
+    write_input(tmp_path / 'input.parquet', shift=1)
+    assert run(ner_model, input_path, output_dir, monkeypatch=monkeypatch) == [0, 10, 20, 30, 40]
+
+    run(ner_model, input_path, tmp_path / 'full', monkeypatch=monkeypatch)
+    assert read_output(output_dir) == read_output(tmp_path / 'full')
+    assert read_output(output_dir)[0][1] == ['Apple']
+
+
+def test_interrupted_fresh_run_does_not_keep_the_old_offset(tmp_path, ner_model, monkeypatch):
+    input_path = write_input(tmp_path / 'input.parquet')
+    output_dir = tmp_path / 'out'
+    run(ner_model, input_path, output_dir, monkeypatch=monkeypatch)
+    expected = read_output(output_dir)
+    assert checkpoint_offset(output_dir) == 45
+
+    # Sin reanudar: se borran los 5 fragmentos y se interrumpe antes de escribir el primero
+    assert run(ner_model, input_path, output_dir, interrupt_after=0, monkeypatch=monkeypatch, resume=False) == []
+    assert not [name for name in os.listdir(output_dir) if name.startswith('part-')]
+    assert checkpoint_offset(output_dir) == 0
+
+    assert run(ner_model, input_path, output_dir, monkeypatch=monkeypatch) == [0, 10, 20, 30, 40]
+    assert read_output(output_dir) == expected
+
+
+def changed_reviews(tmp_path):
+    df = pd.read_parquet(write_input(tmp_path / 'input.parquet', n=12))
+    changed = df.copy()
+    changed.loc[5, 'text'] = 'My Sony phone arrived in Chile.'
+    return df, changed
+
+
+def test_entity_cache_only_reprocesses_changed_reviews(tmp_path, ner_model):
+    df, changed = changed_reviews(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    first = BeautyReviewsCleaner(cache_dir=cache_dir, model_name=ner_model)
+    original = first.process_reviews(df)
+    assert (first.cache.hits, first.cache.misses) == (0, 12)
+
+    # Otra ejecución (caché leído de disco): solo la reseña modificada pasa por el modelo
+    cached = BeautyReviewsCleaner(cache_dir=cache_dir, model_name=ner_model)
+    result = cached.process_reviews(changed)
+    assert (cached.cache.hits, cached.cache.misses) == (11, 1)
+    expected = BeautyReviewsCleaner(model_name=ner_model).process_reviews(changed)
+    pd.testing.assert_frame_equal(result, expected)
+    assert all(isinstance(brands, list) for brands in result['ner_brands'])
+    assert result.loc[5, 'ner_brands'] == ['Sony'] and original.loc[5, 'ner_brands'] == ['Apple']
+
+
+def test_streaming_entity_cache_only_reprocesses_changed_reviews(tmp_path, ner_model):
+    df, changed = changed_reviews(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    BeautyReviewsCleaner(cache_dir=cache_dir, model_name=ner_model).process_file_streaming(
+        str(tmp_path / 'input.parquet'), str(tmp_path / 'first'), chunk_size=5, n_process=1)
+
+    changed.to_parquet(tmp_path / 'input.parquet', index=False)
+    cached = BeautyReviewsCleaner(cache_dir=cache_dir, model_name=ner_model)
+    cached.process_file_streaming(str(tmp_path / 'input.parquet'), str(tmp_path / 'second'), chunk_size=5, n_process=1)
+    assert (cached.cache.hits, cached.cache.misses) == (11, 1)
+
+    BeautyReviewsCleaner(model_name=ner_model).process_file_streaming(
+        str(tmp_path / 'input.parquet'), str(tmp_path / 'uncached'), chunk_size=5, n_process=1)
+    assert read_output(tmp_path / 'second') == read_output(tmp_path / 'uncached')
+    assert read_output(tmp_path / 'second')[5][1] == ['Sony']
@@ -0,0 +1,61 @@
+import query_cache
+from query_cache import QueryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_and_miss_stats():
+    cache = QueryCache(max_size=4, ttl=None)
+    assert cache.get('q', 0) is None
+    cache.put('q', 0, ['r'])
+    assert cache.get('q', 0) == ['r']
+    assert cache.stats() == {'entradas': 1, 'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 0.5}
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache.time, 'monotonic', clock)
+    cache = QueryCache(max_size=4, ttl=10.0)
+    cache.put('q', 0, 'r')
+
+    clock.now += 9.9
+    assert cache.get('q', 0) == 'r'
+    clock.now += 0.2
+    assert cache.get('q', 0, default='vacío') == 'vacío'
+    assert len(cache) == 0
+
+
+def test_version_change_clears_everything():
+    cache = QueryCache(max_size=4, ttl=None)
+    cache.put('a', 0, 1)
+    cache.put('b', 0, 2)
+
+    assert cache.get('a', 1) is None
+    assert len(cache) == 0
+    # Un valor guardado con la versión nueva sigue visible
+    cache.put('a', 1, 3)
+    assert cache.get('a', 1) == 3
+
+
+def test_least_recently_used_is_evicted():
+    cache = QueryCache(max_size=2, ttl=None)
+    cache.put('a', 0, 1)
+    cache.put('b', 0, 2)
+    cache.get('a', 0)
+    cache.put('c', 0, 3)
+
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0) == 1
+    assert cache.get('c', 0) == 3
+
+
+def test_zero_size_disables_cache():
+    cache = QueryCache(max_size=0)
+    cache.put('a', 0, 1)
+    assert cache.get('a', 0) is None
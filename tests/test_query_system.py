@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+def brute_force_candidates(system, product=None, sentiment=None):
+    """Ids vigentes que pasan los filtros, recorriendo las características fila por fila"""
+    ids = []
+    for idx in range(len(system.doc_ids)):
+        if not system.doc_ids.is_alive(idx):
+            continue
+        if product and product.lower() not in system.review_features['product'][idx].lower():
+            continue
+        if sentiment == 'negativo' and not system.review_flags['filter_negative'][idx]:
+            continue
+        ids.append(idx)
+    return ids
+
+
+def test_advanced_search_scores_filtered_reviews_by_doc_id(review_system):
+    # El corpus tiene documentos sin tokens: posición en el índice = id de la reseña
+    assert any(not tokens for tokens in review_system._tokenize_texts(review_system.texts))
+
+    keyword = 'The battery!'
+    tokens = review_system.query_analyzer.tokenize(keyword)
+    assert tokens == ['battery']
+    scores = review_system.bm25.get_scores(tokens)
+
+    results = review_system.advanced_semantic_search(product='galaxy', sentiment='negativo',
+                                                     failure_keyword=keyword, top_n=5)
+    candidates = brute_force_candidates(review_system, product='galaxy', sentiment='negativo')
+    expected = sorted(candidates, key=lambda idx: -scores[idx])[:5]
+
+    assert [result['review_id'] for result in results] == expected
+    for result in results:
+        idx = result['review_id']
+        assert result['score'] == round(scores[idx], 2)
+        assert result['text'] == review_system.texts[idx]
+        assert 'galaxy' in result['data']['Producto'].lower()
+
+
+def test_advanced_search_skips_deleted_reviews(review_system):
+    before = [result['review_id'] for result in review_system.advanced_semantic_search(product='kindle', top_n=5)]
+    review_system.delete_reviews(before[:2])
+    after = [result['review_id'] for result in review_system.advanced_semantic_search(product='kindle', top_n=5)]
+
+    assert not set(before[:2]) & set(after)
+    assert after[:3] == before[2:]
+    assert np.all(review_system.doc_ids.alive[after])
+
+
+def test_added_reviews_match_a_full_rebuild(review_system, tmp_path):
+    from conftest import make_reviews
+    from query_system2 import UniversalReviewQuerySystem
+
+    base = make_reviews(400)
+    for seed in range(2, 5):
+        review_system.add_reviews(make_reviews(15, seed=seed))
+    combined = pd.concat([base] + [make_reviews(15, seed=seed) for seed in range(2, 5)], ignore_index=True)
+    combined.to_parquet(tmp_path / 'combined.parquet', index=False)
+    rebuilt = UniversalReviewQuerySystem(str(tmp_path / 'combined.parquet'))
+    rebuilt.bm25.stop_background_merge()
+
+    assert len(review_system.df) == len(rebuilt.df) == 445
+    for key in rebuilt.review_features:
+        np.testing.assert_array_equal(review_system.review_features[key], rebuilt.review_features[key])
+    for key in rebuilt.review_flags:
+        np.testing.assert_array_equal(review_system.review_flags[key], rebuilt.review_flags[key])
+    assert sorted(review_system.rdf_graph.triples()) == sorted(rebuilt.rdf_graph.triples())
+
+    for query in ['battery problems in mexico', 'great screen', 'bad samsung']:
+        added = review_system.enhanced_semantic_search(query)
+        expected = rebuilt.enhanced_semantic_search(query)
+        assert [(r['review_id'], r['score']) for r in added] == [(r['review_id'], r['score']) for r in expected]
+        assert [r.to_dict() for r in added] == [r.to_dict() for r in expected]
+
+    added = review_system.advanced_semantic_search(brand='sam', failure_keyword='battery')
+    expected = rebuilt.advanced_semantic_search(brand='sam', failure_keyword='battery')
+    assert [r.to_dict() for r in added] == [r.to_dict() for r in expected]
+
+
+def test_concurrent_searches_get_their_own_results(review_system):
+    from concurrent.futures import ThreadPoolExecutor
+
+    expected = [r.to_dict() for r in review_system.enhanced_semantic_search('battery problems in mexico')]
+    assert expected
+
+    def search(_):
+        return review_system.enhanced_semantic_search('battery problems in mexico')
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        batches = list(pool.map(search, range(8)))
+    # El caché guarda filas: cada llamada recibe objetos propios
+    assert len({id(result) for results in batches for result in results}) == 8 * len(expected)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        materialized = list(pool.map(lambda results: [r.to_dict() for r in results], batches))
+    assert all(results == expected for results in materialized)
+
+    batched = review_system.batch_search(['battery problems in mexico'] * 3)
+    assert batched[0] is not batched[1] and batched[0][0] is not batched[1][0]
+    assert all([r.to_dict() for r in results] == expected for results in batched)
+
+
+def test_sparse_ranking_matches_dense_scores(review_system, monkeypatch):
+    import bm25_index
+
+    # En el corpus de prueba los postings son densos: forzar el camino disperso
+    monkeypatch.setattr(bm25_index, 'SPARSE_MAX_DENSITY', float('inf'))
+    review_system.delete_reviews(list(range(0, 400, 9)))
+    queries = ['battery problems in mexico', 'screen problems in spain', 'bad samsung', 'terrible', 'zzz']
+    batched = review_system.batch_search(queries, max_workers=2)
+    assert sum(map(len, batched)) > 0
+    for query, results in zip(queries, batched):
+        analysis = review_system.query_analyzer.analyze(query)
+        assert review_system.bm25.get_sparse_scores(list(analysis.tokens))[0] is not None
+        dense = review_system._rank_results(None, review_system.bm25.get_scores(list(analysis.tokens)),
+                                            analysis.intent, 10)
+        assert [(r['review_id'], r['score']) for r in results] == [(idx, round(score, 2)) for idx, score in dense]
+        assert not any(r['review_id'] % 9 == 0 for r in results)
@@ -0,0 +1,37 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from review_result import ReviewResult
+
+
+def test_lazy_field_is_computed_on_first_read():
+    calls = []
+    result = ReviewResult({'id': 1, 'data': lambda: calls.append(1) or {'a': 1}}, lazy=('data',))
+
+    assert 'data' in result and len(result) == 2
+    assert calls == []
+    assert result['data'] == {'a': 1}
+    assert result['data'] == {'a': 1}
+    assert calls == [1]
+    assert result.to_dict() == {'id': 1, 'data': {'a': 1}}
+
+
+def test_concurrent_readers_all_get_the_lazy_value():
+    barrier = threading.Barrier(8)
+
+    def slow():
+        time.sleep(0.01)
+        return ['valor']
+
+    for _ in range(20):
+        result = ReviewResult({'data': slow}, lazy=('data',))
+
+        def read():
+            barrier.wait()
+            return result['data'], result.to_dict()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            values = list(pool.map(lambda _: read(), range(8)))
+
+        assert all(value == ['valor'] and as_dict == {'data': ['valor']} for value, as_dict in values)
@@ -0,0 +1,108 @@
+import asyncio
+import sys
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from search_service import create_app
+
+
+def serve(system, scenario, max_workers=8):
+    """Corre `scenario(client)` contra la aplicación en un servidor de prueba"""
+    async def main():
+        async with TestClient(TestServer(create_app(system, max_workers=max_workers))) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+async def fetch(client, method, path, **kwargs):
+    async with client.request(method, path, **kwargs) as response:
+        return response.status, await response.json()
+
+
+def test_parallel_identical_searches_all_succeed(review_system):
+    query = 'battery problems in mexico'
+
+    async def scenario(client):
+        rounds = []
+        for top_n in range(3, 11):
+            # Caché ya caliente: las 16 solicitudes reciben la misma entrada
+            review_system.enhanced_semantic_search(query, top_n)
+            rounds.append(await asyncio.gather(*[
+                fetch(client, 'GET', '/search', params={'q': query, 'top_n': str(top_n)})
+                for _ in range(16)
+            ]))
+        return rounds
+
+    # Cambios de hilo frecuentes: los hilos del pool se intercalan al armar los resultados
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        rounds = serve(review_system, scenario)
+    finally:
+        sys.setswitchinterval(interval)
+
+    for responses in rounds:
+        assert [status for status, _ in responses] == [200] * 16
+        first = responses[0][1]
+        assert first['total'] > 0 and all(body == first for _, body in responses)
+    assert {'review_id', 'score', 'data', 'text', 'intent_match', 'triples', 'problems_detected'} <= set(first['resultados'][0])
+
+
+def test_endpoints(review_system):
+    async def scenario(client):
+        return {
+            'health': await fetch(client, 'GET', '/health'),
+            'search': await fetch(client, 'GET', '/search', params={'q': 'great screen'}),
+            'batch': await fetch(client, 'POST', '/search/batch',
+                                 json={'queries': ['great screen', 'bad samsung', 'great screen'], 'top_n': 3}),
+            'advanced': await fetch(client, 'GET', '/advanced', params={'brand': 'sam', 'keyword': 'battery'}),
+            'rdf': await fetch(client, 'GET', '/rdf', params={'predicate': 'tiene_problema', 'limit': '5'}),
+            'metrics': await fetch(client, 'GET', '/metrics'),
+        }
+
+    responses = serve(review_system, scenario)
+    assert {name: status for name, (status, _) in responses.items()} == dict.fromkeys(responses, 200)
+
+    assert responses['health'][1] == {'estado': 'ok', 'reseñas': 400, 'version_indice': review_system.index_version}
+    expected = [r.to_dict() for r in review_system.enhanced_semantic_search('great screen')]
+    assert [r['review_id'] for r in responses['search'][1]['resultados']] == [r['review_id'] for r in expected]
+
+    batch = responses['batch'][1]
+    assert batch['total'] == 3 and batch['resultados'][0] == batch['resultados'][2]
+    assert all(len(results) <= 3 for results in batch['resultados'])
+
+    advanced = responses['advanced'][1]
+    assert advanced['filtros']['brand'] == 'sam' and advanced['filtros']['product'] is None
+    expected = review_system.advanced_semantic_search(brand='sam', failure_keyword='battery')
+    assert [r['review_id'] for r in advanced['resultados']] == [r['review_id'] for r in expected]
+
+    rdf = responses['rdf'][1]
+    assert 0 < rdf['total'] <= 5 and all(triple[1] == 'tiene_problema' for triple in rdf['triples'])
+
+    endpoints = responses['metrics'][1]['endpoints']
+    assert endpoints['GET /search']['solicitudes'] == 1 and endpoints['GET /search']['errores'] == 0
+    assert 'cache' in responses['metrics'][1]
+
+
+def test_invalid_requests(review_system):
+    async def scenario(client):
+        return [
+            await fetch(client, 'GET', '/search'),
+            await fetch(client, 'GET', '/search', params={'q': '   '}),
+            await fetch(client, 'GET', '/search', params={'q': 'screen', 'top_n': 'diez'}),
+            await fetch(client, 'GET', '/search', params={'q': 'screen', 'top_n': '0'}),
+            await fetch(client, 'POST', '/search/batch', data='no es json'),
+            await fetch(client, 'POST', '/search/batch', json={'queries': 'screen'}),
+            await fetch(client, 'POST', '/search/batch', json={'queries': ['screen', 3]}),
+            await fetch(client, 'GET', '/advanced'),
+            await fetch(client, 'GET', '/rdf', params={'limit': '-1'}),
+        ], await client.get('/no-existe'), await fetch(client, 'GET', '/metrics')
+
+    bad, missing, (_, metrics) = serve(review_system, scenario)
+    assert all(status == 400 and 'error' in body for status, body in bad)
+    assert missing.status == 404
+
+    endpoints = metrics['endpoints']
+    assert endpoints['GET /search']['errores'] == 4
+    assert endpoints['POST /search/batch']['errores'] == 3
+    assert endpoints['GET no_encontrado']['errores'] == 1
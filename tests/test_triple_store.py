@@ -0,0 +1,98 @@
+import itertools
+import random
+from collections import defaultdict
+
+from triple_store import TripleStore
+
+SUBJECTS = ['Galaxy S21', 'iPhone 12', 'Kindle', 'Samsung', 'Apple', 'negativo', 'positivo', 'batería']
+PREDICATES = ['es_de_marca', 'fabrica', 'tiene_sentimiento', 'asociado_con', 'tiene_problema', 'afecta_a']
+
+
+def random_triples(n, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(SUBJECTS), rng.choice(PREDICATES), rng.choice(SUBJECTS)) for _ in range(n)]
+
+
+def dict_graph(triples):
+    """Grafo anterior: (sujeto, predicado) -> conjunto de objetos"""
+    graph = defaultdict(set)
+    for subj, pred, obj in triples:
+        graph[(subj, pred)].add(obj)
+    return graph
+
+
+def query_dict_graph(graph, subject=None, predicate=None, obj=None):
+    """Consulta por recorrido completo, como el query_rdf_graph original"""
+    results = []
+    for (subj, pred), objects in graph.items():
+        if (subject is None or subject == subj) and (predicate is None or predicate == pred):
+            for o in objects:
+                if obj is None or obj == o:
+                    results.append((subj, pred, o))
+    return results
+
+
+def all_patterns():
+    terms = SUBJECTS + ['desconocido']
+    for subject, predicate, obj in itertools.product([None] + terms, [None] + PREDICATES, [None] + terms):
+        yield subject, predicate, obj
+
+
+def assert_same_answers(store, triples):
+    graph = dict_graph(triples)
+    for subject, predicate, obj in all_patterns():
+        expected = sorted(query_dict_graph(graph, subject, predicate, obj))
+        assert sorted(store.triples(subject, predicate, obj)) == expected, (subject, predicate, obj)
+
+
+def test_pattern_queries_match_dict_graph():
+    triples = random_triples(300, seed=1)
+    store = TripleStore()
+    for triple in triples:
+        store.add(*triple)
+    store.build()
+
+    assert len(store) == len(set(triples))
+    assert_same_answers(store, triples)
+
+
+def test_incremental_batches_match_dict_graph():
+    store = TripleStore()
+    triples = []
+    for seed in range(5):
+        batch = random_triples(60, seed=seed)
+        for triple in batch:
+            store.add(*triple)
+        triples += batch
+        assert_same_answers(store, triples)
+
+
+def test_remove_counts_contributions():
+    store = TripleStore()
+    store.add('Kindle', 'es_de_marca', 'Amazon')
+    store.add('Kindle', 'es_de_marca', 'Amazon')
+    store.add('Kindle', 'tiene_sentimiento', 'positivo')
+
+    store.remove('Kindle', 'es_de_marca', 'Amazon')
+    assert store.objects('Kindle', 'es_de_marca') == ['Amazon']
+
+    store.remove('Kindle', 'es_de_marca', 'Amazon')
+    assert store.objects('Kindle', 'es_de_marca') == []
+    assert store.triples() == [('Kindle', 'tiene_sentimiento', 'positivo')]
+
+    # Quitar un triple que no existe no cambia nada
+    store.remove('Kindle', 'fabrica', 'Amazon')
+    assert len(store) == 1
+
+
+def test_limit_and_helpers():
+    triples = random_triples(200, seed=3)
+    store = TripleStore()
+    for triple in triples:
+        store.add(*triple)
+
+    graph = dict_graph(triples)
+    assert len(store.triples(limit=5)) == 5
+    assert sorted(store.objects('Samsung', 'fabrica')) == sorted(graph[('Samsung', 'fabrica')])
+    assert sorted(store.subjects('afecta_a', 'Kindle')) == sorted(
+        subj for subj, _, _ in query_dict_graph(graph, predicate='afecta_a', obj='Kindle'))